@@ -1,759 +1,863 @@
-import streamlit as st
-from datetime import datetime,timedelta
-import json
-import os
-import time as t1
-import re
-import pandas as pd
-from operations import ContactOperations
-
-# Page config with improved theme
-st.set_page_config(
-    page_title="Professional Contact Manager",
-    page_icon="📇",
-    layout="wide",
-    initial_sidebar_state="expanded"
-)
-
-if 'login_attempts' not in st.session_state:
-    st.session_state.login_attempts = 0
-if 'account_locked' not in st.session_state:
-    st.session_state.account_locked = False
-if 'lock_time' not in st.session_state:
-    st.session_state.lock_time = None
-
-# Custom CSS for enhanced UI
-st.markdown("""
-    <style>
-        .main {
-            background-color: #f8f9fa;
-        }
-        .sidebar .sidebar-content {
-            background-color: #343a40;
-            color: white;
-        }
-        .stButton>button {
-            border-radius: 8px;
-            padding: 8px 16px;
-            font-weight: 500;
-        }
-        .stTextInput>div>div>input {
-            border-radius: 8px;
-        }
-        .stSelectbox>div>div>select {
-            border-radius: 8px;
-        }
-        .header {
-            color: #4a4a4a;
-        }
-        .success-message {
-            color: #28a745;
-            font-weight: 500;
-        }
-        .error-message {
-            color: #dc3545;
-            font-weight: 500;
-        }
-        .guideline-box {
-            background-color:#121212;
-            border-left: 4px solid #007bff;
-            padding: 1rem;
-            margin: 1rem 0;
-            border-radius: 4px;
-        }
-        .pagination-info {
-            font-size: 0.9rem;
-            color: #6c757d;
-            margin-bottom: 10px;
-        }
-    </style>
-""", unsafe_allow_html=True)
-
-# Initialize database operations
-if 'db_ops' not in st.session_state:
-    st.session_state.db_ops = ContactOperations()
-
-# Validation functions
-def validate_username(username):
-    if len(username) < 3:
-        return False, "Username must be at least 3 characters long"
-    if not re.match(r'^[a-zA-Z0-9_]+$', username):
-        return False, "Username can only contain letters, numbers, and underscores"
-    return True, ""
-
-def validate_password(password):
-    if len(password) < 6:
-        return False, "Password must be at least 6 characters long"
-    return True, ""
-
-def validate_name(name):
-    pattern = re.compile(r"^[A-Za-z\s\'-]{2,50}$")
-    
-    if not bool(pattern.match(name)):
-        return False, "Name can only contain letters,spaces."
-    
-    # Check for consecutive special characters
-    if re.search(r"[\s\'-]{2,}", name):
-        return False, "Name cannot have consecutive spaces, apostrophes or hyphens"
-    
-    # Check if name starts or ends with special character
-    if name.startswith(("'", "-", " ")) or name.endswith(("'", "-", " ")):
-        return False, "Name cannot start or end with a space, apostrophe or hyphen"
-    
-    # Check minimum length after trimming (at least 2 letters)
-    letters_only = re.sub(r"[^A-Za-z]", "", name)
-    if len(letters_only) < 2:
-        return False, "Name must contain at least 2 letters"
-    
-    return True, ""
-
-def validate_phone(phone):
-    # Remove any spaces, dashes, or parentheses that users might enter
-    cleaned_phone = re.sub(r'[\s\-\(\)]', '', phone)
-    
-    # Check if it starts with a country code like +91 and remove it
-    if cleaned_phone.startswith('+91') and len(cleaned_phone) > 3:
-        cleaned_phone = cleaned_phone[3:]  # Remove the +91 prefix
-    
-    # Check if it starts with 91 (without +) and remove it
-    if cleaned_phone.startswith('91') and len(cleaned_phone) > 2:
-        cleaned_phone = cleaned_phone[2:]  # Remove the 91 prefix
-    
-    # Validate that it's exactly 10 digits
-    pattern = re.compile(r"^[6-9][0-9]{9}$")  # Indian mobile numbers start with 6-9
-    
-    if not cleaned_phone:
-        return False, "Phone number cannot be empty"
-    
-    if not bool(pattern.match(cleaned_phone)):
-        return False, "Please enter a valid 10-digit phone number (should start with 6-9)"
-    
-    return True, ""
-
-def validate_email(email):
-    # Check if email is empty, None, or just whitespace
-    if not email or not email.strip():
-        return True, "NULL"  # Indicates empty email should be stored as NULL
-    
-    # Clean the email by stripping whitespace
-    cleaned_email = email.strip()
-    
-    # Validate email pattern if provided
-    pattern = re.compile(r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$")
-    if not bool(pattern.match(cleaned_email)):
-        return False, "Please enter a valid email address"
-    
-    return True, "VALID"  # Indicates valid email provided
-
-# Cache management functions
-def initialize_contacts():
-    """Initialize contacts in session state if not already present"""
-    if 'contacts' not in st.session_state:
-        st.session_state.contacts = []
-    if 'contacts_loaded' not in st.session_state:
-        st.session_state.contacts_loaded = False
-
-def refresh_contacts():
-    """Force refresh contacts from database"""
-    st.session_state.contacts = st.session_state.db_ops.get_contacts(st.session_state.current_user)
-    st.session_state.contacts_loaded = True
-
-def get_contacts_cached():
-    """Get contacts from cache or database if not loaded"""
-    initialize_contacts()
-    
-    if not st.session_state.contacts_loaded or not st.session_state.contacts:
-        refresh_contacts()
-    
-    return st.session_state.contacts
-
-def invalidate_contacts_cache():
-    """Mark contacts cache as invalid (to be refreshed on next access)"""
-    st.session_state.contacts_loaded = False
-
-# Export functions
-def export_contacts_csv():
-    contacts = get_contacts_cached()
-    if contacts:
-        df = pd.DataFrame(contacts)
-        # Convert datetime objects to strings for CSV export
-        if 'date_added' in df.columns:
-            df['date_added'] = df['date_added'].apply(lambda x: x.strftime('%Y-%m-%d %H:%M:%S') if x else '')
-        csv = df.to_csv(index=False)
-        return csv
-    return None
-
-def export_contacts_json():
-    contacts = get_contacts_cached()
-    if contacts:
-        # Convert datetime objects to strings for JSON serialization
-        export_data = []
-        for contact in contacts:
-            contact_copy = contact.copy()
-            if contact_copy.get('date_added'):
-                contact_copy['date_added'] = contact_copy['date_added'].strftime('%Y-%m-%d %H:%M:%S')
-            export_data.append(contact_copy)
-        return json.dumps(export_data, indent=2)
-    return None
-
-# Login system
-def login_page():
-    st.markdown("""
-        <style>
-        .login-container {
-            max-width: 400px;
-            margin: 40px auto 0 auto;
-            background: #fff;
-            padding: 2.5rem 2rem 2rem 2rem;
-            border-radius: 16px;
-            box-shadow: 0 4px 24px rgba(0,0,0,0.10);
-        }
-        .timer-warning {
-            background-color: #fff3cd;
-            color: #856404;
-            padding: 12px;
-            border-radius: 8px;
-            border: 1px solid #ffeaa7;
-            margin-bottom: 20px;
-            text-align: center;
-        }
-        </style>
-    """, unsafe_allow_html=True)
-    
-    # Check if account is locked and show timer if needed
-    if st.session_state.account_locked:
-        remaining_time = st.session_state.lock_time - datetime.now()
-        if remaining_time.total_seconds() > 0:
-            minutes, seconds = divmod(int(remaining_time.total_seconds()), 60)
-            
-            # Display lock message and timer
-            st.markdown(f"""
-                <div class="timer-warning">
-                    <h4>🔒 Account Locked</h4>
-                    <p>Too many failed attempts. Please try again After:</p>
-                    <h3>{minutes:02d}:{seconds:02d}</h3>
-                </div>
-            """, unsafe_allow_html=True)
-            
-            # Update the timer every second
-            t1.sleep(1)
-            st.rerun()
-        else:
-            # Lock period has ended
-            st.session_state.account_locked = False
-            st.session_state.login_attempts = 0
-            st.session_state.lock_time = None
-            st.rerun()
-    
-    # Start container
-    container = st.container()
-    with container:
-        st.title("🔐 Contact Manager Pro - Login")
-        st.markdown("---")
-        
-        # Show remaining attempts warning if any failed attempts
-        if st.session_state.login_attempts > 0:
-            remaining_attempts = 2 - st.session_state.login_attempts
-            st.warning(f"⚠️ Access denied.. {remaining_attempts} attempt remaining, your account will be automatically locked for security protection.")
-        
-        with st.form("login_form"):
-            username = st.text_input("Username", placeholder="Enter your username")
-            password = st.text_input("Password", type="password", placeholder="Enter your password")
-            
-            if st.form_submit_button("Login"):
-                if not username and not password:
-                    st.error("Please enter both username and password")
-                elif not username:
-                    st.error("Please enter your username")
-                elif not password:
-                    st.error("Please enter your password")
-                elif st.session_state.db_ops.authenticate_user(username, password):
-                    # Successful login - reset attempt counter
-                    st.session_state.logged_in = True
-                    st.session_state.current_user = username
-                    st.session_state.login_attempts = 0
-                    invalidate_contacts_cache()  # Reset cache for new user
-                    st.success("Login successful!")
-                    st.rerun()
-                else:
-                    # Failed login - increment attempt counter
-                    st.session_state.login_attempts += 1
-                    
-                    # Check if account should be locked
-                    if st.session_state.login_attempts >= 3:
-                        st.session_state.account_locked = True
-                        st.session_state.lock_time = datetime.now() + timedelta(minutes=1)  # Lock for 2 minutes
-                        st.error("Too many failed attempts! Account locked for 1 minutes.")
-                        st.rerun()
-                    else:
-                        st.error("Invalid username or password")
-        
-        st.markdown("---")
-        st.markdown("Don't have an account? Register below:")
-        
-        if st.session_state.get("registration_success"):
-            st.success("Registration successful! Please login.")
-            st.session_state.registration_success = False
-        
-        with st.expander("Register New Account"):
-            with st.form("register_form"):
-                new_username = st.text_input("New Username", placeholder="Choose a username (min. 3 chars)")
-                new_password = st.text_input("New Password", type="password", placeholder="Choose a password (min. 6 chars)")
-                confirm_password = st.text_input("Confirm Password", type="password", placeholder="Confirm password")
-                
-                if st.form_submit_button("Register"):
-                    # Validate inputs
-                    username_valid, username_msg = validate_username(new_username)
-                    password_valid, password_msg = validate_password(new_password)
-                    
-                    if not username_valid:
-                        st.error(username_msg)
-                    elif not password_valid:
-                        st.error(password_msg)
-                    elif new_password != confirm_password:
-                        st.error("Passwords don't match")
-                    else:
-                        success, message = st.session_state.db_ops.register_user(new_username, new_password)
-                        if success:
-                            st.session_state.registration_success = True
-                            st.rerun()
-                        else:
-                            st.error(message)
-    
-    # Apply the container styling
-    st.markdown(
-        f"""
-        <script>
-            var container = window.parent.document.querySelector('.stContainer');
-            container.classList.add('login-container');
-        </script>
-        """,
-        unsafe_allow_html=True
-    )
-
-# Display contacts in table view with sorting and pagination
-def display_contacts_table():
-    contacts = get_contacts_cached()
-    
-    if contacts:
-        # Sorting options
-        sort_option = st.selectbox(
-            "Sort by", 
-            ["Name (A-Z)", "Name (Z-A)", "Date Added (Newest)", "Date Added (Oldest)"],
-            key="sort_option"
-        )
-        
-        # Apply sorting
-        if sort_option == "Name (A-Z)":
-            sorted_contacts = sorted(contacts, key=lambda x: x["name"].lower())
-        elif sort_option == "Name (Z-A)":
-            sorted_contacts = sorted(contacts, key=lambda x: x["name"].lower(), reverse=True)
-        elif sort_option == "Date Added (Newest)":
-            sorted_contacts = sorted(contacts, key=lambda x: x["date_added"], reverse=True)
-        elif sort_option == "Date Added (Oldest)":
-            sorted_contacts = sorted(contacts, key=lambda x: x["date_added"])
-        else:
-            sorted_contacts = contacts
-        
-        # Pagination
-        items_per_page = 10
-        total_pages = max(1, (len(sorted_contacts) + items_per_page - 1) // items_per_page)
-        page = st.number_input("Page", min_value=1, max_value=total_pages, value=1, key="page_input")
-        
-        start_idx = (page - 1) * items_per_page
-        end_idx = min(start_idx + items_per_page, len(sorted_contacts))
-        
-        # Display pagination info
-        st.markdown(f'<div class="pagination-info">Showing {start_idx + 1}-{end_idx} of {len(sorted_contacts)} contacts</div>', unsafe_allow_html=True)
-        
-        # Convert to list of dictionaries for display
-        display_data = []
-        for contact in sorted_contacts[start_idx:end_idx]:
-            display_data.append({
-                "id": contact["id"],
-                "name": contact["name"],
-                "phone": contact["phone"],
-                "email": contact["email"],
-                "date_added": contact["date_added"].strftime("%Y-%m-%d %H:%M") if contact["date_added"] else ""
-            })
-        
-        st.dataframe(
-            display_data,
-            column_config={
-                "id": {"label": "ID", "width": "small"},
-                "name": {"label": "Name", "width": "medium"},
-                "phone": {"label": "Phone", "width": "medium"},
-                "email": {"label": "Email", "width": "large"},
-                "date_added": {"label": "Date Added", "width": "medium"}
-            },
-            use_container_width=True,
-            hide_index=True,
-            height=min(40 * len(display_data) + 40, 500)
-        )
-        
-        # Export buttons
-        col1, col2 = st.columns(2)
-        with col1:
-            csv_data = export_contacts_csv()
-            if csv_data:
-                st.download_button(
-                    label="Export as CSV",
-                    data=csv_data,
-                    file_name=f"contacts_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                    mime="text/csv",
-                    use_container_width=True
-                )
-        with col2:
-            json_data = export_contacts_json()
-            if json_data:
-                st.download_button(
-                    label="Export as JSON",
-                    data=json_data,
-                    file_name=f"contacts_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
-                    mime="application/json",
-                    use_container_width=True
-                )
-    else:
-        st.warning("No contacts found. Add your first contact!")
-
-# Guidelines page
-def show_guidelines():
-    st.subheader("📖 How to Use Contact Manager Pro")
-    
-    st.markdown("""
-    <div class="guideline-box">
-    <h4>Getting Started</h4>
-    <p>Welcome to Contact Manager Pro! This application helps you manage your contacts efficiently.</p>
-    </div>
-    """, unsafe_allow_html=True)
-    
-    with st.expander("View Contacts", expanded=True):
-        st.markdown("""
-        - Navigate to the **View Contacts** section to see all your saved contacts
-        - Use the sorting dropdown to organize contacts by name or date
-        - Use pagination to navigate through large contact lists
-        - Export your contacts as CSV or JSON for backup
-        """)
-    
-    with st.expander("Add New Contacts"):
-        st.markdown("""
-        - Go to the **Add Contact** section to create new entries
-        - Name and Phone fields are required
-        - Email is optional but recommended for complete contact information
-        - Phone numbers are validated for correct format
-        - Click "Save Contact" to add to your database
-        """)
-    
-    with st.expander("Edit Existing Contacts"):
-        st.markdown("""
-        - Select **Edit Contact** from the sidebar
-        - Choose the contact you want to modify from the dropdown
-        - Update any of the fields as needed
-        - Click "Update Contact" to save your changes
-        """)
-    
-    with st.expander("Search Functionality"):
-        st.markdown("""
-        - Use the **Search Contacts** feature to find specific contacts
-        - Search by name, phone number, or email address
-        - Results will appear instantly as you type
-        """)
-    
-    with st.expander("Delete Contacts"):
-        st.markdown("""
-        - Select **Delete Contact** from the sidebar
-        - Choose the contact you want to remove
-        - Confirm deletion - this action cannot be undone
-        - The contact will be permanently removed from your database
-        """)
-    
-    st.markdown("---")
-    st.markdown("### 💡 Pro Tips")
-    st.info("""
-    - Your data is automatically saved and synchronized across sessions
-    - Use descriptive names to make contacts easier to find later
-    - Regularly update contact information to keep your database current
-    - Export your contacts regularly for backup purposes
-    - Use categories to organize your contacts (coming in future versions)
-    """)
-
-# Main app function
-def contact_manager():
-    # Sidebar with user info and actions
-    with st.sidebar:
-        st.title(f"👋 Welcome, {st.session_state.current_user}")
-        st.markdown("---")
-        # Action selector
-        action = st.radio(
-            "Actions",
-            ["View Contacts", "Add Contact", "Edit Contact", "Search Contacts", "Delete Contact"],
-            index=0
-        )
-        st.markdown("---")
-        # Quick stats
-        st.markdown("### Quick Stats")
-        contacts = get_contacts_cached()
-        st.markdown(f"📇 **Total Contacts:** {len(contacts)}")
-        if contacts:
-            last_added = max(contacts, key=lambda x: x['date_added'])
-            st.markdown(f"🕒 **Last Added:** {last_added['name']}")
-        st.markdown("---")
-        
-        # Guidelines button
-        if st.button("📖 Guidelines", use_container_width=True):
-            st.session_state.show_guidelines = True
-        
-        st.markdown("---")
-        if st.button("Logout"):
-            st.session_state.logged_in = False
-            st.session_state.current_user = None
-            st.session_state.contacts = []
-            st.session_state.contacts_loaded = False
-            st.session_state.show_guidelines = False
-            st.rerun()
-
-    # Main content area
-    st.title("📇 Contact Manager Pro")
-    st.markdown("---")
-
-    # Check if we should show guidelines
-    if st.session_state.get('show_guidelines', False):
-        show_guidelines()
-        if st.button("Back to Main"):
-            st.session_state.show_guidelines = False
-            st.rerun()
-        return
-
-    # View Contacts
-    if action == "View Contacts":
-        st.subheader("All Contacts")
-        display_contacts_table()
-
-    # Delete Contact
-    elif action == "Delete Contact":
-        contacts = get_contacts_cached()
-        if contacts:
-            st.subheader("Delete a Contact")
-            contact_options = {f"{c['name']} ({c['phone']})": c['id'] for c in contacts}
-            selected = st.selectbox("Select contact to delete", list(contact_options.keys()))
-            
-            # Add confirmation for deletion
-            if st.checkbox("Confirm deletion", key="delete_confirm"):
-                if st.button("Delete Contact", key="delete_contact_btn"):
-                    contact_id = contact_options[selected]
-                    success, message = st.session_state.db_ops.delete_contact(st.session_state.current_user, contact_id)
-                    if success:
-                        st.success(message)
-                        invalidate_contacts_cache()  # Mark cache as invalid
-                        st.rerun()
-                    else:
-                        st.error(message)
-            else:
-                st.warning("Please check the confirmation box to delete the contact")
-        else:
-            st.warning("No contacts to delete.")
-
-    # Add Contact
-    elif action == "Add Contact":
-            st.subheader("Add New Contact")
-    
-            # Initialize form data in session state if not exists
-            if 'add_form_data' not in st.session_state:
-                st.session_state.add_form_data = {'name': '', 'phone': '', 'email': ''}
-    
-            with st.form("add_form"):
-                cols = st.columns(2)
-                with cols[0]:
-                    name = st.text_input("Name*", placeholder="Enter The Name", 
-                                value=st.session_state.add_form_data['name'])
-                with cols[1]:
-                    phone = st.text_input("Phone*", placeholder="Enter The Phone No", 
-                                 value=st.session_state.add_form_data['phone'])
-                email = st.text_input("Email", placeholder="Enter The Email", 
-                             value=st.session_state.add_form_data['email'])
-        
-                submitted = st.form_submit_button("💾 Save Contact", use_container_width=True)
-        
-                if submitted:
-            # Store form data in session state to preserve values if validation fails
-                    st.session_state.add_form_data = {'name': name, 'phone': phone, 'email': email}
-            
-                # Validate inputs
-                    name_valid, name_msg = validate_name(name)
-                    phone_valid, phone_msg = validate_phone(phone)
-                    email_valid, email_msg = validate_email(email)
-            
-                    validation_passed = True
-            
-                    if not name:
-                        st.error("Name is required!")
-                        validation_passed = False
-                
-                    if not phone:
-                        st.error("Phone is required!")
-                        validation_passed = False
-
-                    elif not name_valid:
-                        st.error(name_msg)
-                        validation_passed = False
-
-                    elif not phone_valid:
-                        st.error(phone_msg)
-                        validation_passed = False
-                
-                    if email and not email_valid:
-                        st.error(email_msg)
-                        validation_passed = False
-            
-                    # Only proceed if all validations pass
-                    if validation_passed:
-                        try:
-                            success, message = st.session_state.db_ops.add_contact(
-                                st.session_state.current_user, name, phone, email
-                                 )
-                            if success:
-                                st.success(message)
-                                invalidate_contacts_cache()  # Mark cache as invalid
-                                # Clear form data after successful submission
-                                st.session_state.add_form_data = {'name': '', 'phone': '', 'email': ''}
-                                # Rerun to refresh the form with empty values
-                                st.rerun()
-                            else:
-                                st.error(message)
-                        except Exception as e:
-                            st.error(f"An unexpected error occurred: {str(e)}")
-
-    # Edit Contact
-    elif action == "Edit Contact":
-        contacts = get_contacts_cached()
-        if contacts:
-            st.subheader("Edit Contact")
-            contact_options = {f"{c['name']} ({c['phone']})": c for c in contacts}
-            selected = st.selectbox("Select contact to edit", list(contact_options.keys()))
-        
-            contact = contact_options[selected]
-        
-            # Initialize edit form data in session state if not exists or if contact changed
-            if ('edit_form_data' not in st.session_state or 
-                st.session_state.get('last_edited_contact') != contact["id"]):
-                st.session_state.edit_form_data = {
-                    'name': contact["name"],
-                    'phone': contact["phone"],
-                    'email': contact["email"] if contact["email"] else ""
-                }
-                st.session_state.last_edited_contact = contact["id"]
-        
-            with st.form("edit_form"):
-                cols = st.columns(2)
-                with cols[0]:
-                    new_name = st.text_input("Name*", value=st.session_state.edit_form_data['name'])
-                with cols[1]:
-                    new_phone = st.text_input("Phone*", value=st.session_state.edit_form_data['phone'])
-                new_email = st.text_input("Email", value=st.session_state.edit_form_data['email'])
-            
-                submitted = st.form_submit_button("🔄 Update Contact", use_container_width=True)
-            
-            if submitted:
-                # Store form data in session state to preserve values if validation fails
-                st.session_state.edit_form_data = {
-                    'name': new_name,
-                    'phone': new_phone,
-                    'email': new_email
-                }
-                
-                # Validate inputs
-                phone_valid, phone_msg = validate_phone(new_phone)
-                email_valid, email_msg = validate_email(new_email)
-                
-                validation_passed = True
-                
-                if not new_name:
-                    st.error("Name is required!")
-                    validation_passed = False
-                    
-                if not new_phone:
-                    st.error("Phone is required!")
-                    validation_passed = False
-                elif not phone_valid:
-                    st.error(phone_msg)
-                    validation_passed = False
-                    
-                if new_email and not email_valid:
-                    st.error(email_msg)
-                    validation_passed = False
-                
-                # Only proceed if all validations pass
-                if validation_passed:
-                    try:
-                        success, message = st.session_state.db_ops.update_contact(
-                            st.session_state.current_user, contact["id"], new_name, new_phone, new_email
-                        )
-                        if success:
-                            st.success(message)
-                            invalidate_contacts_cache()  # Mark cache as invalid
-                            # Clear the edit form data to force refresh on next edit
-                            if 'edit_form_data' in st.session_state:
-                                del st.session_state.edit_form_data
-                            if 'last_edited_contact' in st.session_state:
-                                del st.session_state.last_edited_contact
-                            st.rerun()
-                        else:
-                            st.error(message)
-                    except Exception as e:
-                        st.error(f"An unexpected error occurred: {str(e)}")
-        else:
-            st.warning("No contacts available to edit")
-
-    # Search Contacts
-    elif action == "Search Contacts":
-        st.subheader("Search Contacts")
-        search_by = st.radio("Search by", ["All fields", "Name only", "Phone only", "Email only"], horizontal=True)
-        search_term = st.text_input("Enter search term", "")
-        
-        if search_term:
-            # Always search directly in database for accurate results
-            results = st.session_state.db_ops.search_contacts(st.session_state.current_user, search_term)
-            
-            # Filter results based on search_by selection
-            if search_by == "Name only":
-                results = [r for r in results if search_term.lower() in r["name"].lower()]
-            elif search_by == "Phone only":
-                results = [r for r in results if search_term in r["phone"]]
-            elif search_by == "Email only":
-                results = [r for r in results if r["email"] and search_term.lower() in r["email"].lower()]
-            
-            if results:
-                st.success(f"Found {len(results)} matching contacts")
-                # Convert to list of dictionaries for display
-                display_data = []
-                for contact in results:
-                    display_data.append({
-                        "id": contact["id"],
-                        "name": contact["name"],
-                        "phone": contact["phone"],
-                        "email": contact["email"],
-                        "date_added": contact["date_added"].strftime("%Y-%m-%d %H:%M") if contact["date_added"] else ""
-                    })
-                
-                st.dataframe(
-                    display_data,
-                    column_config={
-                        "id": {"label": "ID", "width": "small"},
-                        "name": {"label": "Name", "width": "medium"},
-                        "phone": {"label": "Phone", "width": "medium"},
-                        "email": {"label": "Email", "width": "large"},
-                        "date_added": {"label": "Date Added", "width": "medium"}
-                    },
-                    use_container_width=True,
-                    hide_index=True
-                )
-            else:
-                st.warning("No contacts found matching your search")
-        else:
-            st.info("Enter a search term to find contacts")
-
-# App flow control
-if 'logged_in' not in st.session_state or not st.session_state.logged_in:
-    login_page()
-else:
-    contact_manager()
\ No newline at end of file
+import streamlit as st
+from datetime import datetime,timedelta
+import os
+import time as t1
+import re
+# Start of this script run; imports below are only slow on the process's first run
+script_started = t1.perf_counter()
+from operations import ContactOperations, PICKER_LIMIT
+from validation import validate_name, validate_phone, validate_email
+from search_index import SEARCH_RESULT_LIMIT
+from importer import ContactImporter, DEFAULT_BATCH_SIZE
+from dedupe import DuplicateFinder, merge_cluster
+from throttle import LIMITS as LOGIN_LIMITS
+from passwords import PasswordHasherBusy
+from exporter import ContactExporter, FORMATS as EXPORT_FORMATS
+import views
+from views import ITEMS_PER_PAGE, SEARCH_FIELDS, SORT_OPTIONS
+import metrics
+
+metrics.record_startup("imports", t1.perf_counter() - script_started)
+
+# Page config with improved theme
+st.set_page_config(
+    page_title="Professional Contact Manager",
+    page_icon="📇",
+    layout="wide",
+    initial_sidebar_state="expanded"
+)
+
+# Timing breakdown of this rerun (see show_debug_panel) and the optional /metrics endpoint
+rerun_trace = metrics.begin_rerun()
+DEBUG_PANEL = os.environ.get("CONTACTS_DEBUG_PANEL") == "1"
+
+if 'login_attempts' not in st.session_state:
+    st.session_state.login_attempts = 0
+if 'account_locked' not in st.session_state:
+    st.session_state.account_locked = False
+if 'lock_time' not in st.session_state:
+    st.session_state.lock_time = None
+
+# Custom CSS for enhanced UI
+st.markdown("""
+    <style>
+        .main {
+            background-color: #f8f9fa;
+        }
+        .sidebar .sidebar-content {
+            background-color: #343a40;
+            color: white;
+        }
+        .stButton>button {
+            border-radius: 8px;
+            padding: 8px 16px;
+            font-weight: 500;
+        }
+        .stTextInput>div>div>input {
+            border-radius: 8px;
+        }
+        .stSelectbox>div>div>select {
+            border-radius: 8px;
+        }
+        .header {
+            color: #4a4a4a;
+        }
+        .success-message {
+            color: #28a745;
+            font-weight: 500;
+        }
+        .error-message {
+            color: #dc3545;
+            font-weight: 500;
+        }
+        .guideline-box {
+            background-color:#121212;
+            border-left: 4px solid #007bff;
+            padding: 1rem;
+            margin: 1rem 0;
+            border-radius: 4px;
+        }
+        .pagination-info {
+            font-size: 0.9rem;
+            color: #6c757d;
+            margin-bottom: 10px;
+        }
+    </style>
+""", unsafe_allow_html=True)
+
+@st.cache_resource(show_spinner=False)
+def bootstrap():
+    """Once per process: schema migrations, the /metrics endpoint and the ContactOperations every session shares"""
+    started = t1.perf_counter()
+    metrics.serve()
+    db_ops = ContactOperations()
+    metrics.record_startup("bootstrap", t1.perf_counter() - started)
+    return db_ops
+
+# Initialize database operations
+if 'db_ops' not in st.session_state:
+    st.session_state.db_ops = bootstrap()
+
+# Validation functions
+def validate_username(username):
+    if len(username) < 3:
+        return False, "Username must be at least 3 characters long"
+    if not re.match(r'^[a-zA-Z0-9_]+$', username):
+        return False, "Username can only contain letters, numbers, and underscores"
+    return True, ""
+
+def validate_password(password):
+    if len(password) < 6:
+        return False, "Password must be at least 6 characters long"
+    return True, ""
+
+# Export functions
+def prepare_export(file_format):
+    """Write (or reuse) the export file for the current data version"""
+    # Callbacks run before the script body, so this starts the rerun's trace
+    metrics.begin_rerun()
+    exporter = ContactExporter(st.session_state.db_ops)
+    with metrics.section("export"):
+        path, version = exporter.export_file(st.session_state.current_user, file_format)
+    if path:
+        st.session_state[f"export_{file_format}"] = (path, version)
+    else:
+        st.error("Could not export contacts, please try again")
+
+def export_buttons():
+    """Exports are generated only when requested, then offered for download until the data changes"""
+    current_version = st.session_state.db_ops.get_data_version(st.session_state.current_user)
+    columns = st.columns(len(EXPORT_FORMATS))
+    for column, (file_format, mime) in zip(columns, EXPORT_FORMATS.items()):
+        label = file_format.upper()
+        with column:
+            prepared = st.session_state.get(f"export_{file_format}")
+            if prepared and prepared[1] == current_version and os.path.exists(prepared[0]):
+                with open(prepared[0], "rb") as export_file:
+                    st.download_button(
+                        label=f"Download {label}",
+                        data=export_file,
+                        file_name=f"contacts_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{file_format}",
+                        mime=mime,
+                        use_container_width=True
+                    )
+            else:
+                st.button(f"Export as {label}", on_click=prepare_export, args=(file_format,),
+                          use_container_width=True, key=f"export_{file_format}_btn")
+
+def client_address():
+    """The browser's address, so login throttling also applies per client (None when unknown)"""
+    return getattr(st.context, "ip_address", None)
+
+# Login system
+def login_page():
+    st.markdown("""
+        <style>
+        .login-container {
+            max-width: 400px;
+            margin: 40px auto 0 auto;
+            background: #fff;
+            padding: 2.5rem 2rem 2rem 2rem;
+            border-radius: 16px;
+            box-shadow: 0 4px 24px rgba(0,0,0,0.10);
+        }
+        .timer-warning {
+            background-color: #fff3cd;
+            color: #856404;
+            padding: 12px;
+            border-radius: 8px;
+            border: 1px solid #ffeaa7;
+            margin-bottom: 20px;
+            text-align: center;
+        }
+        </style>
+    """, unsafe_allow_html=True)
+    
+    # Check if account is locked and show timer if needed
+    if st.session_state.account_locked:
+        remaining_time = st.session_state.lock_time - datetime.now()
+        if remaining_time.total_seconds() > 0:
+            minutes, seconds = divmod(int(remaining_time.total_seconds()), 60)
+            
+            # Display lock message and timer
+            st.markdown(f"""
+                <div class="timer-warning">
+                    <h4>🔒 Account Locked</h4>
+                    <p>Too many failed attempts. Please try again After:</p>
+                    <h3>{minutes:02d}:{seconds:02d}</h3>
+                </div>
+            """, unsafe_allow_html=True)
+            
+            # Update the timer every second
+            t1.sleep(1)
+            st.rerun()
+        else:
+            # Lock period has ended
+            st.session_state.account_locked = False
+            st.session_state.login_attempts = 0
+            st.session_state.lock_time = None
+            st.rerun()
+    
+    # Start container
+    container = st.container()
+    with container:
+        st.title("🔐 Contact Manager Pro - Login")
+        st.markdown("---")
+        
+        # Show remaining attempts warning if any failed attempts
+        if st.session_state.login_attempts > 0:
+            remaining_attempts = LOGIN_LIMITS["user"][0] - 1 - st.session_state.login_attempts
+            st.warning(f"⚠️ Access denied.. {remaining_attempts} attempt remaining, your account will be automatically locked for security protection.")
+        
+        with st.form("login_form"):
+            username = st.text_input("Username", placeholder="Enter your username")
+            password = st.text_input("Password", type="password", placeholder="Enter your password")
+            
+            if st.form_submit_button("Login"):
+                if not username and not password:
+                    st.error("Please enter both username and password")
+                elif not username:
+                    st.error("Please enter your username")
+                elif not password:
+                    st.error("Please enter your password")
+                else:
+                    # Failures are counted per username and client by the shared throttle, not per session
+                    try:
+                        success, retry_after, attempts_left = st.session_state.db_ops.login(
+                            username, password, client_address()
+                        )
+                    except PasswordHasherBusy:
+                        # Hashing queue is full; not counted as a failed attempt
+                        success, retry_after, attempts_left = None, 0, None
+                    if success is None:
+                        st.warning("Too many sign-ins in progress, please try again in a moment")
+                    elif success:
+                        st.session_state.logged_in = True
+                        st.session_state.current_user = username
+                        st.session_state.login_attempts = 0
+                        st.success("Login successful!")
+                        st.rerun()
+                    elif retry_after:
+                        st.session_state.account_locked = True
+                        st.session_state.lock_time = datetime.now() + timedelta(seconds=retry_after)
+                        st.error("Too many failed attempts! Account locked for a while.")
+                        st.rerun()
+                    else:
+                        st.session_state.login_attempts = LOGIN_LIMITS["user"][0] - attempts_left
+                        st.error("Invalid username or password")
+        
+        st.markdown("---")
+        st.markdown("Don't have an account? Register below:")
+        
+        if st.session_state.get("registration_success"):
+            st.success("Registration successful! Please login.")
+            st.session_state.registration_success = False
+        
+        with st.expander("Register New Account"):
+            with st.form("register_form"):
+                new_username = st.text_input("New Username", placeholder="Choose a username (min. 3 chars)")
+                new_password = st.text_input("New Password", type="password", placeholder="Choose a password (min. 6 chars)")
+                confirm_password = st.text_input("Confirm Password", type="password", placeholder="Confirm password")
+                
+                if st.form_submit_button("Register"):
+                    # Validate inputs
+                    username_valid, username_msg = validate_username(new_username)
+                    password_valid, password_msg = validate_password(new_password)
+                    
+                    if not username_valid:
+                        st.error(username_msg)
+                    elif not password_valid:
+                        st.error(password_msg)
+                    elif new_password != confirm_password:
+                        st.error("Passwords don't match")
+                    else:
+                        success, message = st.session_state.db_ops.register_user(new_username, new_password)
+                        if success:
+                            st.session_state.registration_success = True
+                            st.rerun()
+                        else:
+                            st.error(message)
+    
+    # Apply the container styling
+    st.markdown(
+        f"""
+        <script>
+            var container = window.parent.document.querySelector('.stContainer');
+            container.classList.add('login-container');
+        </script>
+        """,
+        unsafe_allow_html=True
+    )
+
+# Display contacts in table view with sorting and pagination
+# Pause in typing before the search box sends its text to the server
+SEARCH_DEBOUNCE = "300ms"
+# Duplicate groups listed per scan; each is an expander with its own merge form
+DUPLICATE_GROUP_LIMIT = 50
+
+def next_page():
+    st.session_state.page_index += 1
+
+def previous_page():
+    st.session_state.page_index -= 1
+
+def use_search_suggestion():
+    """Put the clicked suggestion into the search box"""
+    if st.session_state.search_suggestion:
+        st.session_state.search_term = st.session_state.search_suggestion
+    st.session_state.search_suggestion = None
+
+def contact_picker(label, key):
+    """Typeahead picker: the browser only ever gets the top matches for the typed prefix, not every contact"""
+    db_ops = st.session_state.db_ops
+    prefix = st.text_input("Find contact", key=f"{key}_prefix", placeholder="Start of the name or phone number")
+    matches = views.pick_contacts(db_ops, st.session_state.current_user, prefix)
+    if not matches:
+        st.info("No contacts match")
+        return None
+    contact_options = {f"{contact['name']} ({contact['phone']})": contact["id"] for contact in matches}
+    selected = st.selectbox(label, list(contact_options.keys()), key=f"{key}_select")
+    if len(matches) == PICKER_LIMIT:
+        st.caption(f"Showing the first {PICKER_LIMIT} matches, type more to narrow them down")
+    return contact_options[selected]
+
+def display_contacts_table():
+    db_ops = st.session_state.db_ops
+    total_contacts = db_ops.count_contacts(st.session_state.current_user)
+    
+    if total_contacts:
+        # Sorting options
+        sort_option = st.selectbox(
+            "Sort by", 
+            list(SORT_OPTIONS.keys()),
+            key="sort_option"
+        )
+        
+        # Keyset pagination: page_cursors[i] is the cursor that starts page i + 1.
+        # Reset whenever the sort order changes
+        if st.session_state.get("page_sort") != sort_option:
+            st.session_state.page_sort = sort_option
+            st.session_state.page_cursors = [None]
+            st.session_state.page_index = 0
+        
+        page_index = st.session_state.page_index
+        with metrics.section("sort"):
+            # Also remembers where the next page starts
+            page_contacts, next_cursor = views.contacts_page(
+                db_ops, st.session_state.current_user, sort_option, st.session_state.page_cursors, page_index
+            )
+        if not page_contacts and page_index > 0:
+            # Page emptied by deletions, start over
+            st.session_state.page_cursors = [None]
+            st.session_state.page_index = 0
+            st.rerun()
+        
+        total_pages = max(1, (total_contacts + ITEMS_PER_PAGE - 1) // ITEMS_PER_PAGE)
+        start_idx = page_index * ITEMS_PER_PAGE
+        end_idx = start_idx + len(page_contacts)
+        
+        # Display pagination info
+        st.markdown(f'<div class="pagination-info">Showing {start_idx + 1}-{end_idx} of {total_contacts} contacts (page {page_index + 1} of {total_pages})</div>', unsafe_allow_html=True)
+        
+        # Columns for display, with dates rendered as text
+        display_data = views.display_columns(page_contacts)
+        
+        with metrics.section("render"):
+            st.dataframe(
+                display_data,
+                column_config={
+                    "id": {"label": "ID", "width": "small"},
+                    "name": {"label": "Name", "width": "medium"},
+                    "phone": {"label": "Phone", "width": "medium"},
+                    "email": {"label": "Email", "width": "large"},
+                    "date_added": {"label": "Date Added", "width": "medium"}
+                },
+                use_container_width=True,
+                hide_index=True,
+                height=min(40 * len(page_contacts) + 40, 500)
+            )
+        
+        # Pagination controls
+        col_prev, col_next = st.columns(2)
+        with col_prev:
+            st.button("◀ Previous", on_click=previous_page, disabled=page_index == 0,
+                      use_container_width=True, key="prev_page_btn")
+        with col_next:
+            st.button("Next ▶", on_click=next_page, disabled=next_cursor is None,
+                      use_container_width=True, key="next_page_btn")
+        
+        # Export buttons
+        export_buttons()
+    else:
+        st.warning("No contacts found. Add your first contact!")
+
+# Guidelines page
+def show_guidelines():
+    st.subheader("📖 How to Use Contact Manager Pro")
+    
+    st.markdown("""
+    <div class="guideline-box">
+    <h4>Getting Started</h4>
+    <p>Welcome to Contact Manager Pro! This application helps you manage your contacts efficiently.</p>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    with st.expander("View Contacts", expanded=True):
+        st.markdown("""
+        - Navigate to the **View Contacts** section to see all your saved contacts
+        - Use the sorting dropdown to organize contacts by name or date
+        - Use pagination to navigate through large contact lists
+        - Export your contacts as CSV or JSON for backup
+        """)
+    
+    with st.expander("Add New Contacts"):
+        st.markdown("""
+        - Go to the **Add Contact** section to create new entries
+        - Name and Phone fields are required
+        - Email is optional but recommended for complete contact information
+        - Phone numbers are validated for correct format
+        - Click "Save Contact" to add to your database
+        """)
+    
+    with st.expander("Edit Existing Contacts"):
+        st.markdown("""
+        - Select **Edit Contact** from the sidebar
+        - Choose the contact you want to modify from the dropdown
+        - Update any of the fields as needed
+        - Click "Update Contact" to save your changes
+        """)
+    
+    with st.expander("Search Functionality"):
+        st.markdown("""
+        - Use the **Search Contacts** feature to find specific contacts
+        - Search by name, phone number, or email address
+        - Results will appear instantly as you type
+        """)
+    
+    with st.expander("Delete Contacts"):
+        st.markdown("""
+        - Select **Delete Contact** from the sidebar
+        - Choose the contact you want to remove
+        - Confirm deletion - this action cannot be undone
+        - The contact will be permanently removed from your database
+        """)
+    
+    st.markdown("---")
+    st.markdown("### 💡 Pro Tips")
+    st.info("""
+    - Your data is automatically saved and synchronized across sessions
+    - Use descriptive names to make contacts easier to find later
+    - Regularly update contact information to keep your database current
+    - Export your contacts regularly for backup purposes
+    - Use categories to organize your contacts (coming in future versions)
+    """)
+
+# Main app function
+def contact_manager():
+    # Sidebar with user info and actions
+    with st.sidebar:
+        st.title(f"👋 Welcome, {st.session_state.current_user}")
+        st.markdown("---")
+        # Action selector
+        action = st.radio(
+            "Actions",
+            ["View Contacts", "Add Contact", "Edit Contact", "Search Contacts", "Delete Contact", "Import Contacts",
+             "Find Duplicates"],
+            index=0
+        )
+        st.markdown("---")
+        # Quick stats
+        st.markdown("### Quick Stats")
+        total_contacts, latest = views.quick_stats(st.session_state.db_ops, st.session_state.current_user)
+        st.markdown(f"📇 **Total Contacts:** {total_contacts}")
+        if latest:
+            st.markdown(f"🕒 **Last Added:** {latest['name']}")
+        st.markdown("---")
+        
+        # Guidelines button
+        if st.button("📖 Guidelines", use_container_width=True):
+            st.session_state.show_guidelines = True
+        
+        st.markdown("---")
+        if st.button("Logout"):
+            st.session_state.logged_in = False
+            st.session_state.current_user = None
+            st.session_state.show_guidelines = False
+            st.rerun()
+
+    # Main content area
+    st.title("📇 Contact Manager Pro")
+    st.markdown("---")
+
+    # Check if we should show guidelines
+    if st.session_state.get('show_guidelines', False):
+        show_guidelines()
+        if st.button("Back to Main"):
+            st.session_state.show_guidelines = False
+            st.rerun()
+        return
+
+    # View Contacts
+    if action == "View Contacts":
+        st.subheader("All Contacts")
+        display_contacts_table()
+
+    # Delete Contact
+    elif action == "Delete Contact":
+        if st.session_state.db_ops.count_contacts(st.session_state.current_user):
+            st.subheader("Delete a Contact")
+            contact_id = contact_picker("Select contact to delete", "delete")
+            
+            # Add confirmation for deletion
+            if contact_id is None:
+                pass
+            elif st.checkbox("Confirm deletion", key="delete_confirm"):
+                if st.button("Delete Contact", key="delete_contact_btn"):
+                    success, message, _ = st.session_state.db_ops.delete_contact(st.session_state.current_user, contact_id)
+                    if success:
+                        st.success(message)
+                        st.rerun()
+                    else:
+                        st.error(message)
+            else:
+                st.warning("Please check the confirmation box to delete the contact")
+        else:
+            st.warning("No contacts to delete.")
+
+    # Add Contact
+    elif action == "Add Contact":
+            st.subheader("Add New Contact")
+    
+            # Initialize form data in session state if not exists
+            if 'add_form_data' not in st.session_state:
+                st.session_state.add_form_data = {'name': '', 'phone': '', 'email': ''}
+    
+            with st.form("add_form"):
+                cols = st.columns(2)
+                with cols[0]:
+                    name = st.text_input("Name*", placeholder="Enter The Name", 
+                                value=st.session_state.add_form_data['name'])
+                with cols[1]:
+                    phone = st.text_input("Phone*", placeholder="Enter The Phone No", 
+                                 value=st.session_state.add_form_data['phone'])
+                email = st.text_input("Email", placeholder="Enter The Email", 
+                             value=st.session_state.add_form_data['email'])
+        
+                submitted = st.form_submit_button("💾 Save Contact", use_container_width=True)
+        
+                if submitted:
+            # Store form data in session state to preserve values if validation fails
+                    st.session_state.add_form_data = {'name': name, 'phone': phone, 'email': email}
+            
+                # Validate inputs
+                    name_valid, name_msg = validate_name(name)
+                    phone_valid, phone_msg = validate_phone(phone)
+                    email_valid, email_msg = validate_email(email)
+            
+                    validation_passed = True
+            
+                    if not name:
+                        st.error("Name is required!")
+                        validation_passed = False
+                
+                    if not phone:
+                        st.error("Phone is required!")
+                        validation_passed = False
+
+                    elif not name_valid:
+                        st.error(name_msg)
+                        validation_passed = False
+
+                    elif not phone_valid:
+                        st.error(phone_msg)
+                        validation_passed = False
+                
+                    if email and not email_valid:
+                        st.error(email_msg)
+                        validation_passed = False
+            
+                    # Only proceed if all validations pass
+                    if validation_passed:
+                        try:
+                            success, message, _ = st.session_state.db_ops.add_contact(
+                                st.session_state.current_user, name, phone, email
+                                 )
+                            if success:
+                                st.success(message)
+                                # Clear form data after successful submission
+                                st.session_state.add_form_data = {'name': '', 'phone': '', 'email': ''}
+                                # Rerun to refresh the form with empty values
+                                st.rerun()
+                            else:
+                                st.error(message)
+                        except Exception as e:
+                            st.error(f"An unexpected error occurred: {str(e)}")
+
+    # Edit Contact
+    elif action == "Edit Contact":
+        if st.session_state.db_ops.count_contacts(st.session_state.current_user):
+            st.subheader("Edit Contact")
+            contact_id = contact_picker("Select contact to edit", "edit")
+            contact = None
+            if contact_id is not None:
+                contact = st.session_state.db_ops.get_contact(st.session_state.current_user, contact_id)
+            if contact is None:
+                return
+        
+            # Initialize edit form data in session state if not exists or if contact changed
+            if ('edit_form_data' not in st.session_state or 
+                st.session_state.get('last_edited_contact') != contact["id"]):
+                st.session_state.edit_form_data = {
+                    'name': contact["name"],
+                    'phone': contact["phone"],
+                    'email': contact["email"] if contact["email"] else ""
+                }
+                st.session_state.last_edited_contact = contact["id"]
+        
+            with st.form("edit_form"):
+                cols = st.columns(2)
+                with cols[0]:
+                    new_name = st.text_input("Name*", value=st.session_state.edit_form_data['name'])
+                with cols[1]:
+                    new_phone = st.text_input("Phone*", value=st.session_state.edit_form_data['phone'])
+                new_email = st.text_input("Email", value=st.session_state.edit_form_data['email'])
+            
+                submitted = st.form_submit_button("🔄 Update Contact", use_container_width=True)
+            
+            if submitted:
+                # Store form data in session state to preserve values if validation fails
+                st.session_state.edit_form_data = {
+                    'name': new_name,
+                    'phone': new_phone,
+                    'email': new_email
+                }
+                
+                # Validate inputs
+                phone_valid, phone_msg = validate_phone(new_phone)
+                email_valid, email_msg = validate_email(new_email)
+                
+                validation_passed = True
+                
+                if not new_name:
+                    st.error("Name is required!")
+                    validation_passed = False
+                    
+                if not new_phone:
+                    st.error("Phone is required!")
+                    validation_passed = False
+                elif not phone_valid:
+                    st.error(phone_msg)
+                    validation_passed = False
+                    
+                if new_email and not email_valid:
+                    st.error(email_msg)
+                    validation_passed = False
+                
+                # Only proceed if all validations pass
+                if validation_passed:
+                    try:
+                        success, message, _ = st.session_state.db_ops.update_contact(
+                            st.session_state.current_user, contact["id"], new_name, new_phone, new_email
+                        )
+                        if success:
+                            st.success(message)
+                            # Clear the edit form data to force refresh on next edit
+                            if 'edit_form_data' in st.session_state:
+                                del st.session_state.edit_form_data
+                            if 'last_edited_contact' in st.session_state:
+                                del st.session_state.last_edited_contact
+                            st.rerun()
+                        else:
+                            st.error(message)
+                    except Exception as e:
+                        st.error(f"An unexpected error occurred: {str(e)}")
+        else:
+            st.warning("No contacts available to edit")
+
+    # Search Contacts
+    elif action == "Search Contacts":
+        st.subheader("Search Contacts")
+        search_by = st.radio("Search by", list(SEARCH_FIELDS.keys()), horizontal=True)
+        # Typing is debounced in the browser; each pause reruns with the term so far
+        search_term = st.text_input("Enter search term", key="search_term", live=SEARCH_DEBOUNCE)
+        
+        if search_term:
+            # Field scoping and ranking happen inside the search index
+            suggestions, results = views.search(
+                st.session_state.db_ops, st.session_state.current_user, search_term, SEARCH_FIELDS[search_by]
+            )
+            if suggestions:
+                st.pills(
+                    "Suggestions",
+                    [text for text, _ in suggestions],
+                    format_func=lambda text: f"{text} ({dict(suggestions)[text]})",
+                    key="search_suggestion",
+                    on_change=use_search_suggestion,
+                    label_visibility="collapsed"
+                )
+            
+            if results:
+                if len(results) == SEARCH_RESULT_LIMIT:
+                    st.success(f"Showing the top {len(results)} matching contacts, refine your search to narrow it down")
+                else:
+                    st.success(f"Found {len(results)} matching contacts")
+                display_data = views.display_columns(results)
+                
+                with metrics.section("render"):
+                    st.dataframe(
+                        display_data,
+                        column_config={
+                            "id": {"label": "ID", "width": "small"},
+                            "name": {"label": "Name", "width": "medium"},
+                            "phone": {"label": "Phone", "width": "medium"},
+                            "email": {"label": "Email", "width": "large"},
+                            "date_added": {"label": "Date Added", "width": "medium"}
+                        },
+                        use_container_width=True,
+                        hide_index=True
+                    )
+            else:
+                st.warning("No contacts found matching your search")
+        else:
+            st.info("Enter a search term to find contacts")
+
+    # Import Contacts
+    elif action == "Import Contacts":
+        import_contacts_page()
+
+    # Find Duplicates
+    elif action == "Find Duplicates":
+        duplicates_page()
+
+# Bulk import from CSV / vCard
+def import_contacts_page():
+    st.subheader("Import Contacts")
+    st.markdown("Upload a **CSV** file with `name`, `phone` and (optional) `email` columns, or a **vCard** (.vcf) export.")
+    
+    uploaded_file = st.file_uploader("Contacts file", type=["csv", "vcf"])
+    batch_size = st.number_input("Batch size", min_value=100, max_value=10000, value=DEFAULT_BATCH_SIZE, step=100)
+    
+    if uploaded_file and st.button("📥 Import", use_container_width=True):
+        progress_text = st.empty()
+        
+        def show_progress(report):
+            progress_text.info(f"{report.total} rows read, {report.inserted} imported ({report.rows_per_second:.0f} rows/s)")
+        
+        importer = ContactImporter(st.session_state.db_ops, batch_size=int(batch_size))
+        try:
+            report = importer.import_upload(st.session_state.current_user, uploaded_file, progress=show_progress)
+        except ValueError as e:
+            st.error(str(e))
+            return
+        
+        progress_text.empty()
+        st.success(report.summary())
+        if report.rejects:
+            st.warning(f"{len(report.rejects)} rows were not imported")
+            st.dataframe(
+                [{"line": line_no, "reason": reason} for line_no, reason in report.rejects[:1000]],
+                use_container_width=True,
+                hide_index=True
+            )
+
+# Duplicate groups found by the last scan, offered for merging one group at a time
+def duplicates_page():
+    st.subheader("Find Duplicates")
+    st.markdown("Finds contacts sharing a phone number (in any format) or email, and names that are the same or sound alike.")
+    db_ops = st.session_state.db_ops
+    username = st.session_state.current_user
+    version = db_ops.get_data_version(username)
+    
+    if st.button("🔍 Scan for duplicates", use_container_width=True):
+        finder = DuplicateFinder(db_ops)
+        with metrics.section("dedupe"):
+            clusters = finder.find(username)
+        st.session_state.duplicate_scan = {
+            "version": version, "clusters": clusters, "scanned": finder.scanned, "elapsed": finder.elapsed
+        }
+    
+    scan = st.session_state.get("duplicate_scan")
+    if scan is None:
+        st.info("Scan your contacts to look for duplicates")
+        return
+    if scan.pop("merged", None):
+        st.success(scan["message"])
+    if scan["version"] != version:
+        st.warning("Your contacts changed since the last scan, scan again to see current duplicates")
+        return
+    
+    clusters = scan["clusters"]
+    if not clusters:
+        st.success(f"No duplicates found among {scan['scanned']} contacts")
+        return
+    st.markdown(f"**{len(clusters)}** groups of possible duplicates among {scan['scanned']} contacts "
+                f"(scanned in {scan['elapsed']:.1f}s)")
+    if len(clusters) > DUPLICATE_GROUP_LIMIT:
+        st.caption(f"Showing the first {DUPLICATE_GROUP_LIMIT}; merge these and scan again for the rest")
+    
+    for cluster in clusters[:DUPLICATE_GROUP_LIMIT]:
+        group = cluster.contacts[0]["id"]
+        title = f"{cluster.contacts[0]['name']}: {len(cluster)} contacts ({', '.join(sorted(cluster.reasons))})"
+        with st.expander(title, expanded=cluster.certain):
+            st.dataframe(
+                views.display_columns(cluster.contacts),
+                use_container_width=True,
+                hide_index=True
+            )
+            contacts = {contact["id"]: contact for contact in cluster.contacts}
+            keep_id = st.radio(
+                "Keep",
+                list(contacts),
+                format_func=lambda contact_id, contacts=contacts: f"{contacts[contact_id]['name']} ({contacts[contact_id]['phone']})",
+                key=f"duplicate_keep_{group}",
+                horizontal=True
+            )
+            if st.button("Merge into the kept contact", key=f"duplicate_merge_{group}"):
+                success, message = merge_cluster(db_ops, username, cluster, keep_id)
+                if success:
+                    clusters.remove(cluster)
+                    scan.update(version=db_ops.get_data_version(username), merged=True, message=message)
+                    st.rerun()
+                else:
+                    st.error(message)
+
+def show_debug_panel(trace):
+    """Where this rerun's time went; enabled with CONTACTS_DEBUG_PANEL=1 or ?debug=1 in the URL"""
+    if not (DEBUG_PANEL or st.query_params.get("debug") == "1"):
+        return
+    with st.sidebar.expander("🛠️ Debug: this rerun"):
+        st.markdown(
+            f"**Total:** {trace.elapsed * 1000:.1f} ms  \n"
+            f"**Queries:** {trace.queries} ({trace.db_time * 1000:.1f} ms in the database)  \n"
+            f"**Rows fetched:** {trace.rows}"
+        )
+        startup = metrics.startup_times()
+        if startup:
+            st.caption("Process startup: " + ", ".join(f"{phase} {seconds * 1000:.0f} ms" for phase, seconds in startup.items()))
+        if trace.sections:
+            st.caption("Sections (including their queries)")
+            st.dataframe(
+                [{"section": name, "ms": round(seconds * 1000, 2)} for name, seconds in sorted(trace.sections.items())],
+                use_container_width=True,
+                hide_index=True
+            )
+        if trace.operations:
+            st.caption("Operations")
+            st.dataframe(
+                [{"operation": name, "calls": calls, "ms": round(seconds * 1000, 2)}
+                 for name, (calls, seconds) in sorted(trace.operations.items(), key=lambda item: -item[1][1])],
+                use_container_width=True,
+                hide_index=True
+            )
+
+# App flow control
+try:
+    if 'logged_in' not in st.session_state or not st.session_state.logged_in:
+        login_page()
+    else:
+        contact_manager()
+    show_debug_panel(rerun_trace)
+finally:
+    metrics.end_rerun()
+    metrics.record_startup("first_render", t1.perf_counter() - script_started)
+    metrics.write_prometheus()
\ No newline at end of file
@@ -0,0 +1,133 @@
+"""Fill phone_e164 / email_norm on existing contacts, then add their unique keys.
+
+Migration 4 adds the canonical columns and every write fills them, so only rows
+from before the upgrade need this. Runs online in small batches by id; tables that
+already have both unique keys are skipped, so it can be stopped and re-run.
+
+Rows whose canonical phone or email collides with an older contact (for example
+"+91 98765-43210" next to "9876543210") keep NULL in that column and are listed,
+so the duplicates can be merged without blocking the unique key.
+
+    python backfill_canonical.py
+    python backfill_canonical.py --batch-size 500 --pause 0.05
+"""
+import argparse
+import time
+
+from database import Database, SHARED_CONTACTS_TABLE
+from storage import CANONICAL_KEYS, Error, IntegrityError
+from validation import normalize_email, phone_e164
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+class CanonicalBackfill:
+    def __init__(self, db, batch_size=DEFAULT_BATCH_SIZE, pause=0.0):
+        self.db = db
+        self.batch_size = batch_size
+        self.pause = pause  # seconds to sleep between batches to leave room for live traffic
+
+    def tables(self):
+        """Contacts tables still missing a canonical unique key"""
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            return [
+                table for table in self.db.backend.table_names(cursor)
+                if (table == SHARED_CONTACTS_TABLE or table.startswith("contacts_"))
+                and self.db.backend.missing_index_sql(cursor, table, CANONICAL_KEYS, self._owner(table), unique=True)
+            ]
+
+    @staticmethod
+    def _owner(table):
+        return "user_id, " if table == SHARED_CONTACTS_TABLE else ""
+
+    def fill_table(self, table):
+        """Compute the canonical columns for rows that lack them; returns the number of rows updated"""
+        last_id, updated = 0, 0
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            while True:
+                cursor.execute(
+                    f"SELECT id, phone, email FROM {table} "
+                    "WHERE id > %s AND (phone_e164 IS NULL OR (email IS NOT NULL AND email_norm IS NULL)) "
+                    "ORDER BY id LIMIT %s",
+                    (last_id, self.batch_size)
+                )
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+                last_id = rows[-1][0]
+                # Phones that do not validate stay NULL; the raw unique key still covers them
+                values = [(phone_e164(phone), normalize_email(email), contact_id) for contact_id, phone, email in rows]
+                values = [value for value in values if value[0] or value[1]]
+                if values:
+                    conn.start_transaction()
+                    cursor.executemany(
+                        f"UPDATE {table} SET phone_e164 = %s, email_norm = %s WHERE id = %s", values
+                    )
+                    conn.commit()
+                    updated += len(values)
+                if self.pause:
+                    time.sleep(self.pause)
+        return updated
+
+    def clear_duplicates(self, table):
+        """NULL the canonical value on every newer contact sharing it; returns [(column, value, id), ...]"""
+        owner = self._owner(table)
+        cleared = []
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            for column in CANONICAL_KEYS.values():
+                cursor.execute(
+                    f"SELECT {owner}{column}, MIN(id) FROM {table} WHERE {column} IS NOT NULL "
+                    f"GROUP BY {owner}{column} HAVING COUNT(*) > 1"
+                )
+                for row in cursor.fetchall():
+                    *key, keep_id = row
+                    condition = "user_id = %s AND " if owner else ""
+                    cursor.execute(
+                        f"SELECT id FROM {table} WHERE {condition}{column} = %s AND id <> %s", tuple(key) + (keep_id,)
+                    )
+                    ids = [duplicate_id for duplicate_id, in cursor.fetchall()]
+                    cursor.executemany(f"UPDATE {table} SET {column} = NULL WHERE id = %s", [(i,) for i in ids])
+                    cleared += [(column, key[-1], duplicate_id) for duplicate_id in ids]
+        return cleared
+
+    def add_unique_keys(self, table):
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            for statement in self.db.backend.missing_index_sql(
+                cursor, table, CANONICAL_KEYS, self._owner(table), unique=True
+            ):
+                cursor.execute(statement)
+
+    def run(self):
+        for table in self.tables():
+            updated = self.fill_table(table)
+            cleared = self.clear_duplicates(table)
+            for column, value, contact_id in cleared:
+                print(f"{table}: contact {contact_id} duplicates {column} {value}, left NULL")
+            try:
+                self.add_unique_keys(table)
+                status = "unique keys added"
+            except IntegrityError:
+                # A write created a duplicate between the check and the index build
+                status = "new duplicates appeared, run again"
+            print(f"{table}: {updated} rows filled, {len(cleared)} duplicates, {status}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill the canonical phone / email columns of existing contacts")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Rows updated per transaction")
+    parser.add_argument("--pause", type=float, default=0.0, help="Seconds to sleep between batches")
+    args = parser.parse_args()
+
+    try:
+        CanonicalBackfill(Database(), args.batch_size, args.pause).run()
+    except Error as e:
+        print(f"Backfill failed: {e}")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,4 @@
+"""Benchmarks for the contact operations on synthetic address books.
+
+Run with ``python -m benchmarks.run``; see benchmarks/run.py for the options.
+"""
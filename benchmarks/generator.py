@@ -0,0 +1,48 @@
+import random
+
+FIRST_NAMES = (
+    "Aarav", "Vivaan", "Aditya", "Vihaan", "Arjun", "Sai", "Reyansh", "Ayaan", "Krishna", "Ishaan",
+    "Shaurya", "Atharv", "Advik", "Pranav", "Rohan", "Kabir", "Ananya", "Diya", "Saanvi", "Aadhya",
+    "Pari", "Anika", "Navya", "Myra", "Sara", "Ira", "Riya", "Kavya", "Meera", "Priya",
+    "Neha", "Pooja", "Sneha", "Vishal", "Rahul", "Amit", "Suresh", "Lakshmi", "Deepa", "Karthik",
+)
+LAST_NAMES = (
+    "Sharma", "Verma", "Gupta", "Patel", "Reddy", "Nair", "Iyer", "Menon", "Rao", "Singh",
+    "Kumar", "Das", "Bose", "Chatterjee", "Mukherjee", "Joshi", "Kulkarni", "Desai", "Mehta", "Shah",
+    "Pillai", "Naidu", "Chopra", "Malhotra", "Kapoor", "Khanna", "Agarwal", "Bansal", "Jain", "D'Souza",
+)
+EMAIL_DOMAINS = ("gmail.com", "yahoo.co.in", "outlook.com", "rediffmail.com", "example.org")
+
+# Share of generated contacts that have an email address
+EMAIL_RATE = 0.7
+
+# Two-digit mobile prefixes: 6-9, except "91" which the validator strips as a country code
+PHONE_PREFIXES = tuple(str(p) for p in range(60, 100) if p != 91)
+PHONE_SPACE = len(PHONE_PREFIXES) * 10 ** 8
+# Coprime to PHONE_SPACE, so i -> i * PHONE_STRIDE mod PHONE_SPACE is a bijection: phones
+# are unique without tracking them but still look scattered
+PHONE_STRIDE = 7 ** 11
+
+
+def phone_for(i, seed=0):
+    """The i-th unique 10-digit Indian mobile number"""
+    n = ((i + seed * 7919) * PHONE_STRIDE) % PHONE_SPACE
+    return f"{PHONE_PREFIXES[n // 10 ** 8]}{n % 10 ** 8:08d}"
+
+
+def contact_for(i, seed=0):
+    """The i-th synthetic contact as a (name, phone, email) tuple; the same (i, seed) always gives the same contact"""
+    rng = random.Random(seed * 1_000_003 + i)
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    email = None
+    if rng.random() < EMAIL_RATE:
+        # The index keeps emails unique even when names repeat
+        local = f"{first}.{last}".lower().replace("'", "")
+        email = f"{local}{i}@{rng.choice(EMAIL_DOMAINS)}"
+    return f"{first} {last}", phone_for(i, seed), email
+
+
+def generate_contacts(count, seed=0, start=0):
+    """Yield `count` synthetic contacts starting at index `start`; all pass the app's validators"""
+    for i in range(start, start + count):
+        yield contact_for(i, seed)
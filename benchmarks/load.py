@@ -0,0 +1,469 @@
+"""Load test: concurrent virtual users replaying app.py's page flows against one process.
+
+    python -m benchmarks.load --users 10 50 100 --duration 60
+    python -m benchmarks.load --users 200 --think exp --think-ms 3000 --output load.json
+
+Each virtual user is one session: it logs in to its own seeded account, then
+repeatedly picks an action by weight (view, page, sort, search, add, edit,
+delete) and waits a think time before the next one. An action is the sequence
+of reruns app.py goes through for it (switching page, typing into the picker,
+submitting the form, the st.rerun() after a write), and each rerun goes through
+the same views.py functions as app.py, including the sidebar's quick stats. The
+users share this process's connection pool, contact cache, search indexes,
+login throttle and hashing pool, as Streamlit sessions share a server process.
+Streamlit's AppTest cannot stand in for the sessions: it swaps a process-wide
+runtime in and out around every run, so only one can run at a time.
+
+Every --users value is a step of --duration seconds, with logins spread over
+--ramp seconds. For each step the report gives per-action latency percentiles
+and error rates (an operation that failed or returned an error message), plus
+connection pool usage and process memory sampled while it runs. With
+--max-error-rate the exit status is 1 if any step exceeds it.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks.generator import FIRST_NAMES, LAST_NAMES, contact_for
+from benchmarks.run import percentile, seed_address_book
+
+DEFAULT_USERS = (10, 50, 100)
+DEFAULT_CONTACTS = 1000
+PASSWORD = "benchmark"  # seed_address_book registers users with this password
+# Relative frequency of each action once logged in
+ACTION_WEIGHTS = {
+    "view": 30,
+    "page": 20,
+    "sort": 10,
+    "search": 20,
+    "add": 8,
+    "edit": 7,
+    "delete": 5,
+}
+SAMPLE_INTERVAL = 0.1
+# Error messages kept per action in the report
+ERROR_SAMPLES = 5
+
+
+def rss_bytes():
+    """Resident memory of this process (peak RSS where /proc is unavailable)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class ActionError(Exception):
+    pass
+
+
+class VirtualUser:
+    """One browser session of `username`, with the session state app.py keeps between reruns"""
+
+    def __init__(self, ops, username, contacts, next_index, rng):
+        # Imported late (like operations.py) so DB_BACKEND / SQLITE_PATH set by main() are seen
+        from views import SORT_OPTIONS
+
+        self.ops = ops
+        self.username = username
+        self.contacts = contacts
+        self.next_index = next_index  # shared per account, so re-added phones never collide across steps
+        self.rng = rng
+        self.page = None
+        self.sort = next(iter(SORT_OPTIONS))  # the selectbox's default
+        self.page_cursors = [None]
+        self.page_index = 0
+        self.search_term = ""
+        self.picker_prefix = ""
+        self.added = []  # phones added by this user and not yet deleted
+
+    @staticmethod
+    def _check(result):
+        success, message = result[0], result[1]
+        if not success:
+            raise ActionError(message)
+        return result
+
+    def _rerun(self, page, body=None):
+        """One script run of the logged-in app on `page`, through the same views.py calls; `body` does the page's work"""
+        import metrics
+        import views
+
+        metrics.begin_rerun()
+        try:
+            views.quick_stats(self.ops, self.username)
+            if page == "View Contacts":
+                if self.ops.count_contacts(self.username):
+                    rows, _ = views.contacts_page(self.ops, self.username, self.sort, self.page_cursors, self.page_index)
+                    if not rows and self.page_index:
+                        self.page_cursors, self.page_index = [None], 0
+                    views.display_columns(rows)
+                    self.ops.get_data_version(self.username)  # export buttons
+            elif page == "Search Contacts" and self.search_term:
+                _, results = views.search(self.ops, self.username, self.search_term)
+                views.display_columns(results)
+            elif page in ("Edit Contact", "Delete Contact") and self.ops.count_contacts(self.username):
+                # The picker selects the first match; the edit form loads that contact
+                matches = views.pick_contacts(self.ops, self.username, self.picker_prefix)
+                picked = matches[0]["id"] if matches else None
+                if page == "Edit Contact" and picked is not None:
+                    picked = self.ops.get_contact(self.username, picked)
+                if body:
+                    body(picked)
+            elif body:
+                body()
+        finally:
+            metrics.end_rerun()
+
+    def _goto(self, page):
+        if self.page != page:
+            if page in ("Edit Contact", "Delete Contact"):
+                self.picker_prefix = ""
+            self._rerun(page)
+            self.page = page
+
+    def login(self):
+        from passwords import PasswordHasherBusy
+
+        try:
+            success, retry_after, _ = self.ops.login(self.username, PASSWORD)
+        except PasswordHasherBusy as e:
+            raise ActionError(f"hashing queue full: {e}")
+        if not success:
+            raise ActionError(f"login rejected (retry after {retry_after:.0f}s)" if retry_after else "login failed")
+        self.page = None
+        self._rerun("View Contacts")
+        self.page = "View Contacts"
+
+    def view(self):
+        if self.page == "View Contacts":
+            self._rerun("View Contacts")
+        self._goto("View Contacts")
+
+    def page_through(self):
+        self._goto("View Contacts")
+        if self.page_index + 1 < len(self.page_cursors):
+            self.page_index += 1
+        elif self.page_index:
+            self.page_index -= 1
+        self._rerun("View Contacts")
+
+    def change_sort(self):
+        from views import SORT_OPTIONS
+
+        self._goto("View Contacts")
+        self.sort = self.rng.choice([option for option in SORT_OPTIONS if option != self.sort])
+        self.page_cursors, self.page_index = [None], 0
+        self._rerun("View Contacts")
+
+    def search(self):
+        self._goto("Search Contacts")
+        kind = self.rng.randrange(3)
+        if kind == 0:
+            self.search_term = self.rng.choice(FIRST_NAMES)
+        elif kind == 1:
+            self.search_term = self.rng.choice(LAST_NAMES)[:3]
+        else:
+            self.search_term = contact_for(self.rng.randrange(self.contacts))[1][2:7]
+        self._rerun("Search Contacts")
+
+    def add(self):
+        from validation import validate_email, validate_name, validate_phone
+
+        self._goto("Add Contact")
+        with self.next_index["lock"]:
+            index = self.next_index[self.username]
+            self.next_index[self.username] += 1
+        name, phone, email = contact_for(index)
+
+        def submit():
+            checks = [validate_name(name), validate_phone(phone)] + ([validate_email(email)] if email else [])
+            for valid, message in checks:
+                if not valid:
+                    raise ActionError(message)
+            self._check(self.ops.add_contact(self.username, name, phone, email or ""))
+
+        self._rerun("Add Contact", submit)
+        self._rerun("Add Contact")  # st.rerun() after the write
+        self.added.append(phone)
+
+    def edit(self):
+        """Rename a random seeded contact, found by typing its phone number into the picker"""
+        self._goto("Edit Contact")
+        self.picker_prefix = contact_for(self.rng.randrange(self.contacts))[1]
+        self._rerun("Edit Contact")
+        new_name = f"{self.rng.choice(FIRST_NAMES)} {self.rng.choice(LAST_NAMES)}"
+
+        def submit(contact):
+            if contact is None:
+                raise ActionError(f"no contact with phone {self.picker_prefix}")
+            self._check(self.ops.update_contact(
+                self.username, contact["id"], new_name, contact["phone"], contact["email"] or ""
+            ))
+
+        self._rerun("Edit Contact", submit)
+        self._rerun("Edit Contact")
+
+    def delete(self):
+        """Delete a contact this user added, so the seeded address book keeps its size"""
+        self._goto("Delete Contact")
+        self.picker_prefix = self.added.pop()
+        self._rerun("Delete Contact")  # typed the phone
+        self._rerun("Delete Contact")  # ticked the confirmation
+
+        def submit(contact_id):
+            if contact_id is None:
+                raise ActionError(f"no contact with phone {self.picker_prefix}")
+            self._check(self.ops.delete_contact(self.username, contact_id))
+
+        self._rerun("Delete Contact", submit)
+        self._rerun("Delete Contact")
+
+    def next_action(self):
+        actions = [name for name in ACTION_WEIGHTS if name != "delete" or self.added]
+        return self.rng.choices(actions, [ACTION_WEIGHTS[name] for name in actions])[0]
+
+    def perform(self, name):
+        method = {"page": self.page_through, "sort": self.change_sort}.get(name) or getattr(self, name)
+        method()
+
+
+class Recorder:
+    """Latencies and errors per action, shared by the virtual users of one step"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = {}
+        self.errors = {}
+        self.error_samples = {}
+
+    def record(self, action, seconds, error=None):
+        with self._lock:
+            self.latencies.setdefault(action, []).append(seconds)
+            if error is not None:
+                self.errors[action] = self.errors.get(action, 0) + 1
+                samples = self.error_samples.setdefault(action, [])
+                if len(samples) < ERROR_SAMPLES:
+                    samples.append(error)
+
+    def summary(self):
+        with self._lock:
+            result = {}
+            for action, values in sorted(self.latencies.items()):
+                values = sorted(values)
+                errors = self.errors.get(action, 0)
+                result[action] = {
+                    "count": len(values),
+                    "errors": errors,
+                    "error_rate": round(errors / len(values), 4),
+                    "p50_ms": round(percentile(values, 50) * 1000, 1),
+                    "p95_ms": round(percentile(values, 95) * 1000, 1),
+                    "p99_ms": round(percentile(values, 99) * 1000, 1),
+                }
+                if action in self.error_samples:
+                    result[action]["error_samples"] = self.error_samples[action]
+            return result
+
+
+class Sampler(threading.Thread):
+    """Peak pool usage and memory while a step runs"""
+
+    def __init__(self, ops):
+        super().__init__(daemon=True)
+        self.ops = ops
+        self.stop = threading.Event()
+        self.peak_in_use = self.peak_waiting = self.peak_rss = 0
+
+    def run(self):
+        while not self.stop.wait(SAMPLE_INTERVAL):
+            stats = self.ops.pool_stats()
+            self.peak_in_use = max(self.peak_in_use, stats["in_use"])
+            self.peak_waiting = max(self.peak_waiting, stats["waiting"])
+            self.peak_rss = max(self.peak_rss, rss_bytes())
+
+
+def think(rng, distribution, mean):
+    if distribution == "exp":
+        return rng.expovariate(1 / mean) if mean else 0.0
+    if distribution == "uniform":
+        return rng.uniform(0, 2 * mean)
+    if distribution == "fixed":
+        return mean
+    return 0.0
+
+
+def user_loop(ops, index, args, recorder, next_index, deadline, stop):
+    rng = random.Random(args.seed * 1_000_003 + index)
+    # Logins are spread over the ramp, as sessions arrive
+    if stop.wait(rng.uniform(0, args.ramp)):
+        return
+    user = VirtualUser(ops, f"load_{index}", args.contacts, next_index, rng)
+    logged_in = False
+    while not stop.is_set() and time.perf_counter() < deadline:
+        action = "login" if not logged_in else user.next_action()
+        started = time.perf_counter()
+        try:
+            if logged_in:
+                user.perform(action)
+            else:
+                user.login()
+                logged_in = True
+            recorder.record(action, time.perf_counter() - started)
+        except Exception as e:  # anything the flow raised counts against the action, as a page error would
+            recorder.record(action, time.perf_counter() - started, f"{type(e).__name__}: {e}")
+        stop.wait(think(rng, args.think, args.think_ms / 1000))
+
+
+def run_step(ops, users, args, next_index):
+    from contact_cache import contact_cache
+
+    recorder = Recorder()
+    sampler = Sampler(ops)
+    pool_before = ops.pool_stats()
+    rss_before = rss_bytes()
+    stop = threading.Event()
+    deadline = time.perf_counter() + args.duration
+    threads = [
+        threading.Thread(target=user_loop, args=(ops, index, args, recorder, next_index, deadline, stop), daemon=True)
+        for index in range(users)
+    ]
+    started = time.perf_counter()
+    sampler.start()
+    for thread in threads:
+        thread.start()
+    try:
+        for thread in threads:
+            thread.join()
+    except KeyboardInterrupt:
+        stop.set()
+        raise
+    finally:
+        sampler.stop.set()
+        sampler.join()
+    elapsed = time.perf_counter() - started
+
+    actions = recorder.summary()
+    total = sum(action["count"] for action in actions.values())
+    errors = sum(action["errors"] for action in actions.values())
+    pool_after = ops.pool_stats()
+    rss_after = rss_bytes()
+    return {
+        "users": users,
+        "seconds": round(elapsed, 1),
+        "actions_per_sec": round(total / elapsed, 1),
+        "error_rate": round(errors / total, 4) if total else 0.0,
+        "actions": actions,
+        "pool": {
+            "size": pool_after["size"],
+            "open": pool_after["open"],
+            "peak_in_use": sampler.peak_in_use,
+            "peak_waiting": sampler.peak_waiting,
+            "checkouts": pool_after["checkouts"] - pool_before["checkouts"],
+            "timeouts": pool_after["timeouts"] - pool_before["timeouts"],
+            "wait_time_max": pool_after["wait_time_max"],
+        },
+        "memory": {
+            "rss_mb": round(rss_after / 2 ** 20, 1),
+            "peak_rss_mb": round(max(sampler.peak_rss, rss_after) / 2 ** 20, 1),
+            "rss_growth_per_user_kb": round((rss_after - rss_before) / users / 1024, 1),
+            "contact_cache_mb": round(contact_cache.stats()["bytes"] / 2 ** 20, 1),
+        },
+    }
+
+
+def print_step(step):
+    pool, memory = step["pool"], step["memory"]
+    print(f"{step['users']:>5} users: {step['actions_per_sec']:7.1f} actions/s, errors {step['error_rate']:.1%}, "
+          f"pool peak {pool['peak_in_use']}/{pool['size']} in use ({pool['peak_waiting']} waiting, "
+          f"{pool['timeouts']} timeouts), RSS {memory['rss_mb']:.0f} MB (peak {memory['peak_rss_mb']:.0f})",
+          file=sys.stderr)
+    for name, action in step["actions"].items():
+        print(f"{name:>14}: {action['count']:6d}  p50 {action['p50_ms']:8.1f} ms  p95 {action['p95_ms']:8.1f} ms  "
+              f"p99 {action['p99_ms']:8.1f} ms  errors {action['error_rate']:.1%}", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive app.py with concurrent virtual users and report capacity")
+    parser.add_argument("--users", type=int, nargs="+", default=list(DEFAULT_USERS),
+                        help="Concurrent virtual users, one step per value")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds per step")
+    parser.add_argument("--ramp", type=float, default=5.0, help="Seconds over which a step's users log in")
+    parser.add_argument("--think", choices=("exp", "uniform", "fixed", "none"), default="exp",
+                        help="Distribution of the pause between a user's actions")
+    parser.add_argument("--think-ms", type=float, default=1000.0, help="Mean think time")
+    parser.add_argument("--contacts", type=int, default=DEFAULT_CONTACTS, help="Seeded contacts per user")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--backend", choices=("sqlite", "mysql"), default="sqlite",
+                        help="sqlite (default) needs no server; mysql uses the DB_* settings")
+    parser.add_argument("--db", help="SQLite file to seed and keep (default: a temporary file)")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    parser.add_argument("--max-error-rate", type=float, help="Exit with status 1 if any step's error rate is higher")
+    args = parser.parse_args()
+
+    os.environ["DB_BACKEND"] = args.backend
+    tmp_dir = None
+    if args.backend == "sqlite":
+        if args.db:
+            os.environ["SQLITE_PATH"] = args.db
+        else:
+            tmp_dir = tempfile.TemporaryDirectory(prefix="contact_load_")
+            os.environ["SQLITE_PATH"] = os.path.join(tmp_dir.name, "load.db")
+
+    # Imported late so DB_BACKEND / SQLITE_PATH are seen by database.py
+    from operations import ContactOperations
+
+    ops = ContactOperations()
+    steps = []
+    try:
+        for index in range(max(args.users)):
+            seed_address_book(ops, f"load_{index}", args.contacts, args.seed)
+        # Added contacts take indexes past the seeded ones
+        next_index = {f"load_{index}": args.contacts for index in range(max(args.users))}
+        next_index["lock"] = threading.Lock()
+        for users in args.users:
+            step = run_step(ops, users, args, next_index)
+            print_step(step)
+            steps.append(step)
+    finally:
+        if tmp_dir:
+            tmp_dir.cleanup()
+
+    report = {
+        "meta": {
+            "backend": args.backend,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "duration": args.duration,
+            "think": args.think,
+            "think_ms": args.think_ms,
+            "contacts": args.contacts,
+            "seed": args.seed,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "steps": steps,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.max_error_rate is not None:
+        failed = [step["users"] for step in steps if step["error_rate"] > args.max_error_rate]
+        if failed:
+            print(f"Error rate over {args.max_error_rate:.1%} at {', '.join(map(str, failed))} users", file=sys.stderr)
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
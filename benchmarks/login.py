@@ -0,0 +1,82 @@
+"""Measure password verifications (the cost of a login) per second on the hashing pool.
+
+    python -m benchmarks.login --workers 1 2 4 --clients 16 --seconds 5
+
+Each run starts a PasswordHasher with the given number of workers and keeps
+--clients threads verifying a stored hash against it, as concurrent logins do.
+The per-core rate divides by the cores the workers can actually use. The user
+lookup before the hash is a primary-key SELECT and is left out.
+"""
+import argparse
+import json
+import os
+import threading
+import time
+
+from benchmarks.run import summarize
+from passwords import SCRYPT_PARAMS, PasswordHasher, PasswordHasherBusy, hash_password
+
+PASSWORD = "benchmark-password"
+
+
+def measure(workers, clients, seconds, pool="process"):
+    hasher = PasswordHasher(workers=workers, queue_limit=clients, pool=pool)
+    stored = hash_password(PASSWORD)
+    hasher.verify(PASSWORD, stored)  # start the workers outside the timed part
+    latencies, busy = [], 0
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def client():
+        nonlocal busy
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                hasher.verify(PASSWORD, stored)
+            except PasswordHasherBusy:
+                with lock:
+                    busy += 1
+                continue
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    hasher.shutdown()
+
+    cores = min(workers, os.cpu_count() or 1)
+    result = summarize(latencies, len(latencies))
+    del result["rows_per_sec"]  # sums latencies of overlapping logins; logins_per_sec is the throughput
+    result.update({
+        "workers": workers,
+        "clients": clients,
+        "pool": pool,
+        "logins_per_sec": round(len(latencies) / elapsed, 1),
+        "logins_per_sec_per_core": round(len(latencies) / elapsed / cores, 1),
+        "busy_rejections": busy,
+    })
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Password verifications per second on the hashing pool")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    parser.add_argument("--clients", type=int, default=16, help="Concurrent logins")
+    parser.add_argument("--seconds", type=float, default=5.0, help="Duration of each run")
+    parser.add_argument("--pool", choices=("process", "thread"), default="process")
+    args = parser.parse_args()
+    report = {
+        "scrypt": SCRYPT_PARAMS,
+        "cpu_count": os.cpu_count(),
+        "results": [measure(workers, args.clients, args.seconds, args.pool) for workers in args.workers],
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
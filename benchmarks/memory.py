@@ -0,0 +1,70 @@
+"""Measure memory per contact: row dicts (as fetched with dictionary=True) vs ContactStore.
+
+    python -m benchmarks.memory --sizes 1000 100000
+
+Sizes come from tracemalloc and cover the objects each layout allocates on top of
+the field strings, which both share; store_nbytes_per_contact includes the strings.
+"""
+import argparse
+import json
+import tracemalloc
+from datetime import datetime, timedelta
+
+from benchmarks.generator import generate_contacts
+from contact_store import ContactStore
+
+START_DATE = datetime(2024, 1, 1)
+
+
+def _tuples(size, seed):
+    # Shaped like cursor rows; the strings are shared by both layouts and not counted
+    return [
+        (i + 1, name, phone, email, START_DATE + timedelta(minutes=i))
+        for i, (name, phone, email) in enumerate(generate_contacts(size, seed))
+    ]
+
+
+def _measure(build):
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = build()
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return after - before, result
+
+
+def measure(size, seed=0):
+    rows = _tuples(size, seed)
+    columns = ("id", "name", "phone", "email", "date_added")
+    # Fresh datetime objects per row, as the driver returns them
+    dict_bytes, _ = _measure(lambda: [
+        dict(zip(columns, (r[0], r[1], r[2], r[3], r[4] + timedelta(0)))) for r in rows
+    ])
+
+    def build_store():
+        store = ContactStore()
+        store.extend_tuples(rows)
+        return store
+
+    store_bytes, store = _measure(build_store)
+    return {
+        "size": size,
+        "dict_rows_bytes_per_contact": round(dict_bytes / size, 1),
+        "store_bytes_per_contact": round(store_bytes / size, 1),
+        "store_nbytes_per_contact": round(store.nbytes() / size, 1),
+        "saving": round(1 - store_bytes / dict_bytes, 3) if dict_bytes else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory per contact of the in-memory contact layouts")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    print(json.dumps([measure(size, args.seed) for size in args.sizes], indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""Run the contact benchmarks and report latency percentiles as JSON.
+
+    python -m benchmarks.run                                   # 1k, 100k and 1M contacts on SQLite
+    python -m benchmarks.run --sizes 1000 100000 --output results.json
+    python -m benchmarks.run --output new.json --compare baseline.json
+
+Address books are seeded once per size into a throwaway SQLite file (or --db to
+keep and reuse it). With --compare, any scenario whose p95 grew by more than
+--threshold (and at least --min-delta-ms) against the baseline is reported and
+the exit status is 1.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+DEFAULT_SIZES = (1_000, 100_000, 1_000_000)
+DEFAULT_ITERATIONS = 50
+SEED_BATCH_SIZE = 10_000
+REGRESSION_THRESHOLD = 0.20
+# Increases smaller than this are noise on sub-millisecond scenarios, never regressions
+MIN_REGRESSION_MS = 1.0
+
+
+def percentile(sorted_values, pct):
+    """Linearly interpolated percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * pct / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def summarize(latencies, rows):
+    latencies = sorted(latencies)
+    total = sum(latencies)
+    return {
+        "iterations": len(latencies),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "mean_ms": round(total / len(latencies) * 1000, 3) if latencies else 0.0,
+        "rows_per_sec": round(rows / total, 1) if total else 0.0,
+    }
+
+
+def seed_address_book(ops, username, size, seed):
+    """Create the user and fill their contacts up to `size` rows (reuses an existing seeded table)"""
+    from benchmarks.generator import generate_contacts
+
+    ops.register_user(username, "benchmark")
+    existing = ops.count_contacts(username)
+    if existing > size:
+        raise SystemExit(f"{username} already has {existing} contacts; use a fresh --db")
+    start = time.perf_counter()
+    for offset in range(existing, size, SEED_BATCH_SIZE):
+        batch = list(generate_contacts(min(SEED_BATCH_SIZE, size - offset), seed, start=offset))
+        inserted, failures = ops.bulk_insert_contacts(username, batch)
+        if failures:
+            raise SystemExit(f"Seeding {username} failed: {failures[0][1]}")
+    if size > existing:
+        print(f"seeded {size - existing} contacts for {username} in {time.perf_counter() - start:.1f}s",
+              file=sys.stderr)
+
+
+def run_scenario(scenario, iterations):
+    scenario.setup()
+    latencies, rows = [], 0
+    try:
+        for i in range(scenario.iterations(iterations)):
+            scenario.prepare(i)
+            start = time.perf_counter()
+            rows += scenario.run(i)
+            latencies.append(time.perf_counter() - start)
+    finally:
+        scenario.teardown()
+    return summarize(latencies, rows)
+
+
+def run(sizes, scenario_names, iterations, seed):
+    # Imported late so DB_BACKEND / SQLITE_PATH set by main() are seen by database.py
+    from operations import ContactOperations
+    from benchmarks.scenarios import SCENARIOS
+
+    ops = ContactOperations()
+    results = {}
+    for size in sizes:
+        username = f"bench_{size}"
+        seed_address_book(ops, username, size, seed)
+        for name in scenario_names:
+            scenario = SCENARIOS[name](ops, username, size, seed)
+            result = {"scenario": name, "size": size, **run_scenario(scenario, iterations)}
+            results[f"{name}@{size}"] = result
+            print(f"{name:>16} @ {size:>9}: p50 {result['p50_ms']:9.3f} ms  p95 {result['p95_ms']:9.3f} ms  "
+                  f"p99 {result['p99_ms']:9.3f} ms  {result['rows_per_sec']:12.1f} rows/s", file=sys.stderr)
+    return results
+
+
+def compare(results, baseline, threshold=REGRESSION_THRESHOLD, min_delta_ms=MIN_REGRESSION_MS):
+    """Return (key, baseline p95, current p95) for every result whose p95 regressed by more than `threshold`"""
+    regressions = []
+    for key, result in results.items():
+        before = baseline.get(key)
+        if not before or before["p95_ms"] <= 0:
+            continue
+        after = result["p95_ms"]
+        if after > before["p95_ms"] * (1 + threshold) and after - before["p95_ms"] >= min_delta_ms:
+            regressions.append((key, before["p95_ms"], after))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark contact operations on synthetic address books")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="Contacts per address book")
+    parser.add_argument("--scenarios", nargs="+", help="Scenarios to run (default: all)")
+    parser.add_argument("--iterations", type=int, default=DEFAULT_ITERATIONS, help="Timed runs per scenario")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the synthetic contacts")
+    parser.add_argument("--backend", choices=("sqlite", "mysql"), default="sqlite",
+                        help="sqlite (default) needs no server; mysql uses the DB_* settings")
+    parser.add_argument("--db", help="SQLite file to seed and keep (default: a temporary file)")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    parser.add_argument("--compare", help="Baseline JSON report to check for regressions")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help="Allowed relative p95 increase before a scenario counts as regressed")
+    parser.add_argument("--min-delta-ms", type=float, default=MIN_REGRESSION_MS,
+                        help="Ignore p95 increases smaller than this many milliseconds")
+    args = parser.parse_args()
+
+    os.environ["DB_BACKEND"] = args.backend
+    tmp_dir = None
+    if args.backend == "sqlite":
+        if args.db:
+            os.environ["SQLITE_PATH"] = args.db
+        else:
+            tmp_dir = tempfile.TemporaryDirectory(prefix="contact_bench_")
+            os.environ["SQLITE_PATH"] = os.path.join(tmp_dir.name, "bench.db")
+
+    # Only now that the backend is configured can modules that import database.py be loaded
+    from benchmarks.scenarios import SCENARIOS
+    scenario_names = args.scenarios or list(SCENARIOS)
+    unknown = sorted(set(scenario_names) - set(SCENARIOS))
+    if unknown:
+        parser.error(f"unknown scenarios {', '.join(unknown)} (choose from {', '.join(SCENARIOS)})")
+
+    try:
+        results = run(args.sizes, scenario_names, args.iterations, args.seed)
+    finally:
+        if tmp_dir:
+            tmp_dir.cleanup()
+
+    report = {
+        "meta": {
+            "backend": args.backend,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "iterations": args.iterations,
+            "seed": args.seed,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold, args.min_delta_ms)
+        for key, before, after in regressions:
+            print(f"REGRESSION {key}: p95 {before:.3f} ms -> {after:.3f} ms "
+                  f"(+{(after / before - 1) * 100:.0f}%)", file=sys.stderr)
+        if regressions:
+            raise SystemExit(1)
+        print(f"No p95 regressions over {args.threshold:.0%} against {args.compare}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
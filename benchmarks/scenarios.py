@@ -0,0 +1,178 @@
+import random
+
+from contact_cache import contact_cache
+from dedupe import DuplicateFinder
+from exporter import ContactExporter
+
+from benchmarks.generator import FIRST_NAMES, LAST_NAMES, contact_for
+
+
+class Scenario:
+    """One benchmarked operation against a seeded address book.
+
+    run() is timed and returns the number of rows it processed; prepare() runs
+    untimed before each iteration, teardown() once at the end.
+    """
+
+    name = None
+    # Whole-table scenarios run fewer iterations on large tables
+    whole_table = False
+
+    def __init__(self, ops, username, size, seed=0):
+        self.ops = ops
+        self.username = username
+        self.size = size
+        self.seed = seed
+        self.rng = random.Random(seed)
+
+    def iterations(self, requested):
+        if self.whole_table and self.size >= 100_000:
+            return max(3, requested // 10)
+        return requested
+
+    def setup(self):
+        pass
+
+    def prepare(self, i):
+        pass
+
+    def run(self, i):
+        raise NotImplementedError
+
+    def teardown(self):
+        pass
+
+
+class GetContacts(Scenario):
+    """Full contact list load, as on first page view (cache cleared every time)"""
+
+    name = "get_contacts"
+    whole_table = True
+
+    def prepare(self, i):
+        contact_cache.invalidate_user(self.username)
+
+    def run(self, i):
+        return len(self.ops.get_contacts(self.username))
+
+
+class SearchContacts(Scenario):
+    """Ranked search with a warm index; queries mix full names, prefixes and phone fragments"""
+
+    name = "search_contacts"
+
+    def setup(self):
+        self.ops.search_contacts(self.username, "warmup")
+
+    def prepare(self, i):
+        kind = i % 3
+        if kind == 0:
+            self.query = self.rng.choice(FIRST_NAMES)
+        elif kind == 1:
+            self.query = self.rng.choice(LAST_NAMES)[:3]
+        else:
+            self.query = contact_for(self.rng.randrange(self.size), self.seed)[1][2:7]
+
+    def run(self, i):
+        return len(self.ops.search_contacts(self.username, self.query))
+
+
+class AddContact(Scenario):
+    """Single add through the UI write path; the added contacts are removed afterwards"""
+
+    name = "add_contact"
+
+    def setup(self):
+        self.added = []
+
+    def run(self, i):
+        name, phone, email = contact_for(self.size + i, self.seed)
+        success, message, row = self.ops.add_contact(self.username, name, phone, email)
+        if not success:
+            raise RuntimeError(message)
+        self.added.append(row["id"])
+        return 1
+
+    def teardown(self):
+        self.ops.apply_changes(self.username, [{"op": "delete", "id": contact_id} for contact_id in self.added])
+
+
+class UpdateContact(Scenario):
+    """Rename random existing contacts (phone and email unchanged)"""
+
+    name = "update_contact"
+
+    def setup(self):
+        self.contacts = self.ops.get_contacts_page(self.username, "date_added", "desc", page_size=1000)[0]
+
+    def prepare(self, i):
+        self.contact = self.rng.choice(self.contacts)
+        self.new_name = f"{self.rng.choice(FIRST_NAMES)} {self.rng.choice(LAST_NAMES)}"
+
+    def run(self, i):
+        contact = self.contact
+        success, message, _ = self.ops.update_contact(
+            self.username, contact["id"], self.new_name, contact["phone"], contact["email"]
+        )
+        if not success:
+            raise RuntimeError(message)
+        return 1
+
+
+class ExportCSV(Scenario):
+    """Streaming CSV export of the whole table"""
+
+    name = "export_csv"
+    whole_table = True
+
+    def run(self, i):
+        rows = 0
+        exporter = ContactExporter(self.ops)
+        for chunk in exporter.iter_csv(self.username):
+            rows += chunk.count("\n")
+        return rows - 1  # header
+
+
+class PageSort(Scenario):
+    """The contacts table view: count plus the first five pages of one sort order"""
+
+    name = "page_sort"
+    sorts = (("name", "asc"), ("name", "desc"), ("date_added", "desc"), ("date_added", "asc"))
+    pages = 5
+    page_size = 10
+
+    def setup(self):
+        # Steady state: the one-time load and sort of each order is get_contacts' cost
+        for sort_key, direction in self.sorts:
+            self.ops.get_contacts_page(self.username, sort_key, direction, page_size=self.page_size)
+
+    def run(self, i):
+        sort_key, direction = self.sorts[i % len(self.sorts)]
+        self.ops.count_contacts(self.username)
+        rows, cursor = 0, None
+        for _ in range(self.pages):
+            page, cursor = self.ops.get_contacts_page(
+                self.username, sort_key, direction, cursor, self.page_size
+            )
+            rows += len(page)
+            if cursor is None:
+                break
+        return rows
+
+
+class FindDuplicates(Scenario):
+    """Full duplicate scan: blocking, in-block scoring and clustering of the whole table"""
+
+    name = "find_duplicates"
+    whole_table = True
+
+    def run(self, i):
+        finder = DuplicateFinder(self.ops)
+        finder.find(self.username)
+        return finder.scanned
+
+
+SCENARIOS = {
+    scenario.name: scenario
+    for scenario in (GetContacts, SearchContacts, AddContact, UpdateContact, ExportCSV, PageSort, FindDuplicates)
+}
@@ -0,0 +1,111 @@
+"""Measure cold start: time for a fresh process to render the login page.
+
+    python -m benchmarks.startup --runs 5 --output startup.json
+    python -m benchmarks.startup --compare startup.json      # exit status 1 on a regression
+    python -m benchmarks.startup --budget-ms 1500            # or against a fixed budget
+
+Every run is a new Python process that imports Streamlit and runs app.py once
+through Streamlit's AppTest against an empty SQLite file, so nothing is cached
+between runs. Each run reports the phases the app records with
+metrics.record_startup(): the app's imports, the one-time bootstrap (schema
+migrations) and the first render, plus the Streamlit import and the whole process.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.run import MIN_REGRESSION_MS, REGRESSION_THRESHOLD, compare, percentile
+
+DEFAULT_RUNS = 5
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in the child process; prints the phase timings as JSON
+CHILD = """
+import json, time
+started = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+streamlit_import = time.perf_counter() - started
+app = AppTest.from_file("app.py", default_timeout=60).run()
+if app.exception:
+    raise SystemExit(f"app.py raised: {app.exception[0].message}")
+import metrics
+print(json.dumps({"streamlit_import": streamlit_import, **metrics.startup_times()}))
+"""
+
+
+def measure_once(sqlite_path):
+    env = dict(os.environ, DB_BACKEND="sqlite", SQLITE_PATH=sqlite_path)
+    env.pop("METRICS_PORT", None)
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, "-c", CHILD], cwd=ROOT, env=env, capture_output=True, text=True)
+    elapsed = time.perf_counter() - started
+    if result.returncode != 0:
+        raise SystemExit(f"Startup run failed:\n{result.stderr or result.stdout}")
+    phases = json.loads(result.stdout.strip().splitlines()[-1])
+    phases["process"] = elapsed
+    return phases
+
+
+def measure(runs):
+    samples = {}
+    for _ in range(runs):
+        # A new database every run, so the bootstrap applies every migration as on a first deploy
+        with tempfile.TemporaryDirectory(prefix="contact_startup_") as tmp_dir:
+            for phase, seconds in measure_once(os.path.join(tmp_dir, "startup.db")).items():
+                samples.setdefault(phase, []).append(seconds)
+    results = {}
+    for phase, values in samples.items():
+        values.sort()
+        results[phase] = {
+            "runs": len(values),
+            "p50_ms": round(percentile(values, 50) * 1000, 1),
+            "p95_ms": round(percentile(values, 95) * 1000, 1),
+            "max_ms": round(values[-1] * 1000, 1),
+        }
+        print(f"{phase:>16}: p50 {results[phase]['p50_ms']:8.1f} ms  p95 {results[phase]['p95_ms']:8.1f} ms",
+              file=sys.stderr)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time a cold start of the app, from process start to first render")
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS, help="Fresh processes to start")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    parser.add_argument("--compare", help="Baseline JSON report to check for regressions")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help="Allowed relative p95 increase before a phase counts as regressed")
+    parser.add_argument("--min-delta-ms", type=float, default=50.0,
+                        help="Ignore p95 increases smaller than this many milliseconds")
+    parser.add_argument("--budget-ms", type=float, help="Fail if the first render's p95 exceeds this")
+    args = parser.parse_args()
+
+    results = measure(args.runs)
+    text = json.dumps({"runs": args.runs, "python": sys.version.split()[0], "results": results}, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    failed = False
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        for phase, before, after in compare(results, baseline, args.threshold, max(args.min_delta_ms, MIN_REGRESSION_MS)):
+            print(f"REGRESSION {phase}: p95 {before:.1f} ms -> {after:.1f} ms (+{(after / before - 1) * 100:.0f}%)",
+                  file=sys.stderr)
+            failed = True
+    if args.budget_ms is not None and results["first_render"]["p95_ms"] > args.budget_ms:
+        print(f"REGRESSION first_render: p95 {results['first_render']['p95_ms']:.1f} ms is over the "
+              f"{args.budget_ms:.0f} ms budget", file=sys.stderr)
+        failed = True
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
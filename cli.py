@@ -0,0 +1,287 @@
+"""Headless batch jobs over ContactOperations, for one user or all of them.
+
+    python cli.py import alice contacts.csv
+    python cli.py import --dir incoming/              # one <username>.csv or .vcf per user
+    python cli.py export --all --format json --output-dir backups/
+    python cli.py validate --all
+    python cli.py reindex --all
+    python cli.py dedupe alice --merge-certain
+
+Users run in parallel on --workers threads, each borrowing connections from the
+shared pool and reading contacts through chunked cursors. Finished users, and the
+last line written by an import, are recorded in a checkpoint file, so re-running an
+interrupted command picks up where it stopped; the file is removed once every user
+has finished. Nothing here imports Streamlit.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from database import CONTACT_SORT_INDEXES, SHARED_CONTACTS_TABLE, SHARED_SORT_INDEXES
+from dedupe import DuplicateFinder, merge_cluster
+from exporter import FORMATS as EXPORT_FORMATS, ContactExporter
+from importer import DEFAULT_BATCH_SIZE, ContactImporter, ImportReport
+from storage import Error
+
+DEFAULT_WORKERS = 4
+CHUNK_SIZE = 5000
+# Invalid contacts listed per user by `validate`
+SHOW_INVALID = 10
+
+_print_lock = threading.Lock()
+_stop = threading.Event()
+
+
+class Interrupted(Exception):
+    pass
+
+
+def say(message):
+    with _print_lock:
+        print(message, flush=True)
+
+
+def check_stop():
+    if _stop.is_set():
+        raise Interrupted()
+
+
+class Checkpoint:
+    """Users finished by a command (and per-user progress), saved after every change"""
+
+    def __init__(self, path, job):
+        self.path = path
+        self.job = job
+        self._lock = threading.Lock()
+        state = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                state = json.load(f)
+            if state.get("job") != job:
+                say(f"Ignoring {path}: it belongs to another command ({state.get('job')})")
+                state = {}
+        self.done = state.get("done", {})
+        self.progress = state.get("progress", {})
+
+    def _save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"job": self.job, "done": self.done, "progress": self.progress}, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def set_progress(self, name, value):
+        with self._lock:
+            self.progress[name] = value
+            self._save()
+
+    def finish(self, name, summary):
+        with self._lock:
+            self.done[name] = summary
+            self.progress.pop(name, None)
+            self._save()
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def import_job(ops, username, args, checkpoint):
+    path = args.paths[username]
+    start_line = checkpoint.progress.get(username, 0)
+    if start_line:
+        say(f"{username}: resuming {path} after line {start_line}")
+
+    def progress(report):
+        checkpoint.set_progress(username, report.last_line)
+        say(f"  {username}: {report.total} rows read, {report.inserted} imported ({report.rows_per_second:.0f} rows/s)")
+        check_stop()
+
+    importer = ContactImporter(ops, batch_size=args.batch_size)
+    report = importer.import_file(username, path, progress=progress, start_line=start_line)
+    return report.total, report.summary()
+
+
+def export_job(ops, username, args, checkpoint):
+    os.makedirs(args.output_dir, exist_ok=True)
+    path = os.path.join(args.output_dir, f"{username}.{args.format}")
+    tmp_path = f"{path}.part"
+    rows = ops.count_contacts(username)
+    with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+        for chunk in ContactExporter(ops, CHUNK_SIZE).iter_export(username, args.format):
+            f.write(chunk)
+            check_stop()
+    os.replace(tmp_path, path)
+    return rows, f"{rows} contacts written to {path}"
+
+
+def validate_job(ops, username, args, checkpoint):
+    """Re-run the current validation rules over stored contacts (rows saved before a rule changed)"""
+    report = ImportReport()
+    for chunk in ops.iter_contacts(username, CHUNK_SIZE):
+        report.total += len(chunk)
+        # Same checks as an import, with contact ids in place of line numbers
+        ContactImporter._validate([(row["id"], row) for row in chunk], report)
+        check_stop()
+    for contact_id, reason in report.rejects[:SHOW_INVALID]:
+        say(f"  {username}: contact {contact_id}: {reason}")
+    return report.total, f"{report.total} contacts checked, {len(report.rejects)} invalid"
+
+
+def reindex_job(ops, table, args, checkpoint):
+    """Create any missing sort indexes on the table and refresh its optimizer statistics"""
+    db = ops.db
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        if table == SHARED_CONTACTS_TABLE:
+            statements = db.backend.missing_index_sql(cursor, table, SHARED_SORT_INDEXES, owner="user_id, ")
+        else:
+            statements = db.backend.missing_index_sql(cursor, table, CONTACT_SORT_INDEXES)
+        for statement in statements:
+            cursor.execute(statement)
+        cursor.execute(db.backend.analyze_sql(table))
+        cursor.fetchall()
+    return 0, f"{len(statements)} indexes created, statistics refreshed"
+
+
+def dedupe_job(ops, username, args, checkpoint):
+    finder = DuplicateFinder(ops, CHUNK_SIZE)
+    clusters = finder.find(username)
+    certain = [cluster for cluster in clusters if cluster.certain]
+    merged = 0
+    if args.merge_certain:
+        # Keeps the oldest contact of each group that shares a phone or email
+        for cluster in certain:
+            check_stop()
+            success, message = merge_cluster(ops, username, cluster, cluster.contacts[0]["id"])
+            if success:
+                merged += len(cluster) - 1
+            else:
+                say(f"  {username}: {message}")
+    return finder.scanned, (
+        f"{finder.scanned} contacts scanned, {len(clusters)} duplicate groups ({len(certain)} certain), "
+        f"{merged} contacts merged"
+    )
+
+
+JOBS = {
+    "import": import_job,
+    "export": export_job,
+    "validate": validate_job,
+    "reindex": reindex_job,
+    "dedupe": dedupe_job,
+}
+
+
+def run(ops, names, job, args, checkpoint):
+    """Run `job` for every name not yet in the checkpoint; returns the names that failed"""
+    pending = [name for name in names if name not in checkpoint.done]
+    if len(pending) < len(names):
+        say(f"{len(names) - len(pending)} of {len(names)} already done, resuming with {len(pending)}")
+    started = time.perf_counter()
+    rows, failed = 0, []
+    pool = ThreadPoolExecutor(max_workers=args.workers)
+    futures = {pool.submit(job, ops, name, args, checkpoint): name for name in pending}
+    try:
+        for finished, future in enumerate(as_completed(futures), start=1):
+            name = futures[future]
+            try:
+                job_rows, summary = future.result()
+            except Interrupted:
+                failed.append(name)
+                continue
+            except (Error, OSError, ValueError) as e:
+                failed.append(name)
+                say(f"[{finished}/{len(pending)}] {name}: failed: {e}")
+                continue
+            checkpoint.finish(name, summary)
+            rows += job_rows
+            rate = f" ({rows / (time.perf_counter() - started):.0f} rows/s overall)" if rows else ""
+            say(f"[{finished}/{len(pending)}] {name}: {summary}{rate}")
+    except KeyboardInterrupt:
+        # Running users stop at their next chunk; their progress is already saved
+        _stop.set()
+        pool.shutdown(wait=True, cancel_futures=True)
+        say(f"Interrupted; run the same command again to resume (checkpoint: {checkpoint.path})")
+        raise SystemExit(130)
+    pool.shutdown()
+    say(f"{len(pending) - len(failed)} done, {len(failed)} failed, {rows} rows in {time.perf_counter() - started:.1f}s")
+    return failed
+
+
+def _import_paths(args, parser):
+    if args.dir:
+        paths = {}
+        for filename in sorted(os.listdir(args.dir)):
+            username, extension = os.path.splitext(filename)
+            if extension.lower() in (".csv", ".vcf", ".vcard"):
+                paths[username] = os.path.join(args.dir, filename)
+        return paths
+    if not (args.username and args.path):
+        parser.error("import needs <username> <path>, or --dir")
+    return {args.username: args.path}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch contact jobs without the web UI")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Users processed in parallel")
+    parser.add_argument("--checkpoint", help="Progress file for resuming (default: .cli_<command>.json)")
+    parser.add_argument("--restart", action="store_true", help="Ignore an existing checkpoint and start over")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = commands.add_parser("import", help="Import CSV / vCard files")
+    import_parser.add_argument("username", nargs="?")
+    import_parser.add_argument("path", nargs="?")
+    import_parser.add_argument("--dir", help="Import every <username>.csv / .vcf file in this directory")
+    import_parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+
+    for name, help_text in (("export", "Export contacts to files"), ("validate", "Re-validate stored contacts"),
+                            ("reindex", "Create missing indexes and refresh table statistics"),
+                            ("dedupe", "Find (and optionally merge) duplicate contacts")):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument("username", nargs="?", help="One user (or use --all)")
+        command.add_argument("--all", action="store_true", help="Every registered user")
+        if name == "export":
+            command.add_argument("--format", choices=EXPORT_FORMATS, default="csv")
+            command.add_argument("--output-dir", default="exports")
+        if name == "dedupe":
+            command.add_argument("--merge-certain", action="store_true",
+                                 help="Merge groups sharing a phone or email into their oldest contact")
+    args = parser.parse_args()
+
+    from operations import ContactOperations
+    ops = ContactOperations()
+
+    if args.command == "import":
+        args.paths = _import_paths(args, parser)
+        names = list(args.paths)
+    else:
+        if bool(args.username) == bool(args.all):
+            parser.error(f"{args.command} needs a username or --all")
+        try:
+            names = ops.list_usernames() if args.all else [args.username]
+            if args.command == "reindex":
+                # Tables, not users: in shared mode every user lives in one table
+                names = list(dict.fromkeys(ops.db.contact_scope(name).table for name in names))
+        except Error as e:
+            raise SystemExit(f"Could not list users: {e}")
+
+    # The checkpoint only resumes the same command with the same options
+    job = " ".join([args.command] + [f"{key}={value}" for key, value in sorted(vars(args).items())
+                                     if key not in ("workers", "checkpoint", "restart", "command", "paths")])
+    checkpoint = Checkpoint(args.checkpoint or f".cli_{args.command}.json", job)
+    if args.restart:
+        checkpoint.done, checkpoint.progress = {}, {}
+
+    failed = run(ops, names, JOBS[args.command], args, checkpoint)
+    if failed:
+        say(f"Failed: {', '.join(failed)}; run the same command again to retry them (checkpoint: {checkpoint.path})")
+        sys.exit(1)
+    checkpoint.clear()
+
+
+if __name__ == "__main__":
+    main()
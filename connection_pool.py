@@ -0,0 +1,156 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection could be checked out before the timeout"""
+
+
+class ConnectionPool:
+    """Bounded, thread-safe pool of database connections shared by the whole process.
+
+    `connect` opens a new connection, `check` is called on connections that have
+    been idle longer than `ping_interval` and must raise if the connection is dead.
+    """
+
+    def __init__(self, connect, size=10, timeout=5.0, ping_interval=30.0, check=None):
+        self._connect = connect
+        self._check = check
+        self.size = size
+        self.timeout = timeout
+        self.ping_interval = ping_interval
+
+        self._cond = threading.Condition()
+        self._idle = deque()  # (connection, last_used) pairs, most recently used last
+        self._created = 0
+        self._in_use = 0
+        self._waiting = 0
+        # Bumped by close_all(); connections checked out under an older generation are closed on release
+        self._generation = 0
+        self._checked_out = {}  # id(connection) -> generation it was checked out in
+
+        # Counters reported by stats()
+        self._checkouts = 0
+        self._timeouts = 0
+        self._reconnects = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def acquire(self, timeout=None):
+        """Check a connection out of the pool, opening one if the pool is not full"""
+        timeout = self.timeout if timeout is None else timeout
+        start = time.monotonic()
+        deadline = start + timeout
+
+        with self._cond:
+            while True:
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                    break
+                if self._created < self.size:
+                    self._created += 1
+                    conn, last_used = None, None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeout(
+                        f"No database connection available after {timeout:.1f}s "
+                        f"(pool size {self.size})"
+                    )
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+            waited = time.monotonic() - start
+            generation = self._generation
+            self._in_use += 1
+            self._checkouts += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+
+        # Connecting and pinging happen outside the lock so they never block other checkouts
+        try:
+            if conn is None:
+                conn = self._connect()
+            elif self._check and time.monotonic() - last_used > self.ping_interval:
+                conn = self._ensure_healthy(conn)
+        except Exception:
+            with self._cond:
+                self._in_use -= 1
+                self._created -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._checked_out[id(conn)] = generation
+        return conn
+
+    def release(self, conn, discard=False):
+        """Return a connection to the pool, or close it if it is no longer usable"""
+        with self._cond:
+            self._in_use -= 1
+            if self._checked_out.pop(id(conn), self._generation) != self._generation:
+                discard = True
+            if discard:
+                self._created -= 1
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+        if discard:
+            self._close(conn)
+
+    @contextmanager
+    def connection(self, timeout=None):
+        conn = self.acquire(timeout)
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def _ensure_healthy(self, conn):
+        try:
+            self._check(conn)
+            return conn
+        except Exception:
+            self._close(conn)
+            with self._cond:
+                self._reconnects += 1
+            return self._connect()
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def close_all(self):
+        """Close every idle connection (connections in use are closed when released)"""
+        with self._cond:
+            self._generation += 1
+            idle = list(self._idle)
+            self._idle.clear()
+            self._created -= len(idle)
+        for conn, _ in idle:
+            self._close(conn)
+
+    def stats(self):
+        """Snapshot of pool usage, used to size the pool"""
+        with self._cond:
+            return {
+                "size": self.size,
+                "open": self._created,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "waiting": self._waiting,
+                "checkouts": self._checkouts,
+                "timeouts": self._timeouts,
+                "reconnects": self._reconnects,
+                "wait_time_total": round(self._wait_total, 6),
+                "wait_time_avg": round(self._wait_total / self._checkouts, 6) if self._checkouts else 0.0,
+                "wait_time_max": round(self._wait_max, 6),
+            }
@@ -0,0 +1,113 @@
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+# Memory budget for cached contact lists and search results, per app process
+CACHE_MAX_BYTES = int(os.environ.get("CONTACT_CACHE_BYTES", 128 * 1024 * 1024))
+
+# Rows measured when estimating the size of a result; the rest is extrapolated
+SIZE_SAMPLE_ROWS = 64
+
+MISSING = object()
+
+
+def estimate_rows_size(rows):
+    """Approximate memory held by a list of row dicts (list, dicts, keys and values)"""
+    if not rows:
+        return sys.getsizeof(rows)
+    step = max(1, len(rows) // SIZE_SAMPLE_ROWS)
+    sample = rows[::step]
+    sample_bytes = 0
+    for row in sample:
+        sample_bytes += sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row.values())
+    return sys.getsizeof(rows) + sample_bytes * len(rows) // len(sample)
+
+
+class ContactCache:
+    """Process-wide LRU cache of query results with a memory budget.
+
+    Keys start with (username, data version), so a write anywhere makes old entries
+    unreachable; invalidate_user() also frees them right away.
+    """
+
+    def __init__(self, max_bytes=CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (value, size), least recently used first
+        self._user_keys = {}  # username -> keys cached for that user
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return MISSING
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[0]
+
+    def put(self, key, value, size):
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._discard(key)
+            self._entries[key] = (value, size)
+            self._user_keys.setdefault(key[0], set()).add(key)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._discard(next(iter(self._entries)))
+                self._evictions += 1
+
+    def resize(self, key, value, size):
+        """Re-account an entry whose value has grown in place (e.g. a store that built a sort index)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] is not value:
+                return
+            self._bytes += size - entry[1]
+            self._entries[key] = (value, size)
+            if size > self.max_bytes:
+                self._discard(key)
+                self._evictions += 1
+            while self._bytes > self.max_bytes:
+                self._discard(next(iter(self._entries)))
+                self._evictions += 1
+
+    def invalidate_user(self, username):
+        with self._lock:
+            for key in list(self._user_keys.get(username, ())):
+                self._discard(key)
+                self._invalidations += 1
+
+    def _discard(self, key):
+        _, size = self._entries.pop(key)
+        self._bytes -= size
+        keys = self._user_keys[key[0]]
+        keys.discard(key)
+        if not keys:
+            del self._user_keys[key[0]]
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations,
+            }
+
+
+# Shared by every session in the process
+contact_cache = ContactCache()
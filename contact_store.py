@@ -0,0 +1,319 @@
+"""Compact column-oriented storage for a user's contact list.
+
+A list of row dicts costs a dict, five key slots and a datetime per contact. The
+store keeps one array or list per column instead: ids and dates in typed arrays
+(dates as integer epoch seconds), names interned, and row dicts only built on
+demand. Iterating still yields dicts, so code written for the row lists keeps working.
+"""
+import bisect
+import sys
+from array import array
+from datetime import datetime, timedelta
+
+# Naive datetimes are stored as seconds since this instant (no timezone conversion)
+EPOCH = datetime(1970, 1, 1)
+NO_DATE = -(2 ** 63)  # same bit pattern as numpy's NaT
+
+
+def _to_epoch(value):
+    if value is None:
+        return NO_DATE
+    return (value - EPOCH) // timedelta(seconds=1)
+
+
+def _from_epoch(value):
+    if value == NO_DATE:
+        return None
+    return EPOCH + timedelta(seconds=value)
+
+
+# Sample used by nbytes() to estimate the size of the strings
+SIZE_SAMPLE_ROWS = 64
+
+
+def _sort_value(key, record):
+    # record: (id, name, phone, email, date epoch)
+    if key == "name":
+        return record[1].lower()
+    if key == "date_added":
+        return record[4]
+    raise ValueError(f"Unknown sort key: {key!r}")
+
+
+def _record_row(record):
+    contact_id, name, phone, email, date = record
+    return {"id": contact_id, "name": name, "phone": phone, "email": email, "date_added": _from_epoch(date)}
+
+
+class SortIndex:
+    """Contacts ordered by one key as (sort value, id, record) entries.
+
+    Built once with a full sort, then kept in order by bisect on every insert and
+    delete, so a page is a bisect for the cursor plus a slice of `page_size` entries.
+    """
+
+    def __init__(self, key, records=()):
+        self.key = key
+        self.entries = sorted((_sort_value(key, record), record[0], record) for record in records)
+
+    def add(self, record):
+        bisect.insort(self.entries, (_sort_value(self.key, record), record[0], record))
+
+    def remove(self, record):
+        probe = (_sort_value(self.key, record), record[0])
+        i = bisect.bisect_left(self.entries, probe)
+        if i < len(self.entries) and self.entries[i][:2] == probe:
+            del self.entries[i]
+
+    def cursor_key(self, cursor):
+        """(sort value, id) for a page cursor holding the last row's (column value, id)"""
+        value, contact_id = cursor
+        if self.key == "name":
+            return value.lower(), contact_id
+        return _to_epoch(value), contact_id
+
+    def page(self, descending=False, after=None, limit=10):
+        """Records of up to `limit` contacts following the (sort value, id) `after`, in the given direction"""
+        entries = self.entries
+        if not descending:
+            # Ids are integers, so (value, id + 1) is the smallest key after the cursor
+            start = 0 if after is None else bisect.bisect_left(entries, (after[0], after[1] + 1))
+            return [entry[2] for entry in entries[start:start + limit]]
+        end = len(entries) if after is None else bisect.bisect_left(entries, after)
+        return [entry[2] for entry in reversed(entries[max(0, end - limit):end])]
+
+
+class ContactStore:
+    def __init__(self):
+        self.ids = array("q")
+        self.names = []
+        self.phones = []
+        self.emails = []
+        self.dates = array("q")
+        self._records = None  # id -> record tuple, kept while sort indexes exist
+        self._sort_indexes = {}  # sort key -> SortIndex, built on first page request
+
+    @classmethod
+    def from_rows(cls, rows):
+        store = cls()
+        intern = sys.intern
+        for row in rows:
+            store.ids.append(row["id"])
+            store.names.append(intern(row["name"]))
+            store.phones.append(row["phone"])
+            store.emails.append(row["email"])
+            store.dates.append(_to_epoch(row["date_added"]))
+        return store
+
+    def extend_tuples(self, rows):
+        """Append (id, name, phone, email, date_added) tuples, e.g. straight from a cursor's fetchmany()"""
+        intern = sys.intern
+        for contact_id, name, phone, email, date_added in rows:
+            self.ids.append(contact_id)
+            self.names.append(intern(name))
+            self.phones.append(phone)
+            self.emails.append(email)
+            self.dates.append(_to_epoch(date_added))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def row(self, i):
+        """Contact at position `i` as a row dict"""
+        return {
+            "id": self.ids[i],
+            "name": self.names[i],
+            "phone": self.phones[i],
+            "email": self.emails[i],
+            "date_added": _from_epoch(self.dates[i]),
+        }
+
+    def __iter__(self):
+        for i in range(len(self.ids)):
+            yield self.row(i)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return self.take(range(*key.indices(len(self))))
+        return self.row(key)
+
+    def take(self, indices):
+        """New store with the contacts at `indices`, in that order"""
+        store = ContactStore()
+        ids, names, phones, emails, dates = self.ids, self.names, self.phones, self.emails, self.dates
+        for i in indices:
+            store.ids.append(ids[i])
+            store.names.append(names[i])
+            store.phones.append(phones[i])
+            store.emails.append(emails[i])
+            store.dates.append(dates[i])
+        return store
+
+    def copy(self):
+        """Independent copy of the columns; sort indexes are rebuilt on demand"""
+        store = ContactStore()
+        store.ids = array("q", self.ids)
+        store.names = list(self.names)
+        store.phones = list(self.phones)
+        store.emails = list(self.emails)
+        store.dates = array("q", self.dates)
+        return store
+
+    def _record(self, i):
+        return self.ids[i], self.names[i], self.phones[i], self.emails[i], self.dates[i]
+
+    def has_sort_index(self, key):
+        return key in self._sort_indexes
+
+    def sort_index(self, key):
+        index = self._sort_indexes.get(key)
+        if index is None:
+            if self._records is None:
+                self._records = {self.ids[i]: self._record(i) for i in range(len(self.ids))}
+            index = self._sort_indexes[key] = SortIndex(key, self._records.values())
+        return index
+
+    def page(self, sort_key, direction="asc", cursor=None, page_size=10):
+        """One page in the given order; same (rows, next_cursor) contract as ContactOperations.get_contacts_page"""
+        index = self.sort_index(sort_key)
+        after = None if cursor is None else index.cursor_key(cursor)
+        rows = [_record_row(record) for record in index.page(direction == "desc", after, page_size + 1)]
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            last = rows[-1]
+            return rows, (last[sort_key], last["id"])
+        return rows, None
+
+    def prefix_matches(self, prefix, limit):
+        """Row dicts of up to `limit` contacts whose name starts with `prefix` (case-insensitive), by name"""
+        entries = self.sort_index("name").entries
+        prefix = prefix.lower()
+        rows = []
+        for i in range(bisect.bisect_left(entries, (prefix,)), len(entries)):
+            if len(rows) == limit or not entries[i][0].startswith(prefix):
+                break
+            rows.append(_record_row(entries[i][2]))
+        return rows
+
+    def argsort(self, key, descending=False):
+        """Index permutation ordering the store by "name" (case-insensitive) or "date_added", ties by id"""
+        ids = self.ids
+        if key == "name":
+            names = self.names
+            sort_key = lambda i: (names[i].lower(), ids[i])
+        elif key == "date_added":
+            dates = self.dates
+            sort_key = lambda i: (dates[i], ids[i])
+        else:
+            raise ValueError(f"Unknown sort key: {key!r}")
+        return array("l", sorted(range(len(ids)), key=sort_key, reverse=descending))
+
+    def position(self, contact_id):
+        # A scan of the id array runs in C, so it beats keeping an id -> position map
+        # current while rows are inserted at the front
+        try:
+            return self.ids.index(contact_id)
+        except ValueError:
+            return None
+
+    def insert_row(self, i, row):
+        self.ids.insert(i, row["id"])
+        self.names.insert(i, sys.intern(row["name"]))
+        self.phones.insert(i, row["phone"])
+        self.emails.insert(i, row["email"])
+        self.dates.insert(i, _to_epoch(row["date_added"]))
+        if self._sort_indexes:
+            record = self._records[row["id"]] = self._record(i)
+            for index in self._sort_indexes.values():
+                index.add(record)
+
+    def update_row(self, contact_id, changes):
+        """Apply changed fields (name, phone, email) to the contact; False if it is not in the store"""
+        i = self.position(contact_id)
+        if i is None:
+            return False
+        if "name" in changes:
+            self.names[i] = sys.intern(changes["name"])
+        if "phone" in changes:
+            self.phones[i] = changes["phone"]
+        if "email" in changes:
+            self.emails[i] = changes["email"]
+        if self._sort_indexes:
+            old, new = self._records[contact_id], self._record(i)
+            self._records[contact_id] = new
+            for index in self._sort_indexes.values():
+                index.remove(old)
+                index.add(new)
+        return True
+
+    def remove_row(self, contact_id):
+        i = self.position(contact_id)
+        if i is None:
+            return False
+        del self.ids[i], self.names[i], self.phones[i], self.emails[i], self.dates[i]
+        if self._sort_indexes:
+            record = self._records.pop(contact_id)
+            for index in self._sort_indexes.values():
+                index.remove(record)
+        return True
+
+    def to_columns(self, indices=None, date_format=None):
+        """Column dict for st.dataframe; `date_format` renders dates as strings (empty when missing)"""
+        store = self if indices is None else self.take(indices)
+        dates = [_from_epoch(value) for value in store.dates]
+        if date_format:
+            dates = [value.strftime(date_format) if value else "" for value in dates]
+        return {
+            "id": store.ids.tolist(),
+            "name": store.names,
+            "phone": store.phones,
+            "email": store.emails,
+            "date_added": dates,
+        }
+
+    def to_dataframe(self):
+        """pandas DataFrame of the columns, built without creating a Python object per row.
+
+        The id and date arrays are copied with one memcpy each rather than viewed, since
+        a live numpy view would stop the store from growing.
+        """
+        # Imported here: pandas and numpy take longer to import than the rest of the app
+        try:
+            import numpy as np
+            import pandas as pd
+        except ImportError:
+            raise RuntimeError("pandas is not installed") from None
+        return pd.DataFrame({
+            "id": np.array(self.ids, dtype=np.int64),
+            "name": self.names,
+            "phone": self.phones,
+            "email": self.emails,
+            "date_added": np.array(self.dates, dtype=np.int64).view("datetime64[s]"),
+        }, copy=False)
+
+    def nbytes(self):
+        """Approximate memory held by the store, its strings and any sort indexes.
+
+        Containers are measured exactly; string and record sizes are extrapolated from
+        a sample so this stays cheap enough to call after every write to a cached store.
+        """
+        n = len(self.ids)
+        total = sys.getsizeof(self) + sum(
+            sys.getsizeof(column) for column in (self.ids, self.names, self.phones, self.emails, self.dates)
+        )
+        if not n:
+            return total
+        sample = range(0, n, max(1, n // SIZE_SAMPLE_ROWS))
+        string_bytes = sum(
+            sys.getsizeof(column[i]) for i in sample for column in (self.names, self.phones, self.emails)
+            if column[i] is not None
+        )
+        total += string_bytes * n // len(sample)
+        if self._sort_indexes:
+            record_bytes = sys.getsizeof(self._record(0)) + sys.getsizeof(0)
+            total += sys.getsizeof(self._records) + n * record_bytes
+            for index in self._sort_indexes.values():
+                entry = index.entries[0] if index.entries else None
+                entry_bytes = sys.getsizeof(entry) + sys.getsizeof(entry[0]) if entry else 0
+                total += sys.getsizeof(index.entries) + n * entry_bytes
+        return total
@@ -1,90 +1,246 @@
-import mysql.connector
-from mysql.connector import Error
-import streamlit as st
-
-class Database:
-    def __init__(self):
-        self.connection = None
-        self.connect()
-    #Local connection 
-    """def connect(self):
-        try:
-            self.connection = mysql.connector.connect(
-                host="localhost",
-                user="root",  # Change as per your MySQL setup
-                password="system",  # Change as per your MySQL setup
-                database="vishal",
-                charset='utf8',  # Explicitly set charset
-                use_unicode=True
-            )
-            if self.connection.is_connected():
-                self.create_database()
-                self.create_users_table()
-        except Error as e:
-            st.error(f"Error connecting to MySQL: {e}")"""
-    #Global connection
-    def get_database_connection():
-    try:
-        # Use Railway's environment variables
-        conn = psycopg2.connect(
-            host=os.environ.get('DB_HOST'),
-            database=os.environ.get('DB_NAME'),
-            user=os.environ.get('DB_USER'),
-            password=os.environ.get('DB_PASSWORD'),
-            port=os.environ.get('DB_PORT', 5432)
-        )
-        return conn
-    except Exception as e:
-        st.error(f"Database connection failed: {e}")
-        return None
-
-# In your app
-conn = get_database_connection()
-if conn:
-    # Your database operations here
-    
-    def create_database(self):
-        try:
-            cursor = self.connection.cursor()
-            cursor.execute("CREATE DATABASE IF NOT EXISTS vishal")
-            cursor.execute("USE vishal")
-        except Error as e:
-            st.error(f"Error creating database: {e}")
-    
-    def create_users_table(self):
-        try:
-            cursor = self.connection.cursor()
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS users (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    username VARCHAR(255) UNIQUE NOT NULL,
-                    password VARCHAR(255) NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-        except Error as e:
-            st.error(f"Error creating users table: {e}")
-    
-    def create_user_contacts_table(self, username):
-        try:
-            cursor = self.connection.cursor()
-            table_name = f"contacts_{username.replace(' ', '_').lower()}"
-            cursor.execute(f"""
-                CREATE TABLE IF NOT EXISTS {table_name} (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    name VARCHAR(255) NOT NULL,
-                    phone VARCHAR(50) NOT NULL,
-                    email VARCHAR(255),
-                    date_added TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    UNIQUE KEY unique_phone (phone),
-                    UNIQUE KEY unique_email (email)
-                )
-            """)
-            return True
-        except Error as e:
-            st.error(f"Error creating contacts table: {e}")
-            return False
-    
-    def get_connection(self):
-
-        return self.connection
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import metrics
+from connection_pool import PoolTimeout
+from storage import Error, MySQLBackend, SQLiteBackend, StorageError
+
+# "mysql" (default) or "sqlite" for an embedded database file with no server
+DB_BACKEND = os.environ.get("DB_BACKEND", "mysql")
+SQLITE_PATH = os.environ.get("SQLITE_PATH", "contacts.db")
+
+# Connection settings (override through environment variables)
+DB_CONFIG = {
+    "host": os.environ.get("DB_HOST", "localhost"),
+    "port": int(os.environ.get("DB_PORT", 3306)),
+    "user": os.environ.get("DB_USER", "root"),  # Change as per your MySQL setup
+    "password": os.environ.get("DB_PASSWORD", "system"),  # Change as per your MySQL setup
+    "database": os.environ.get("DB_NAME", "vishal"),
+    "charset": "utf8",
+    "use_unicode": True,
+    "autocommit": True,  # Multi-statement writes open an explicit transaction
+}
+
+# Pool sizing: keep DB_POOL_SIZE * number of app processes below MySQL max_connections
+POOL_CONFIG = {
+    "size": int(os.environ.get("DB_POOL_SIZE", 10)),
+    "timeout": float(os.environ.get("DB_POOL_TIMEOUT", 5)),  # seconds to wait for a free connection
+    "ping_interval": float(os.environ.get("DB_POOL_PING_INTERVAL", 30)),  # seconds idle before a health check
+}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """Process-wide storage backend (and its connection pool) shared by every Streamlit session"""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            if DB_BACKEND == "sqlite":
+                _backend = SQLiteBackend(SQLITE_PATH, POOL_CONFIG, busy_timeout=POOL_CONFIG["timeout"])
+            elif DB_BACKEND == "mysql":
+                _backend = MySQLBackend(DB_CONFIG, POOL_CONFIG)
+            else:
+                raise StorageError(f"Unknown DB_BACKEND {DB_BACKEND!r} (expected 'mysql' or 'sqlite')")
+        return _backend
+
+
+def _pool_gauges():
+    stats = get_backend().pool.stats()
+    return {f"contacts_pool_{name}": value for name, value in stats.items()}
+
+
+metrics.register_collector("pool", _pool_gauges)
+
+
+# "per_user": one contacts_<username> table per user (original layout)
+# "shared": a single contacts table keyed by user_id (see migrate_tenancy.py)
+STORAGE_MODE = os.environ.get("CONTACTS_STORAGE_MODE", "per_user")
+SHARED_CONTACTS_TABLE = "contacts"
+
+# Secondary indexes backing ORDER BY name / date_added (InnoDB appends the id to each)
+CONTACT_SORT_INDEXES = {
+    "idx_name": "name",
+    "idx_date_added": "date_added",
+}
+SHARED_SORT_INDEXES = {
+    "idx_user_name": "name",
+    "idx_user_date_added": "date_added",
+}
+
+# Set once the schema migrations have run in this process
+_schema_ready = False
+_schema_lock = threading.Lock()
+# After a failed migration, connection() tries again at most this often (seconds)
+SCHEMA_RETRY_INTERVAL = 5.0
+_schema_retry_at = 0.0
+# Set on the thread running the migrations, whose own connections must not retry them
+_migrating = threading.local()
+
+# username -> users.id, only needed in shared mode
+_user_ids = {}
+_user_ids_lock = threading.Lock()
+
+
+def tenant_key(username):
+    """The identity a user's contacts and data version are stored under; usernames are case-insensitive"""
+    return username.replace(' ', '_').lower()
+
+
+def contacts_table_name(username):
+    return f"contacts_{tenant_key(username)}"
+
+
+class ContactScope:
+    """Where one user's contacts live: the table, plus the user_id filter in shared mode"""
+
+    def __init__(self, table, user_id=None):
+        self.table = table
+        self.user_id = user_id
+
+    def where(self, *conditions):
+        """WHERE clause restricted to the user's rows, and the params that go before the conditions' own"""
+        clauses, params = list(conditions), ()
+        if self.user_id is not None:
+            clauses.insert(0, "user_id = %s")
+            params = (self.user_id,)
+        if not clauses:
+            return "", params
+        return "WHERE " + " AND ".join(f"({clause})" for clause in clauses), params
+
+    def insert(self, columns):
+        """INSERT statement for `columns`, and the params that go before each row's values"""
+        columns, params = tuple(columns), ()
+        if self.user_id is not None:
+            columns = ("user_id",) + columns
+            params = (self.user_id,)
+        placeholders = ", ".join(["%s"] * len(columns))
+        return f"INSERT INTO {self.table} ({', '.join(columns)}) VALUES ({placeholders})", params
+
+
+class Database:
+    def __init__(self, migrate=True):
+        self.backend = get_backend()
+        self.pool = self.backend.pool
+        self.migrate = migrate
+        if migrate:
+            self.ensure_schema()
+
+    def ensure_schema(self):
+        """Apply pending schema migrations, once per process rather than once per session.
+
+        A failure (e.g. the database is briefly down at startup) is printed, and
+        connection() tries again until the migrations have run.
+        """
+        global _schema_ready, _schema_retry_at
+        with _schema_lock:
+            if _schema_ready:
+                return
+            from migrations import migrate  # migrations.py imports this module
+            _migrating.active = True
+            try:
+                migrate(self)
+                if STORAGE_MODE == "shared":
+                    self._execute_ddl(
+                        self.backend.contacts_table_sql(SHARED_CONTACTS_TABLE, SHARED_SORT_INDEXES, shared=True)
+                    )
+                _schema_ready = True
+            except Error as e:
+                _schema_retry_at = time.monotonic() + SCHEMA_RETRY_INTERVAL
+                print(f"Error migrating database schema: {e}")
+            finally:
+                _migrating.active = False
+
+    @contextmanager
+    def connection(self):
+        """Check a connection out of the shared pool for the duration of the block"""
+        if self.migrate and not _schema_ready and not getattr(_migrating, "active", False) \
+                and time.monotonic() >= _schema_retry_at:
+            self.ensure_schema()
+        try:
+            conn = self.pool.acquire()
+        except PoolTimeout as e:
+            raise StorageError(str(e))
+
+        discard = False
+        try:
+            # Statement timings and row counts go to metrics.py
+            yield metrics.InstrumentedConnection(conn)
+        finally:
+            # Never hand a connection with a half-finished transaction to the next caller
+            try:
+                if conn.unread_result:
+                    conn.consume_results()
+                if conn.in_transaction:
+                    conn.rollback()
+            except Error:
+                discard = True
+            self.pool.release(conn, discard=discard)
+
+    def _execute_ddl(self, statements):
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            for statement in statements:
+                cursor.execute(statement)
+
+    def create_shared_contacts_table(self):
+        try:
+            self._execute_ddl(
+                self.backend.contacts_table_sql(SHARED_CONTACTS_TABLE, SHARED_SORT_INDEXES, shared=True)
+            )
+            return True
+        except Error as e:
+            print(f"Error creating contacts table: {e}")
+            return False
+
+    def contact_scope(self, username):
+        """ContactScope for the user in the configured storage mode.
+
+        In shared mode the first call for a user looks up their id on a pooled
+        connection, so resolve the scope before checking out a connection of your own.
+        """
+        if STORAGE_MODE != "shared":
+            return ContactScope(contacts_table_name(username))
+        return ContactScope(SHARED_CONTACTS_TABLE, self.get_user_id(username))
+
+    def get_user_id(self, username):
+        with _user_ids_lock:
+            user_id = _user_ids.get(username)
+        if user_id is None:
+            with self.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT id FROM users WHERE username = %s", (username,))
+                row = cursor.fetchone()
+            if row is None:
+                raise StorageError(f"Unknown user {username!r}")
+            user_id = row[0]
+            with _user_ids_lock:
+                _user_ids[username] = user_id
+        return user_id
+
+    def create_user_contacts_table(self, username):
+        if STORAGE_MODE == "shared":
+            # Contacts go into the shared table, nothing to create per user
+            return True
+        try:
+            self._execute_ddl(
+                self.backend.contacts_table_sql(contacts_table_name(username), CONTACT_SORT_INDEXES)
+            )
+            return True
+        except Error as e:
+            print(f"Error creating contacts table: {e}")
+            return False
+
+    def bump_version(self, cursor, username):
+        """Increment the user's data version inside the caller's transaction and return the new value"""
+        return self.backend.bump_version(cursor, tenant_key(username))
+
+    def duplicate_key(self, error):
+        """Name of the unique key ("unique_phone" / "unique_email") an IntegrityError violated, if known"""
+        return self.backend.duplicate_key(error)
+
+    def pool_stats(self):
+        return self.pool.stats()
@@ -0,0 +1,219 @@
+"""Find and merge duplicate contacts in one address book.
+
+Contacts are grouped into blocks by normalized phone, normalized email and a
+phonetic name key, and pairs are only compared inside a block, so the work grows
+with the number of contacts rather than with every pair of them. Blocks link into
+clusters through a union-find; each cluster can then be merged into one contact.
+
+    python dedupe.py alice
+    python dedupe.py alice --limit 50
+"""
+import argparse
+import difflib
+import re
+import time
+
+from storage import Error
+
+# Names shared by more contacts than this are common names, not evidence of a duplicate
+MAX_NAME_GROUP = 5
+# Distinct spellings compared pairwise inside one phonetic block
+MAX_BLOCK_VARIANTS = 50
+NAME_SIMILARITY = 0.8
+
+SAME_PHONE, SAME_EMAIL, SAME_NAME, SIMILAR_NAME = "same phone", "same email", "same name", "similar name"
+# Reasons that identify the same person on their own; name matches are only possible duplicates
+CERTAIN = (SAME_PHONE, SAME_EMAIL)
+
+_NON_DIGITS = re.compile(r"\D")
+_NAME_WORDS = re.compile(r"[^a-z]+")
+_SOUNDEX_CODES = {
+    **dict.fromkeys("bfpv", "1"), **dict.fromkeys("cgjkqsxz", "2"), **dict.fromkeys("dt", "3"),
+    "l": "4", **dict.fromkeys("mn", "5"), "r": "6",
+}
+
+
+def phone_key(phone):
+    """Last ten digits, so '+91 98765-43210', '098765 43210' and '9876543210' share a block"""
+    digits = _NON_DIGITS.sub("", phone or "")
+    return digits[-10:] or None
+
+
+def email_key(email):
+    return (email.strip().lower() or None) if email else None
+
+
+def name_key(name):
+    """Lower-cased name words in sorted order: ignores case, spacing, punctuation and word order"""
+    return " ".join(sorted(_NAME_WORDS.sub(" ", (name or "").lower()).split()))
+
+
+def soundex(word):
+    codes = [_SOUNDEX_CODES.get(letter, "") for letter in word]
+    key, last = word[0], codes[0]
+    for letter, code in zip(word[1:], codes[1:]):
+        if code and code != last:
+            key += code
+        if letter not in "hw":
+            last = code
+    return (key + "000")[:4]
+
+
+class _UnionFind:
+    def __init__(self):
+        self.parent = {}
+        self.reasons = {}
+
+    def find(self, item):
+        parent = self.parent
+        root = item
+        while parent.get(root, root) != root:
+            root = parent[root]
+        while item != root:
+            parent[item], item = root, parent[item]
+        return root
+
+    def union(self, items, reason):
+        root = self.find(items[0])
+        reasons = self.reasons.setdefault(root, set())
+        reasons.add(reason)
+        for item in items[1:]:
+            other = self.find(item)
+            if other != root:
+                self.parent[other] = root
+                reasons.update(self.reasons.pop(other, ()))
+
+
+class DuplicateCluster:
+    """Contacts (oldest first) that look like one person, and why"""
+
+    def __init__(self, contacts, reasons):
+        self.contacts = contacts
+        self.reasons = reasons
+
+    @property
+    def certain(self):
+        return any(reason in CERTAIN for reason in self.reasons)
+
+    def __len__(self):
+        return len(self.contacts)
+
+
+class DuplicateFinder:
+    def __init__(self, db_ops, chunk_size=5000):
+        self.db_ops = db_ops
+        self.chunk_size = chunk_size
+        self.elapsed = 0.0
+        self.scanned = 0
+
+    def find(self, username):
+        """Clusters of likely duplicates, certain ones (shared phone / email) first, then by size"""
+        started = time.perf_counter()
+        scanned = 0
+        phones, emails, names = {}, {}, {}
+        name_keys = {}  # Raw name -> key; address books repeat names a lot
+        # Only the block keys are kept; full rows are fetched for the contacts that end up in a cluster
+        for chunk in self.db_ops.iter_contact_fields(username, self.chunk_size):
+            scanned += len(chunk)
+            for contact_id, name, phone, email in chunk:
+                phone = phone_key(phone)
+                if phone:
+                    phones.setdefault(phone, []).append(contact_id)
+                email = email_key(email)
+                if email:
+                    emails.setdefault(email, []).append(contact_id)
+                key = name_keys.get(name)
+                if key is None:
+                    key = name_keys[name] = name_key(name)
+                names.setdefault(key, []).append(contact_id)
+
+        links = _UnionFind()
+        for blocks, reason in ((phones, SAME_PHONE), (emails, SAME_EMAIL)):
+            for ids in blocks.values():
+                if len(ids) > 1:
+                    links.union(ids, reason)
+        self._link_names(names, links)
+
+        clusters = {root: [] for root in links.reasons}
+        for contact_id in links.parent:
+            clusters[links.find(contact_id)].append(contact_id)
+        contacts = {row["id"]: row for row in self.db_ops.get_contacts_by_ids(username, [*links.parent, *links.reasons])}
+
+        result = []
+        for root, ids in clusters.items():
+            members = [contacts[i] for i in ids + [root] if i in contacts]
+            if len(members) > 1:  # Unless the others were deleted since the scan
+                members.sort(key=lambda row: (row["date_added"], row["id"]))
+                result.append(DuplicateCluster(members, links.reasons[root]))
+        result.sort(key=lambda cluster: (not cluster.certain, -len(cluster), cluster.contacts[0]["id"]))
+
+        self.scanned = scanned
+        self.elapsed = time.perf_counter() - started
+        return result
+
+    @staticmethod
+    def _link_names(names, links):
+        """Link identical names, and similar spellings that sound alike, unless they are common names"""
+        phonetic = {}
+        codes = {}
+        for key, ids in names.items():
+            if not key or len(ids) > MAX_NAME_GROUP:
+                continue
+            if len(ids) > 1:
+                links.union(ids, SAME_NAME)
+            words = key.split()
+            for word in words:
+                if word not in codes:
+                    codes[word] = soundex(word)
+            phonetic.setdefault(" ".join(sorted(codes[word] for word in words)), []).append(key)
+
+        # Only different spellings inside one block are scored against each other
+        for variants in phonetic.values():
+            if len(variants) < 2 or len(variants) > MAX_BLOCK_VARIANTS:
+                continue
+            for i, first in enumerate(variants):
+                matcher = difflib.SequenceMatcher(None, b=first)
+                for second in variants[i + 1:]:
+                    matcher.set_seq1(second)
+                    if matcher.ratio() >= NAME_SIMILARITY:
+                        links.union([names[first][0], names[second][0]], SIMILAR_NAME)
+
+
+def merge_cluster(db_ops, username, cluster, keep_id):
+    """Merge a cluster into the contact `keep_id`: the others are deleted, and a missing email
+    is taken from the oldest contact that has one. One transaction; returns (success, message)."""
+    keep = next(contact for contact in cluster.contacts if contact["id"] == keep_id)
+    others = [contact for contact in cluster.contacts if contact["id"] != keep_id]
+    # Deletes go first so the kept contact can take over an email without tripping its unique key
+    changes = [{"op": "delete", "id": contact["id"]} for contact in others]
+    email = keep["email"] or next((contact["email"] for contact in others if contact["email"]), None)
+    if email != keep["email"]:
+        changes.append({"op": "update", "id": keep_id, "name": keep["name"], "phone": keep["phone"], "email": email})
+    success, message, _ = db_ops.apply_changes(username, changes)
+    if success:
+        message = f"Merged {len(others)} contacts into {keep['name']}"
+    return success, message
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List likely duplicate contacts of an account")
+    parser.add_argument("username", help="Account to scan")
+    parser.add_argument("--limit", type=int, default=20, help="Clusters to print")
+    args = parser.parse_args()
+
+    from operations import ContactOperations
+
+    finder = DuplicateFinder(ContactOperations())
+    try:
+        clusters = finder.find(args.username)
+    except Error as e:
+        raise SystemExit(f"Duplicate scan failed: {e}")
+    print(f"{finder.scanned} contacts scanned in {finder.elapsed:.2f}s, {len(clusters)} clusters")
+    for cluster in clusters[:args.limit]:
+        print(f"{', '.join(sorted(cluster.reasons))}:")
+        for contact in cluster.contacts:
+            print(f"  {contact['id']}: {contact['name']}, {contact['phone']}, {contact['email'] or '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import csv
+import io
+import json
+import os
+import tempfile
+import threading
+
+from database import contacts_table_name
+
+EXPORT_COLUMNS = ("id", "name", "phone", "email", "date_added")
+EXPORT_CHUNK_SIZE = 1000
+EXPORT_DIR = os.environ.get("EXPORT_CACHE_DIR", os.path.join(tempfile.gettempdir(), "contact_exports"))
+
+FORMATS = {
+    "csv": "text/csv",
+    "json": "application/json",
+}
+
+# (username, format) -> (data version, path) of the last export written by this process
+_exports = {}
+_exports_lock = threading.Lock()
+
+
+def _export_row(contact):
+    row = {column: contact[column] for column in EXPORT_COLUMNS}
+    # Convert datetime objects to strings for serialization
+    row["date_added"] = row["date_added"].strftime('%Y-%m-%d %H:%M:%S') if row["date_added"] else ''
+    return row
+
+
+class ContactExporter:
+    """Serializes a user's contacts chunk by chunk, so memory use does not grow with the table"""
+
+    def __init__(self, db_ops, chunk_size=EXPORT_CHUNK_SIZE):
+        self.db_ops = db_ops
+        self.chunk_size = chunk_size
+
+    def iter_csv(self, username):
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS, lineterminator="\n")
+        writer.writeheader()
+        for rows in self.db_ops.iter_contacts(username, self.chunk_size):
+            writer.writerows(_export_row(contact) for contact in rows)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+
+    def iter_json(self, username):
+        """Same output as json.dumps(contacts, indent=2), produced one object at a time"""
+        first = True
+        yield "["
+        for rows in self.db_ops.iter_contacts(username, self.chunk_size):
+            parts = []
+            for contact in rows:
+                item = json.dumps(_export_row(contact), indent=2).replace("\n", "\n  ")
+                parts.append(("\n  " if first else ",\n  ") + item)
+                first = False
+            yield "".join(parts)
+        yield "]" if first else "\n]"
+
+    def iter_export(self, username, file_format):
+        return self.iter_json(username) if file_format == "json" else self.iter_csv(username)
+
+    def export_file(self, username, file_format):
+        """Path of an export file for the current data version, written only if the data changed.
+
+        Returns (path, version), or (None, None) if the data version cannot be read.
+        """
+        version = self.db_ops.get_data_version(username)
+        if version is None:
+            return None, None
+        key = (username, file_format)
+        with _exports_lock:
+            cached = _exports.get(key)
+        if cached and cached[0] == version and os.path.exists(cached[1]):
+            return cached[1], version
+
+        os.makedirs(EXPORT_DIR, exist_ok=True)
+        path = os.path.join(EXPORT_DIR, f"{contacts_table_name(username)}_v{version}.{file_format}")
+        fd, tmp_path = tempfile.mkstemp(dir=EXPORT_DIR, suffix=".part")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+                for chunk in self.iter_export(username, file_format):
+                    f.write(chunk)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+        with _exports_lock:
+            previous = _exports.get(key)
+            _exports[key] = (version, path)
+        if previous and previous[1] != path and os.path.exists(previous[1]):
+            os.remove(previous[1])
+        return path, version
@@ -0,0 +1,263 @@
+import argparse
+import csv
+import io
+import os
+import time
+
+from storage import Error
+from validation import MESSAGES, normalize_email, phone_e164, validate_names, validate_phones, validate_emails
+
+DEFAULT_BATCH_SIZE = 1000
+
+# Accepted CSV header spellings for each contact field (compared lower-cased)
+CSV_COLUMNS = {
+    "name": ("name", "full name", "full_name", "contact name"),
+    "phone": ("phone", "phone number", "phone_number", "mobile", "mobile number", "tel"),
+    "email": ("email", "e-mail", "email address", "email_address"),
+}
+
+FORMATS = ("csv", "vcf")
+
+
+class ImportReport:
+    """Outcome of an import: counts, per-row rejects and throughput"""
+
+    def __init__(self):
+        self.total = 0
+        self.inserted = 0
+        self.last_line = 0  # last line of the input whose batch has been written
+        self.rejects = []  # (line number, reason)
+        self.elapsed = 0.0
+
+    def reject(self, line_no, reason):
+        self.rejects.append((line_no, reason))
+
+    @property
+    def rows_per_second(self):
+        return self.total / self.elapsed if self.elapsed else 0.0
+
+    def summary(self):
+        return (
+            f"{self.inserted} of {self.total} contacts imported, {len(self.rejects)} rejected "
+            f"in {self.elapsed:.1f}s ({self.rows_per_second:.0f} rows/s)"
+        )
+
+
+def read_csv(stream):
+    """Yield (line number, record) from a CSV text stream with a header row"""
+    reader = csv.reader(stream)
+    header = next(reader, None)
+    if header is None:
+        return
+    header = [column.strip().lower() for column in header]
+    positions = {}
+    for field, aliases in CSV_COLUMNS.items():
+        for alias in aliases:
+            if alias in header:
+                positions[field] = header.index(alias)
+                break
+    if "name" not in positions or "phone" not in positions:
+        raise ValueError("CSV file needs a header row with at least 'name' and 'phone' columns")
+
+    for values in reader:
+        if not any(value.strip() for value in values):
+            continue
+        record = {
+            field: values[position].strip() if position < len(values) else ""
+            for field, position in positions.items()
+        }
+        yield reader.line_num, record
+
+
+def read_vcard(stream):
+    """Yield (line number, record) for each BEGIN:VCARD ... END:VCARD block"""
+    record, start_line, pending = None, 0, None
+    for line_no, raw_line in enumerate(stream, start=1):
+        line = raw_line.rstrip("\r\n")
+        # Folded lines continue the previous property
+        if line[:1] in (" ", "\t") and pending is not None:
+            pending += line[1:]
+            continue
+        if pending is not None and record is not None:
+            _apply_vcard_property(record, pending)
+        pending = None
+
+        upper = line.strip().upper()
+        if upper == "BEGIN:VCARD":
+            record, start_line = {"name": "", "phone": "", "email": ""}, line_no
+        elif upper == "END:VCARD":
+            if record is not None:
+                yield start_line, record
+            record = None
+        elif record is not None and ":" in line:
+            pending = line
+    if record is not None:
+        # Last card without END:VCARD
+        if pending is not None:
+            _apply_vcard_property(record, pending)
+        yield start_line, record
+
+
+def _apply_vcard_property(record, line):
+    key, _, value = line.partition(":")
+    # Drop the group prefix ("item1.TEL") and parameters ("TEL;TYPE=CELL")
+    prop = key.split(";")[0].split(".")[-1].upper()
+    value = value.strip()
+    if prop == "FN" and value:
+        record["name"] = value
+    elif prop == "N" and value and not record["name"]:
+        parts = value.split(";")
+        record["name"] = " ".join(part for part in (parts[1:2] + parts[:1]) if part)
+    elif prop == "TEL" and value and not record["phone"]:
+        record["phone"] = value
+    elif prop == "EMAIL" and value and not record["email"]:
+        record["email"] = value
+
+
+class ContactImporter:
+    """Streams a CSV or vCard file into a user's contacts in batches"""
+
+    def __init__(self, db_ops, batch_size=DEFAULT_BATCH_SIZE):
+        self.db_ops = db_ops
+        self.batch_size = batch_size
+
+    def import_stream(self, username, stream, file_format="csv", progress=None, start_line=0):
+        """Import from a text stream. `progress(report)` is called after every batch.
+
+        Records up to `start_line` are skipped, so an interrupted import can resume from
+        the report's last_line.
+        """
+        reader = read_vcard if file_format == "vcf" else read_csv
+        report = ImportReport()
+        start = time.perf_counter()
+        seen_phones, seen_emails = set(), set()
+        batch = []
+
+        for line_no, record in reader(stream):
+            if line_no <= start_line:
+                continue
+            report.total += 1
+            batch.append((line_no, record))
+            if len(batch) >= self.batch_size:
+                self._flush(username, self._validate(batch, report), report, seen_phones, seen_emails)
+                report.last_line = batch[-1][0]
+                batch = []
+                report.elapsed = time.perf_counter() - start
+                if progress:
+                    progress(report)
+
+        self._flush(username, self._validate(batch, report), report, seen_phones, seen_emails)
+        if batch:
+            report.last_line = batch[-1][0]
+        report.elapsed = time.perf_counter() - start
+        if progress:
+            progress(report)
+        return report
+
+    def import_file(self, username, path, file_format=None, progress=None, start_line=0):
+        file_format = file_format or _format_from_name(path)
+        with open(path, newline="", encoding="utf-8-sig") as stream:
+            return self.import_stream(username, stream, file_format, progress, start_line)
+
+    def import_upload(self, username, uploaded_file, progress=None):
+        """Import a Streamlit UploadedFile (or any binary file object with a name)"""
+        stream = io.TextIOWrapper(uploaded_file, encoding="utf-8-sig", newline="")
+        return self.import_stream(username, stream, _format_from_name(uploaded_file.name), progress)
+
+    @staticmethod
+    def _validate(batch, report):
+        """Validate a batch column by column; returns the (line, (name, phone, email)) rows that pass"""
+        names = validate_names([record["name"] for _, record in batch])
+        phones = validate_phones([record["phone"] for _, record in batch])
+        emails = validate_emails([record.get("email") for _, record in batch])
+
+        rows = []
+        for i, (line_no, record) in enumerate(batch):
+            if not record["name"]:
+                report.reject(line_no, "Name is required")
+            elif not record["phone"]:
+                report.reject(line_no, "Phone is required")
+            elif names.codes[i] or phones.codes[i] or emails.codes[i]:
+                report.reject(line_no, MESSAGES[names.codes[i] or phones.codes[i] or emails.codes[i]])
+            else:
+                rows.append((line_no, (record["name"], record["phone"], emails.values[i])))
+        return rows
+
+    def _flush(self, username, batch, report, seen_phones, seen_emails):
+        if not batch:
+            return
+
+        # Duplicates inside the file itself, compared in canonical form ("+91 98765-43210" == "9876543210")
+        fresh = []
+        for line_no, row in batch:
+            _, phone, email = row
+            phone_key, email_key = phone_e164(phone), normalize_email(email)
+            if phone_key in seen_phones:
+                report.reject(line_no, "Phone number appears earlier in the file")
+            elif email_key and email_key in seen_emails:
+                report.reject(line_no, "Email address appears earlier in the file")
+            else:
+                seen_phones.add(phone_key)
+                if email_key:
+                    seen_emails.add(email_key)
+                fresh.append((line_no, row, phone_key, email_key))
+
+        # Duplicates against stored contacts: one query on the canonical columns for the whole batch
+        try:
+            existing_phones, existing_emails = self.db_ops.find_existing_contact_keys(
+                username,
+                [phone_key for _, _, phone_key, _ in fresh],
+                [email_key for _, _, _, email_key in fresh if email_key],
+            )
+        except Error as e:
+            for line_no, *_ in fresh:
+                report.reject(line_no, f"Error checking duplicates: {e}")
+            return
+
+        to_insert = []
+        for line_no, row, phone_key, email_key in fresh:
+            if phone_key in existing_phones:
+                report.reject(line_no, "Phone number already exists in your contacts")
+            elif email_key and email_key in existing_emails:
+                report.reject(line_no, "Email address already exists in your contacts")
+            else:
+                to_insert.append((line_no, row))
+
+        try:
+            inserted, failures = self.db_ops.bulk_insert_contacts(username, [row for _, row in to_insert])
+        except Error as e:
+            for line_no, _ in to_insert:
+                report.reject(line_no, f"Error importing contact: {e}")
+            return
+        report.inserted += inserted
+        for index, message in failures:
+            report.reject(to_insert[index][0], message)
+
+
+def _format_from_name(filename):
+    extension = os.path.splitext(filename)[1].lower()
+    return "vcf" if extension in (".vcf", ".vcard") else "csv"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import contacts from a CSV or vCard file")
+    parser.add_argument("username", help="Account to import the contacts into")
+    parser.add_argument("path", help="CSV (with name, phone, email header) or .vcf file")
+    parser.add_argument("--format", choices=FORMATS, help="File format (default: from the file extension)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Rows per INSERT transaction")
+    args = parser.parse_args()
+
+    from operations import ContactOperations
+
+    def show_progress(report):
+        print(f"  {report.total} rows read, {report.inserted} imported ({report.rows_per_second:.0f} rows/s)")
+
+    importer = ContactImporter(ContactOperations(), batch_size=args.batch_size)
+    report = importer.import_file(args.username, args.path, args.format, progress=show_progress)
+    print(report.summary())
+    for line_no, reason in report.rejects:
+        print(f"  line {line_no}: {reason}")
+
+
+if __name__ == "__main__":
+    main()
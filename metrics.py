@@ -0,0 +1,353 @@
+"""Lightweight in-process timing for operations, SQL statements and page sections.
+
+Everything is recorded twice: into cumulative histograms/counters for the whole
+process (exported in Prometheus text format), and into the trace of the current
+Streamlit rerun (shown in the debug panel) if one was started.
+"""
+import bisect
+import functools
+import inspect
+import os
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Upper bounds (seconds) of the latency histogram buckets
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Optional Prometheus export: a file rewritten after every rerun and/or a local HTTP endpoint
+METRICS_FILE = os.environ.get("METRICS_FILE")
+METRICS_PORT = int(os.environ.get("METRICS_PORT", 0))
+
+
+class Histogram:
+    def __init__(self):
+        self.bucket_counts = [0] * (len(BUCKETS) + 1)  # last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.bucket_counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+
+
+_lock = threading.Lock()
+_histograms = defaultdict(Histogram)  # (metric name, labels) -> Histogram
+_counters = defaultdict(float)  # (metric name, labels) -> value
+_collectors = {}  # name -> callable returning {metric name: value} gauges, read at export time
+
+HELP = {
+    "contacts_operation_seconds": "ContactOperations method latency",
+    "contacts_sql_seconds": "SQL statement latency, including fetching its rows",
+    "contacts_sql_rows_total": "Rows fetched by SQL statements",
+    "contacts_section_seconds": "Time spent in a page section (sort, export, render, ...)",
+}
+
+
+def observe(name, labels, seconds):
+    with _lock:
+        _histograms[(name, labels)].observe(seconds)
+
+
+def increment(name, labels, amount=1):
+    with _lock:
+        _counters[(name, labels)] += amount
+
+
+def register_collector(name, collect):
+    """Export the {metric name: number} returned by `collect` as gauges (re-registering replaces it)"""
+    _collectors[name] = collect
+
+
+class RerunTrace:
+    """Breakdown of one Streamlit rerun"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.rows = 0
+        self.operations = defaultdict(lambda: [0, 0.0])  # name -> [calls, seconds]
+        self.sections = defaultdict(float)  # name -> seconds
+        # username -> contact data version, read once per rerun (ContactOperations.get_data_version)
+        self.data_versions = {}
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+
+_trace = ContextVar("contacts_rerun_trace", default=None)
+
+# Cold-start phases of this process (imports, bootstrap, first render) -> seconds
+_startup = {}
+
+
+def record_startup(phase, seconds):
+    """Record how long a startup phase took; only the first (cold) measurement of each phase is kept"""
+    with _lock:
+        _startup.setdefault(phase, seconds)
+
+
+def startup_times():
+    with _lock:
+        return dict(_startup)
+
+
+def _startup_gauges():
+    return {f"contacts_startup_{phase}_seconds": seconds for phase, seconds in startup_times().items()}
+
+
+register_collector("startup", _startup_gauges)
+
+
+def begin_rerun():
+    """Return the trace of the current rerun, starting one if needed.
+
+    Called at the top of the script and by widget callbacks, which run just before
+    the script in the same thread, so their work is part of the same rerun.
+    """
+    trace = _trace.get()
+    if trace is None:
+        trace = RerunTrace()
+        _trace.set(trace)
+    return trace
+
+
+def current_rerun():
+    """The trace of the rerun in progress, or None outside one"""
+    return _trace.get()
+
+
+def end_rerun():
+    """Close the current rerun's trace and return it"""
+    trace = _trace.get()
+    _trace.set(None)
+    return trace
+
+
+def _record_operation(name, seconds):
+    observe("contacts_operation_seconds", (("operation", name),), seconds)
+    trace = _trace.get()
+    if trace is not None:
+        entry = trace.operations[name]
+        entry[0] += 1
+        entry[1] += seconds
+
+
+def timed(name):
+    """Decorator recording each call's latency under `name`; generators are timed until exhausted"""
+    def decorate(func):
+        if inspect.isgeneratorfunction(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    yield from func(*args, **kwargs)
+                finally:
+                    _record_operation(name, time.perf_counter() - start)
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    _record_operation(name, time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+
+def instrument_methods(cls):
+    """Class decorator: time every public method of `cls`"""
+    for attr, value in list(vars(cls).items()):
+        if not attr.startswith("_") and inspect.isfunction(value):
+            setattr(cls, attr, timed(attr)(value))
+    return cls
+
+
+@contextmanager
+def section(name):
+    """Time a block of page code (e.g. "sort", "export", "render")"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        observe("contacts_section_seconds", (("section", name),), seconds)
+        trace = _trace.get()
+        if trace is not None:
+            trace.sections[name] += seconds
+
+
+class InstrumentedCursor:
+    """Cursor proxy timing each statement and counting the rows fetched from it"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self._statement = "OTHER"
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def _record(self, seconds, rows=0, query=False):
+        labels = (("statement", self._statement),)
+        observe("contacts_sql_seconds", labels, seconds)
+        if rows:
+            increment("contacts_sql_rows_total", labels, rows)
+        trace = _trace.get()
+        if trace is not None:
+            trace.db_time += seconds
+            trace.rows += rows
+            if query:
+                trace.queries += 1
+
+    def _run(self, method, query, *args):
+        self._statement = query.lstrip().split(None, 1)[0].upper() if query.strip() else "OTHER"
+        start = time.perf_counter()
+        try:
+            return method(query, *args)
+        finally:
+            self._record(time.perf_counter() - start, query=True)
+
+    def execute(self, query, params=()):
+        return self._run(self._cursor.execute, query, params)
+
+    def executemany(self, query, seq_params):
+        return self._run(self._cursor.executemany, query, seq_params)
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = self._cursor.fetchone()
+        self._record(time.perf_counter() - start, 0 if row is None else 1)
+        return row
+
+    def fetchmany(self, size):
+        start = time.perf_counter()
+        rows = self._cursor.fetchmany(size)
+        self._record(time.perf_counter() - start, len(rows))
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = self._cursor.fetchall()
+        self._record(time.perf_counter() - start, len(rows))
+        return rows
+
+
+class InstrumentedConnection:
+    """Connection proxy whose cursors are instrumented"""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def cursor(self, *args, **kwargs):
+        return InstrumentedCursor(self._conn.cursor(*args, **kwargs))
+
+
+def _format_labels(labels, extra=()):
+    pairs = tuple(labels) + tuple(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in pairs) + "}"
+
+
+def prometheus_text():
+    """Cumulative metrics in the Prometheus text exposition format"""
+    with _lock:
+        histograms = sorted((key, (list(h.bucket_counts), h.count, h.sum)) for key, h in _histograms.items())
+        counters = sorted(_counters.items())
+
+    lines, typed = [], set()
+
+    def header(name, kind):
+        if name not in typed:
+            typed.add(name)
+            if name in HELP:
+                lines.append(f"# HELP {name} {HELP[name]}")
+            lines.append(f"# TYPE {name} {kind}")
+
+    for (name, labels), (bucket_counts, count, total) in histograms:
+        header(name, "histogram")
+        cumulative = 0
+        for bound, bucket_count in zip(BUCKETS + ("+Inf",), bucket_counts):
+            cumulative += bucket_count
+            lines.append(f"{name}_bucket{_format_labels(labels, (('le', bound),))} {cumulative}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {total:.6f}")
+        lines.append(f"{name}_count{_format_labels(labels)} {count}")
+    for (name, labels), value in counters:
+        header(name, "counter")
+        lines.append(f"{name}{_format_labels(labels)} {value:g}")
+    for collect in list(_collectors.values()):
+        for name, value in sorted(collect().items()):
+            header(name, "gauge")
+            lines.append(f"{name} {value:g}")
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path=None):
+    """Atomically rewrite the metrics file (for node_exporter's textfile collector or similar)"""
+    path = path or METRICS_FILE
+    if not path:
+        return
+    # Every session calls this after its rerun, so each write gets its own temporary file
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(prometheus_text())
+            os.chmod(tmp_path, 0o644)  # mkstemp creates it readable by the owner only
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    except OSError as e:
+        # A failed export must not fail the page
+        print(f"Error writing metrics file: {e}")
+
+
+def _metrics_handler():
+    # http.server is only imported when the endpoint is enabled
+    from http.server import BaseHTTPRequestHandler
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            body = prometheus_text().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return MetricsHandler
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def serve(port=None, host="127.0.0.1"):
+    """Serve /metrics on a local port from a background thread, once per process"""
+    global _server
+    port = port or METRICS_PORT
+    if not port:
+        return None
+    with _server_lock:
+        if _server is None:
+            from http.server import ThreadingHTTPServer
+            _server = ThreadingHTTPServer((host, port), _metrics_handler())
+            threading.Thread(target=_server.serve_forever, name="metrics-http", daemon=True).start()
+        return _server
@@ -0,0 +1,152 @@
+"""Move per-user contacts_<username> tables into the shared contacts table.
+
+Runs online, in small batches, while the app keeps serving from the per-user
+tables. Progress is checkpointed per user, so the tool can be stopped and re-run
+at any time; a re-run only copies rows added since the last one. MySQL only
+(the checksums use CRC32 and the table list comes from information_schema).
+
+Cut-over:
+    1. python migrate_tenancy.py               # bulk copy while the app is live
+    2. stop writes (maintenance window), then
+       python migrate_tenancy.py --verify      # copy the last new rows, re-sync users that differ
+    3. restart the app with CONTACTS_STORAGE_MODE=shared
+"""
+import argparse
+import time
+
+from database import Database, SHARED_CONTACTS_TABLE, contacts_table_name
+from storage import Error
+
+DEFAULT_BATCH_SIZE = 1000
+
+COPY_COLUMNS = "name, phone, email, date_added, phone_e164, email_norm"
+
+# Order-independent fingerprint of a user's contacts, compared between old and new tables
+CHECKSUM_SQL = (
+    "SELECT COUNT(*), COALESCE(SUM(CRC32(CONCAT_WS('|', name, phone, IFNULL(email, ''), date_added))), 0) "
+    "FROM {table} {where}"
+)
+
+
+class TenancyMigration:
+    def __init__(self, db, batch_size=DEFAULT_BATCH_SIZE, pause=0.0):
+        self.db = db
+        self.batch_size = batch_size
+        self.pause = pause  # seconds to sleep between batches to leave room for live traffic
+
+    def setup(self):
+        self.db.create_shared_contacts_table()
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS tenancy_migration (
+                    username VARCHAR(255) PRIMARY KEY,
+                    last_id INT NOT NULL DEFAULT 0,
+                    copied INT NOT NULL DEFAULT 0,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+                )
+            """)
+
+    def users(self):
+        """(user id, username) of every user that still has a per-user table"""
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT table_name FROM information_schema.tables "
+                "WHERE table_schema = DATABASE() AND table_name LIKE 'contacts\\_%'"
+            )
+            tables = {row[0].lower() for row in cursor.fetchall()}
+            cursor.execute("SELECT id, username FROM users ORDER BY id")
+            return [(user_id, username) for user_id, username in cursor.fetchall()
+                    if contacts_table_name(username) in tables]
+
+    def copy_user(self, user_id, username):
+        """Copy rows past the user's checkpoint; returns the number of rows copied"""
+        table = contacts_table_name(username)
+        copied = 0
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT last_id FROM tenancy_migration WHERE username = %s", (username,))
+            row = cursor.fetchone()
+            last_id = row[0] if row else 0
+
+            while True:
+                cursor.execute(
+                    f"SELECT id, {COPY_COLUMNS} FROM {table} WHERE id > %s ORDER BY id LIMIT %s",
+                    (last_id, self.batch_size)
+                )
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+
+                # Rows and checkpoint commit together, so a crash never copies a row twice
+                conn.start_transaction()
+                cursor.executemany(
+                    f"INSERT INTO {SHARED_CONTACTS_TABLE} (user_id, {COPY_COLUMNS}) VALUES (%s, %s, %s, %s, %s, %s, %s)",
+                    [(user_id,) + tuple(row[1:]) for row in rows]
+                )
+                last_id = rows[-1][0]
+                cursor.execute(
+                    "INSERT INTO tenancy_migration (username, last_id, copied) VALUES (%s, %s, %s) "
+                    "ON DUPLICATE KEY UPDATE last_id = VALUES(last_id), copied = copied + VALUES(copied)",
+                    (username, last_id, len(rows))
+                )
+                conn.commit()
+                copied += len(rows)
+                if self.pause:
+                    time.sleep(self.pause)
+        return copied
+
+    def verify_user(self, user_id, username):
+        """True if the shared table holds exactly the user's per-user rows"""
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(CHECKSUM_SQL.format(table=contacts_table_name(username), where=""))
+            source = cursor.fetchone()
+            cursor.execute(CHECKSUM_SQL.format(table=SHARED_CONTACTS_TABLE, where="WHERE user_id = %s"), (user_id,))
+            target = cursor.fetchone()
+        return tuple(source) == tuple(target)
+
+    def resync_user(self, user_id, username):
+        """Drop the user's copied rows and copy them again (picks up updates and deletes)"""
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            # Delete in batches to keep each transaction (and its locks) short
+            while True:
+                cursor.execute(
+                    f"DELETE FROM {SHARED_CONTACTS_TABLE} WHERE user_id = %s LIMIT %s",
+                    (user_id, self.batch_size)
+                )
+                if cursor.rowcount == 0:
+                    break
+            cursor.execute("DELETE FROM tenancy_migration WHERE username = %s", (username,))
+        return self.copy_user(user_id, username)
+
+    def run(self, verify=False):
+        self.setup()
+        for user_id, username in self.users():
+            copied = self.copy_user(user_id, username)
+            print(f"{username}: {copied} rows copied")
+            if verify and not self.verify_user(user_id, username):
+                copied = self.resync_user(user_id, username)
+                status = "OK" if self.verify_user(user_id, username) else "MISMATCH"
+                print(f"{username}: changed during copy, re-synced {copied} rows ({status})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate per-user contacts tables into one shared table")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Rows copied per transaction")
+    parser.add_argument("--pause", type=float, default=0.0, help="Seconds to sleep between batches")
+    parser.add_argument("--verify", action="store_true",
+                        help="Compare checksums after copying and re-sync users whose rows changed")
+    args = parser.parse_args()
+
+    try:
+        TenancyMigration(Database(), args.batch_size, args.pause).run(verify=args.verify)
+    except Error as e:
+        print(f"Migration failed: {e}")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
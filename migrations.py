@@ -0,0 +1,188 @@
+"""Versioned schema migrations, applied once per process by Database().
+
+Each migration is a version, a name and a function returning the DDL it still
+needs, so re-running one against a schema that already has its tables and
+indexes does nothing. Applied versions are recorded in schema_migrations; new
+migrations are appended with the next version number, never renumbered.
+
+    python migrations.py               # apply pending migrations, with EXPLAIN plans before and after
+    python migrations.py --dry-run     # show what would run and the plans, change nothing
+    python migrations.py --table contacts_alice
+"""
+import argparse
+
+from database import CONTACT_SORT_INDEXES, SHARED_CONTACTS_TABLE, SHARED_SORT_INDEXES, Database
+from storage import CANONICAL_COLUMNS, Error, IntegrityError
+
+MIGRATIONS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INTEGER PRIMARY KEY,
+        name VARCHAR(255) NOT NULL,
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+# The listing queries whose plans the indexes are for ({where} restricts the shared table to one user)
+EXPLAIN_QUERIES = (
+    ("page by name", "SELECT id, name, phone, email, date_added FROM {table} {where} "
+                     "ORDER BY name ASC, id ASC LIMIT 11"),
+    ("page by date", "SELECT id, name, phone, email, date_added FROM {table} {where} "
+                     "ORDER BY date_added DESC, id DESC LIMIT 11"),
+    ("full list", "SELECT id, name, phone, email, date_added FROM {table} {where} ORDER BY date_added DESC"),
+)
+
+
+def _contact_tables(db, cursor):
+    return [table for table in db.backend.table_names(cursor)
+            if table == SHARED_CONTACTS_TABLE or table.startswith("contacts_")]
+
+
+def _users_table(db, cursor):
+    return db.backend.users_table_sql()
+
+
+def _versions_table(db, cursor):
+    # One row per user, bumped on every contact write; lets caches check for changes cheaply
+    return db.backend.versions_table_sql()
+
+
+def _contact_sort_indexes(db, cursor):
+    # Every listing sorts on name or date_added; tables created before the indexes were
+    # part of CREATE TABLE have to get them here
+    statements = []
+    for table in _contact_tables(db, cursor):
+        if table == SHARED_CONTACTS_TABLE:
+            statements += db.backend.missing_index_sql(cursor, table, SHARED_SORT_INDEXES, owner="user_id, ")
+        else:
+            statements += db.backend.missing_index_sql(cursor, table, CONTACT_SORT_INDEXES)
+    return statements
+
+
+def _contact_canonical_columns(db, cursor):
+    # Nullable, so adding them is cheap; backfill_canonical.py fills existing rows and
+    # only then adds their unique keys
+    statements = []
+    for table in _contact_tables(db, cursor):
+        statements += db.backend.missing_column_sql(cursor, table, CANONICAL_COLUMNS)
+    return statements
+
+
+def _username_key(db, cursor):
+    # Usernames differing only in case share a contacts table, so they must not both register
+    return db.backend.username_key_sql(cursor)
+
+
+def _login_throttle_table(db, cursor):
+    # Failed logins and lockouts shared by app processes (LOGIN_THROTTLE_PERSIST=1)
+    return db.backend.login_throttle_table_sql()
+
+
+# (version, name, function(db, cursor) -> DDL statements still to run)
+MIGRATIONS = (
+    (1, "create_users_table", _users_table),
+    (2, "create_contact_versions_table", _versions_table),
+    (3, "contact_sort_indexes", _contact_sort_indexes),
+    (4, "contact_canonical_columns", _contact_canonical_columns),
+    (5, "create_login_throttle_table", _login_throttle_table),
+    (6, "username_case_insensitive", _username_key),
+)
+
+
+def applied_versions(db, cursor):
+    if "schema_migrations" not in db.backend.table_names(cursor):
+        return set()
+    cursor.execute("SELECT version FROM schema_migrations")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def pending_migrations(db, cursor):
+    applied = applied_versions(db, cursor)
+    return [migration for migration in MIGRATIONS if migration[0] not in applied]
+
+
+def migrate(db, verbose=False):
+    """Apply the pending migrations in order and return their versions"""
+    applied = []
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(MIGRATIONS_TABLE_SQL)
+        for version, name, statements in pending_migrations(db, cursor):
+            if verbose:
+                print(f"Applying {version} {name}")
+            for statement in statements(db, cursor):
+                if verbose:
+                    print(f"  {' '.join(statement.split())}")
+                cursor.execute(statement)
+            try:
+                cursor.execute("INSERT INTO schema_migrations (version, name) VALUES (%s, %s)", (version, name))
+            except IntegrityError:
+                pass  # Another process applied it at the same time
+            applied.append(version)
+    return applied
+
+
+def explain_plans(db, cursor, table):
+    where = "WHERE user_id = 0" if table == SHARED_CONTACTS_TABLE else ""
+    return [(label, db.backend.explain(cursor, query.format(table=table, where=where)))
+            for label, query in EXPLAIN_QUERIES]
+
+
+def print_plans(plans, heading):
+    print(heading)
+    for label, lines in plans:
+        print(f"  {label}:")
+        for line in lines:
+            print(f"    {line}")
+
+
+def preview(db, conn, cursor, pending, table):
+    """Print what the pending migrations would run, and the plans after them if the DDL can be rolled back"""
+    if db.backend.transactional_ddl:
+        conn.start_transaction()
+    for version, name, statements in pending:
+        print(f"Would apply {version} {name}")
+        for statement in statements(db, cursor):
+            print(f"  {' '.join(statement.split())}")
+            if db.backend.transactional_ddl:
+                cursor.execute(statement)
+    if not db.backend.transactional_ddl:
+        print(f"{db.backend.name} cannot roll back DDL, so the plans after are only shown by a real run")
+        return
+    if table:
+        print_plans(explain_plans(db, cursor, table), f"Plans for {table} after:")
+    conn.rollback()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply pending schema migrations")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Show the pending statements and query plans without changing the schema")
+    parser.add_argument("--table", help="Contacts table to show query plans for (default: the first one)")
+    args = parser.parse_args()
+
+    db = Database(migrate=False)
+    try:
+        with db.connection() as conn:
+            cursor = conn.cursor()
+            pending = pending_migrations(db, cursor)
+            tables = _contact_tables(db, cursor)
+            table = args.table or (tables[0] if tables else None)
+            if table:
+                print_plans(explain_plans(db, cursor, table), f"Plans for {table} before:")
+            if not pending:
+                print("Schema is up to date")
+                return
+            if args.dry_run:
+                preview(db, conn, cursor, pending, table)
+                return
+
+        migrate(db, verbose=True)
+        if table:
+            with db.connection() as conn:
+                print_plans(explain_plans(db, conn.cursor(), table), f"Plans for {table} after:")
+    except Error as e:
+        raise SystemExit(f"Migration failed: {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,167 +1,749 @@
-from database import Database
-from mysql.connector import Error
-
-class ContactOperations:
-    def __init__(self):
-        self.db = Database()
-        self.connection = self.db.get_connection()
-    
-    def register_user(self, username, password):
-        try:
-            cursor = self.connection.cursor()
-            # Check if username already exists
-            cursor.execute("SELECT * FROM users WHERE username = %s", (username,))
-            if cursor.fetchone():
-                return False, "Username already exists"
-            
-            # Insert new user
-            cursor.execute(
-                "INSERT INTO users (username, password) VALUES (%s, %s)",
-                (username, password)
-            )
-            self.connection.commit()
-            
-            # Create user's contacts table
-            if self.db.create_user_contacts_table(username):
-                return True, "User registered successfully"
-            else:
-                return False, "Error creating user contacts table"
-        except Error as e:
-            return False, f"Error registering user: {e}"
-    
-    def authenticate_user(self, username, password):
-        try:
-            cursor = self.connection.cursor()
-            cursor.execute(
-                "SELECT * FROM users WHERE username = %s AND password = %s",
-                (username, password)
-            )
-            user = cursor.fetchone()
-            return user is not None
-        except Error as e:
-            print(f"Error authenticating user: {e}")
-            return False
-    
-    def get_contacts(self, username):
-        try:
-            cursor = self.connection.cursor(dictionary=True)
-            table_name = f"contacts_{username.replace(' ', '_').lower()}"
-            cursor.execute(f"SELECT * FROM {table_name} ORDER BY date_added DESC")
-            return cursor.fetchall()
-        except Error as e:
-            print(f"Error fetching contacts: {e}")
-            return []
-    
-    def add_contact(self, username, name, phone, email):
-        try:
-            cursor = self.connection.cursor()
-            table_name = f"contacts_{username.replace(' ', '_').lower()}"
-        
-            # First check if phone number already exists
-            cursor.execute(
-                f"SELECT COUNT(*) FROM {table_name} WHERE phone = %s",
-                (phone,)
-            )
-            phone_exists = cursor.fetchone()[0] > 0
-        
-            if phone_exists:
-                return False, "Phone number already exists in your contacts"
-        
-            # Check if email exists (only if email is provided and not NULL)
-            if email:  # email is not None and not empty string
-                cursor.execute(
-                    f"SELECT COUNT(*) FROM {table_name} WHERE email = %s AND email IS NOT NULL",
-                    (email,)
-                )
-                email_exists = cursor.fetchone()[0] > 0
-            
-                if email_exists:
-                    return False, "Email address already exists in your contacts"
-        
-                # If no duplicates found, insert the new contact
-            cursor.execute(
-                f"INSERT INTO {table_name} (name, phone, email) VALUES (%s, %s, %s)",
-                (name, phone, email)
-            )
-            self.connection.commit()
-            return True, "Contact added successfully"
-        
-        except Error as e:
-            return False, f"Error adding contact: {e}"
-    
-    def update_contact(self, username, contact_id, name, phone, email):
-        try:
-            cursor = self.connection.cursor()
-            table_name = f"contacts_{username.replace(' ', '_').lower()}"
-        
-            # First, check if the phone number already exists (excluding current contact)
-            cursor.execute(
-                f"SELECT id FROM {table_name} WHERE phone = %s AND id != %s",
-                (phone, contact_id)
-                )
-            if cursor.fetchone():
-                return False, "Phone number already exists for another contact"
-        
-            # Check if the email already exists (excluding current contact)
-            cursor.execute(
-                f"SELECT id FROM {table_name} WHERE email = %s AND id != %s",
-                (email, contact_id)
-            )
-            if cursor.fetchone():
-                return False, "Email already exists for another contact"
-        
-            # If no duplicates found, proceed with the update
-            cursor.execute(
-                f"UPDATE {table_name} SET name = %s, phone = %s, email = %s WHERE id = %s",
-                (name, phone, email, contact_id)
-            )
-            self.connection.commit()
-            return True, "Contact updated successfully"
-        
-        except Error as e:
-            return False, f"Error updating contact: {e}"
-    
-    def delete_contact(self, username, contact_id):
-        try:
-            cursor = self.connection.cursor()
-            table_name = f"contacts_{username.replace(' ', '_').lower()}"
-            cursor.execute(f"DELETE FROM {table_name} WHERE id = %s", (contact_id,))
-            self.connection.commit()
-            return True, "Contact deleted successfully"
-        except Error as e:
-            return False, f"Error deleting contact: {e}"
-    
-    def search_contacts(self, username, search_term):
-        try:
-            cursor = self.connection.cursor(dictionary=True)
-            table_name = f"contacts_{username.replace(' ', '_').lower()}"
-            query = f"""
-                SELECT * FROM {table_name} 
-                WHERE name LIKE %s OR phone LIKE %s OR email LIKE %s 
-                ORDER BY date_added DESC
-            """
-            search_pattern = f"%{search_term}%"
-            cursor.execute(query, (search_pattern, search_pattern, search_pattern))
-            return cursor.fetchall()
-        except Error as e:
-            print(f"Error searching contacts: {e}")
-            return []
-    
-    def is_duplicate_contact(self, username, name, phone, email):
-        """Check if a contact with the same name, phone, or email already exists"""
-        try:
-            cursor = self.connection.cursor(dictionary=True)
-            table_name = f"contacts_{username.replace(' ', '_').lower()}"
-            
-            # Check for duplicates
-            query = f"""
-                SELECT * FROM {table_name} 
-                WHERE name = %s OR phone = %s OR email = %s
-            """
-            cursor.execute(query, (name, phone, email))
-            duplicates = cursor.fetchall()
-            
-            return len(duplicates) > 0
-        except Error as e:
-            print(f"Error checking for duplicates: {e}")
-            return False
\ No newline at end of file
+import re
+import threading
+from datetime import datetime
+
+from database import Database, tenant_key
+from storage import Error, IntegrityError, error_message
+from contact_cache import MISSING, contact_cache, estimate_rows_size
+from contact_store import ContactStore
+from passwords import PasswordHasherBusy, password_hasher
+from throttle import login_throttle
+from validation import COUNTRY_CODE, clean_phone, normalize_email, phone_e164
+import metrics
+import search_index
+
+CONTACT_COLUMNS = "id, name, phone, email, date_added"
+CONTACT_FETCH_SIZE = 5000
+# Most contacts offered by the Edit / Delete picker for one typed prefix
+PICKER_LIMIT = 20
+# Rough memory per contact of a cached store with both sort indexes built; address
+# books whose estimate fits the cache budget are paged in memory instead of in SQL
+STORE_BYTES_PER_CONTACT = 600
+
+# Columns the contacts table view can be sorted on (each backed by an index)
+SORT_COLUMNS = {
+    "name": "name",
+    "date_added": "date_added",
+}
+
+SUCCESS_MESSAGES = {
+    "add": "Contact added successfully",
+    "update": "Contact updated successfully",
+    "delete": "Contact deleted successfully",
+}
+# Update / delete of an id that was deleted meanwhile (or belongs to another user)
+CONTACT_GONE_MESSAGE = "Contact no longer exists"
+FAILURE_MESSAGES = {
+    "add": "Error adding contact",
+    "update": "Error updating contact",
+    "delete": "Error deleting contact",
+}
+
+# Unique key violated by an add / update -> message shown to the user
+DUPLICATE_MESSAGES = {
+    "add": {
+        "unique_phone": "Phone number already exists in your contacts",
+        "unique_email": "Email address already exists in your contacts",
+    },
+    "update": {
+        "unique_phone": "Phone number already exists for another contact",
+        "unique_email": "Email already exists for another contact",
+    },
+}
+
+
+# Columns every insert / update writes (date_added last, set on insert only)
+WRITE_COLUMNS = ("name", "phone", "email", "phone_e164", "email_norm", "date_added")
+UPDATE_ASSIGNMENTS = ", ".join(f"{column} = %s" for column in WRITE_COLUMNS[:-1])
+
+
+def _write_values(name, phone, email):
+    """Values for WRITE_COLUMNS minus date_added: the contact as entered plus its canonical phone / email"""
+    email = email or None
+    return name, phone, email, phone_e164(phone), normalize_email(email)
+
+
+def _duplicate_message(op, key, error):
+    message = DUPLICATE_MESSAGES.get(op, {}).get(key)
+    return message or f"{FAILURE_MESSAGES[op]}: {error}"
+
+
+def _cache_gauges():
+    return {f"contacts_cache_{name}": value for name, value in contact_cache.stats().items()}
+
+
+metrics.register_collector("contact_cache", _cache_gauges)
+
+
+def _throttle_gauges():
+    return {f"contacts_login_{name}": value for name, value in login_throttle.stats().items()}
+
+
+metrics.register_collector("login_throttle", _throttle_gauges)
+
+
+def _hasher_gauges():
+    return {f"contacts_password_hasher_{name}": value for name, value in password_hasher.stats().items()}
+
+
+metrics.register_collector("password_hasher", _hasher_gauges)
+
+# Guards the ContactStores shared through the cache, which writes update in place
+_shared_store_lock = threading.Lock()
+
+
+@metrics.instrument_methods
+class ContactOperations:
+    def __init__(self):
+        # Connections are borrowed from the process-wide pool per operation
+        self.db = Database()
+
+    def register_user(self, username, password):
+        try:
+            with self.db.connection() as conn:
+                cursor = conn.cursor()
+                # Check if username already exists
+                cursor.execute("SELECT * FROM users WHERE username = %s", (username,))
+                if cursor.fetchone():
+                    return False, "Username already exists"
+
+            # Salted and hashed on the hashing pool, without holding a connection
+            password_hash = password_hasher.hash(password)
+            with self.db.connection() as conn:
+                # Insert new user
+                conn.cursor().execute(
+                    "INSERT INTO users (username, password) VALUES (%s, %s)",
+                    (username, password_hash)
+                )
+                conn.commit()
+
+            # Create user's contacts table
+            if self.db.create_user_contacts_table(username):
+                return True, "User registered successfully"
+            else:
+                return False, "Error creating user contacts table"
+        except PasswordHasherBusy:
+            return False, "Too many sign-ups in progress, please try again in a moment"
+        except IntegrityError:
+            # Registered by someone else since the check, possibly with different case
+            return False, "Username already exists"
+        except Error as e:
+            return False, f"Error registering user: {e}"
+
+    def authenticate_user(self, username, password):
+        """Check the password against the user's hash on the hashing pool.
+
+        Plain-text passwords from before hashing, and hashes made with older
+        parameters, are replaced with a current hash on a successful login.
+        Raises PasswordHasherBusy when too many hashes are already queued.
+        """
+        try:
+            with self.db.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT password FROM users WHERE username = %s", (username,))
+                row = cursor.fetchone()
+            # The connection goes back to the pool while the hash runs
+            stored = row[0] if row else None
+            valid, rehash = password_hasher.verify(password, stored)
+            if valid and rehash:
+                try:
+                    new_hash = password_hasher.hash(password)
+                except PasswordHasherBusy:
+                    # The login still succeeds; the rehash is retried at the next one
+                    return valid
+                with self.db.connection() as conn:
+                    # Only replaces the value that was verified, in case another login rehashed it first
+                    conn.cursor().execute(
+                        "UPDATE users SET password = %s WHERE username = %s AND password = %s",
+                        (new_hash, username, stored)
+                    )
+            return valid
+        except Error as e:
+            print(f"Error authenticating user: {e}")
+            return False
+
+    def list_usernames(self):
+        """Every registered username, oldest account first"""
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT username FROM users ORDER BY id")
+            return [username for username, in cursor.fetchall()]
+
+    def login(self, username, password, client=None):
+        """authenticate_user behind the shared login throttle.
+
+        Returns (success, seconds locked, attempts left for the username); a locked
+        username or client is turned away without querying the database.
+        """
+        retry_after = login_throttle.check(username, client)
+        if retry_after:
+            return False, retry_after, 0
+        if self.authenticate_user(username, password):
+            login_throttle.record_success(username, client)
+            return True, 0.0, None
+        attempts_left, retry_after = login_throttle.record_failure(username, client)
+        return False, retry_after, attempts_left
+
+    def get_contacts(self, username):
+        """All of the user's contacts, newest first, as a ContactStore the caller may modify.
+
+        Built from plain tuples in chunks, so no per-row dicts are created, and served
+        from the shared cache while the data version is unchanged.
+        """
+        version = self.get_data_version(username)
+        store = self._load_contacts(username, version)
+        if store is None:
+            return ContactStore()
+        with _shared_store_lock:
+            return store.copy()
+
+    def _load_contacts(self, username, version):
+        """The shared store for this data version (cached), or None on error; use it under _shared_store_lock"""
+        key = (username, version, "contacts")
+        if version is not None:
+            store = contact_cache.get(key)
+            if store is not MISSING:
+                return store
+        store = ContactStore()
+        try:
+            scope = self.db.contact_scope(username)
+            with self.db.connection() as conn:
+                cursor = conn.cursor()
+                where, params = scope.where()
+                cursor.execute(f"SELECT {CONTACT_COLUMNS} FROM {scope.table} {where} ORDER BY date_added DESC", params)
+                while True:
+                    rows = cursor.fetchmany(CONTACT_FETCH_SIZE)
+                    if not rows:
+                        break
+                    store.extend_tuples(rows)
+        except Error as e:
+            print(f"Error fetching contacts: {e}")
+            return None
+        if version is not None:
+            contact_cache.put(key, store, store.nbytes())
+        return store
+
+    def _advance_cached_contacts(self, username, version, changes):
+        """Carry the cached store from the previous version to `version` by applying the (op, row) changes.
+
+        The store and its sort indexes are updated in place (bisect, no re-sort) under
+        the shared store lock, instead of being reloaded and re-sorted on the next read.
+
+        A reader that loaded just after the write committed may have cached rows that
+        already include it under the previous version, so adds already present are
+        skipped; an update or delete of an id the store lacks means it is out of step
+        with the table, and it is dropped to be reloaded instead.
+        """
+        store = contact_cache.get((username, version - 1, "contacts"))
+        contact_cache.invalidate_user(username)
+        if store is MISSING:
+            return
+        with _shared_store_lock:
+            for op, row in changes:
+                if op == "add":
+                    if store.position(row["id"]) is None:
+                        store.insert_row(0, row)
+                elif op == "update":
+                    if not store.update_row(row["id"], row):
+                        return
+                elif not store.remove_row(row["id"]):
+                    return
+            size = store.nbytes()
+        contact_cache.put((username, version, "contacts"), store, size)
+
+    def _read_sorted_store(self, key, store, sort_key, read):
+        """read() the cached shared store, re-accounting its cache entry if that built the sort index.
+
+        Stores are cached at their size before any sort index exists; each index adds
+        roughly as much again, which the cache budget has to see.
+        """
+        with _shared_store_lock:
+            built = not store.has_sort_index(sort_key)
+            result = read()
+            size = store.nbytes() if built else None
+        if built:
+            contact_cache.resize(key, store, size)
+        return result
+
+    def get_contacts_page(self, username, sort_key="name", direction="asc", cursor=None, page_size=10):
+        """Fetch one page of contacts (keyset pagination).
+
+        `cursor` is the (sort value, id) of the last row of the previous page, or None
+        for the first page. Returns (rows, next_cursor); next_cursor is None on the last page.
+
+        Address books that fit the cache are paged from the shared store's sort indexes,
+        sorted once per data version and then kept up to date by the writes; larger ones
+        are sorted and limited in SQL.
+        """
+        column = SORT_COLUMNS[sort_key]
+        version = self.get_data_version(username)
+        store = MISSING if version is None else contact_cache.get((username, version, "contacts"))
+        if store is MISSING and version is not None and \
+                self.count_contacts(username) * STORE_BYTES_PER_CONTACT <= contact_cache.max_bytes:
+            store = self._load_contacts(username, version)
+        if store is not MISSING and store is not None:
+            return self._read_sorted_store(
+                (username, version, "contacts"), store, sort_key,
+                lambda: store.page(sort_key, direction, cursor, page_size)
+            )
+
+        order, op = ("ASC", ">") if direction == "asc" else ("DESC", "<")
+        try:
+            scope = self.db.contact_scope(username)
+            with self.db.connection() as conn:
+                db_cursor = conn.cursor(dictionary=True)
+
+                if cursor is None:
+                    where, params = scope.where()
+                else:
+                    where, params = scope.where(f"{column} {op} %s OR ({column} = %s AND id {op} %s)")
+                    params += (cursor[0], cursor[0], cursor[1])
+
+                # Fetch one extra row to know whether there is a next page
+                db_cursor.execute(
+                    f"SELECT {CONTACT_COLUMNS} FROM {scope.table} {where} "
+                    f"ORDER BY {column} {order}, id {order} LIMIT %s",
+                    params + (page_size + 1,)
+                )
+                rows = db_cursor.fetchall()
+        except Error as e:
+            print(f"Error fetching contacts page: {e}")
+            return [], None
+
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            last = rows[-1]
+            return rows, (last[column], last["id"])
+        return rows, None
+
+    def count_contacts(self, username):
+        version = self.get_data_version(username)
+        key = (username, version, "count")
+        if version is not None:
+            store = contact_cache.get((username, version, "contacts"))
+            if store is not MISSING:
+                return len(store)
+            count = contact_cache.get(key)
+            if count is not MISSING:
+                return count
+        try:
+            scope = self.db.contact_scope(username)
+            with self.db.connection() as conn:
+                cursor = conn.cursor()
+                where, params = scope.where()
+                cursor.execute(f"SELECT COUNT(*) FROM {scope.table} {where}", params)
+                count = cursor.fetchone()[0]
+        except Error as e:
+            print(f"Error counting contacts: {e}")
+            return 0
+        if version is not None:
+            contact_cache.put(key, count, 64)
+        return count
+
+    def find_existing_contact_keys(self, username, phones, emails):
+        """Return the (phones, emails) among the given canonical ones (phone_e164 / email_norm) already stored.
+
+        Both lists are matched on the indexed canonical columns, so this is one index
+        seek per value whatever formatting the stored contacts were typed with.
+        """
+        phones, emails = list(phones), list(emails)
+        if not phones and not emails:
+            return set(), set()
+        conditions, params = [], []
+        if phones:
+            conditions.append(f"phone_e164 IN ({', '.join(['%s'] * len(phones))})")
+            params.extend(phones)
+        if emails:
+            conditions.append(f"email_norm IN ({', '.join(['%s'] * len(emails))})")
+            params.extend(emails)
+
+        scope = self.db.contact_scope(username)
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            where, scope_params = scope.where(" OR ".join(conditions))
+            cursor.execute(
+                f"SELECT phone_e164, email_norm FROM {scope.table} {where}",
+                scope_params + tuple(params)
+            )
+            existing_phones, existing_emails = set(), set()
+            for phone, email in cursor.fetchall():
+                if phone:
+                    existing_phones.add(phone)
+                if email:
+                    existing_emails.add(email)
+            return existing_phones, existing_emails
+
+    def bulk_insert_contacts(self, username, rows):
+        """Insert (name, phone, email) tuples with one executemany in a single transaction.
+
+        If the batch hits a unique key (e.g. a concurrent add), it is retried row by row
+        so the other rows still go in. Returns (inserted_count, [(row_index, message), ...]).
+        """
+        if not rows:
+            return 0, []
+        scope = self.db.contact_scope(username)
+        date_added = datetime.now().replace(microsecond=0)
+        query, owner_params = scope.insert(WRITE_COLUMNS)
+        params = [owner_params + _write_values(name, phone, email) + (date_added,) for name, phone, email in rows]
+
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                conn.start_transaction()
+                cursor.executemany(query, params)
+                version = self.db.bump_version(cursor, username)
+                conn.commit()
+                inserted, failures = len(rows), []
+            except IntegrityError:
+                conn.rollback()
+                inserted, failures = 0, []
+                conn.start_transaction()
+                for i, row_params in enumerate(params):
+                    try:
+                        cursor.execute(query, row_params)
+                        inserted += 1
+                    except IntegrityError as e:
+                        failures.append((i, f"Duplicate contact: {error_message(e)}"))
+                if inserted:
+                    version = self.db.bump_version(cursor, username)
+                conn.commit()
+
+        if inserted:
+            self._wrote_version(username, version)
+            contact_cache.invalidate_user(username)
+            # Rebuilt on the next search rather than indexing row by row
+            search_index.drop_index(username)
+        return inserted, failures
+
+    def add_contact(self, username, name, phone, email):
+        return self._apply_one(username, {"op": "add", "name": name, "phone": phone, "email": email})
+
+    def update_contact(self, username, contact_id, name, phone, email):
+        return self._apply_one(
+            username, {"op": "update", "id": contact_id, "name": name, "phone": phone, "email": email}
+        )
+
+    def delete_contact(self, username, contact_id):
+        return self._apply_one(username, {"op": "delete", "id": contact_id})
+
+    def _apply_one(self, username, change):
+        success, message, rows = self.apply_changes(username, [change])
+        return success, message, rows[0] if success else None
+
+    def apply_changes(self, username, changes):
+        """Apply a batch of adds, updates and deletes in one transaction.
+
+        Each change is a dict with an "op" of "add" (name, phone, email), "update"
+        (id, name, phone, email) or "delete" (id). Duplicates are rejected by the unique
+        keys instead of SELECTs beforehand, and the batch is all or nothing: an update
+        or delete of a contact that no longer exists fails it too.
+
+        Returns (success, message, rows) with one row per change: the new contact for
+        adds, the updated fields for updates and {"id": ...} for deletes.
+        """
+        changes = list(changes)
+        if not changes:
+            return True, "No changes to apply", []
+        scope = self.db.contact_scope(username)
+        insert_query, owner_params = scope.insert(WRITE_COLUMNS)
+        date_added = datetime.now().replace(microsecond=0)
+        rows = [None] * len(changes)
+        position = 0
+        try:
+            with self.db.connection() as conn:
+                cursor = conn.cursor()
+                conn.start_transaction()
+                while position < len(changes):
+                    change = changes[position]
+                    op = change["op"]
+                    if op == "add":
+                        end = position + 1
+                        while end < len(changes) and changes[end]["op"] == "add":
+                            end += 1
+                        run = changes[position:end]
+                        values = [_write_values(c["name"], c["phone"], c["email"]) for c in run]
+                        if len(run) > 1:
+                            # A run of adds goes in as one multi-row INSERT
+                            cursor.execute("SAVEPOINT add_run")
+                            try:
+                                cursor.executemany(insert_query, [owner_params + v + (date_added,) for v in values])
+                            except IntegrityError:
+                                # Replayed row by row below so the error names the offending change
+                                cursor.execute("ROLLBACK TO SAVEPOINT add_run")
+                            else:
+                                ids = self._ids_by_phone(cursor, scope, [v[1] for v in values])
+                                for name, phone, email, *_ in values:
+                                    rows[position] = {
+                                        "id": ids[phone], "name": name, "phone": phone,
+                                        "email": email, "date_added": date_added,
+                                    }
+                                    position += 1
+                                continue
+                        for value in values:
+                            name, phone, email = value[:3]
+                            cursor.execute(insert_query, owner_params + value + (date_added,))
+                            rows[position] = {
+                                "id": cursor.lastrowid, "name": name, "phone": phone,
+                                "email": email, "date_added": date_added,
+                            }
+                            position += 1
+                    elif op == "update":
+                        value = _write_values(change["name"], change["phone"], change["email"])
+                        email = value[2]
+                        where, params = scope.where("id = %s")
+                        cursor.execute(
+                            f"UPDATE {scope.table} SET {UPDATE_ASSIGNMENTS} {where}",
+                            value + params + (change["id"],)
+                        )
+                        # MySQL counts changed rows, so an update to the same values also reports 0
+                        if cursor.rowcount == 0 and not self._contact_exists(cursor, scope, change["id"]):
+                            return False, self._change_error(changes, position, CONTACT_GONE_MESSAGE), None
+                        # date_added is unchanged, so only the updated fields are returned
+                        rows[position] = {
+                            "id": change["id"], "name": change["name"], "phone": change["phone"], "email": email,
+                        }
+                        position += 1
+                    elif op == "delete":
+                        where, params = scope.where("id = %s")
+                        cursor.execute(f"DELETE FROM {scope.table} {where}", params + (change["id"],))
+                        if cursor.rowcount == 0:
+                            return False, self._change_error(changes, position, CONTACT_GONE_MESSAGE), None
+                        rows[position] = {"id": change["id"]}
+                        position += 1
+                    else:
+                        raise ValueError(f"Unknown contact change: {op!r}")
+                version = self.db.bump_version(cursor, username)
+                conn.commit()
+        except IntegrityError as e:
+            return False, self._change_error(changes, position, _duplicate_message(changes[position]["op"], self.db.duplicate_key(e), e)), None
+        except Error as e:
+            op = changes[min(position, len(changes) - 1)]["op"]
+            return False, self._change_error(changes, position, f"{FAILURE_MESSAGES[op]}: {e}"), None
+
+        applied = [(c["op"], row) for c, row in zip(changes, rows)]
+        self._wrote_version(username, version)
+        self._advance_cached_contacts(username, version, applied)
+        search_index.apply_changes(username, version, applied)
+        if len(changes) == 1:
+            return True, SUCCESS_MESSAGES[changes[0]["op"]], rows
+        return True, f"{len(changes)} changes applied", rows
+
+    @staticmethod
+    def _change_error(changes, position, message):
+        return message if len(changes) == 1 else f"Change {position + 1}: {message}"
+
+    @staticmethod
+    def _contact_exists(cursor, scope, contact_id):
+        where, params = scope.where("id = %s")
+        cursor.execute(f"SELECT 1 FROM {scope.table} {where}", params + (contact_id,))
+        return cursor.fetchone() is not None
+
+    @staticmethod
+    def _ids_by_phone(cursor, scope, phones):
+        """Ids of just-inserted contacts, looked up by their (unique) phone numbers"""
+        where, params = scope.where(f"phone IN ({', '.join(['%s'] * len(phones))})")
+        cursor.execute(f"SELECT phone, id FROM {scope.table} {where}", params + tuple(phones))
+        return dict(cursor.fetchall())
+
+    def iter_contacts(self, username, chunk_size=1000):
+        """Yield the user's contacts in lists of up to `chunk_size` rows.
+
+        The cursor is unbuffered, so rows stream from the server instead of being
+        materialized; the pooled connection is held until the generator finishes or is closed.
+        """
+        scope = self.db.contact_scope(username)
+        with self.db.connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            where, params = scope.where()
+            cursor.execute(f"SELECT {CONTACT_COLUMNS} FROM {scope.table} {where} ORDER BY date_added DESC", params)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield rows
+
+    def iter_contact_fields(self, username, chunk_size=5000):
+        """Yield (id, name, phone, email) tuples in chunks, for whole-table scans that need no dates"""
+        scope = self.db.contact_scope(username)
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            where, params = scope.where()
+            cursor.execute(f"SELECT id, name, phone, email FROM {scope.table} {where}", params)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield rows
+
+    def get_contacts_by_ids(self, username, ids, chunk_size=500):
+        """The user's contacts with the given ids, in no particular order"""
+        ids = list(ids)
+        rows = []
+        scope = self.db.contact_scope(username)
+        with self.db.connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            for start in range(0, len(ids), chunk_size):
+                chunk = ids[start:start + chunk_size]
+                where, params = scope.where(f"id IN ({', '.join(['%s'] * len(chunk))})")
+                cursor.execute(f"SELECT {CONTACT_COLUMNS} FROM {scope.table} {where}", params + tuple(chunk))
+                rows += cursor.fetchall()
+        return rows
+
+    def find_contacts_by_prefix(self, username, prefix, limit=PICKER_LIMIT):
+        """Up to `limit` contacts whose name starts with `prefix` (or phone, if it starts with a digit or +), by name.
+
+        Name prefixes are looked up in the cached store's name index when there is
+        one; otherwise the LIKE 'prefix%' is answered from the name / phone index.
+        """
+        prefix = prefix.strip()
+        column = "phone" if prefix[:1].isdigit() or prefix[:1] == "+" else "name"
+        if column == "name":
+            version = self.get_data_version(username)
+            store = MISSING if version is None else contact_cache.get((username, version, "contacts"))
+            if store is not MISSING:
+                return self._read_sorted_store(
+                    (username, version, "contacts"), store, "name", lambda: store.prefix_matches(prefix, limit)
+                )
+        if column == "phone":
+            # Canonical phones all start with the country code, so a digit prefix is an index range
+            column, prefix = "phone_e164", COUNTRY_CODE + clean_phone(prefix)
+        pattern = re.sub(r"([!%_])", r"!\1", prefix) + "%"
+        try:
+            scope = self.db.contact_scope(username)
+            with self.db.connection() as conn:
+                cursor = conn.cursor(dictionary=True)
+                where, params = scope.where(f"{column} LIKE %s ESCAPE '!'")
+                cursor.execute(
+                    f"SELECT {CONTACT_COLUMNS} FROM {scope.table} {where} ORDER BY name, id LIMIT %s",
+                    params + (pattern, limit)
+                )
+                return cursor.fetchall()
+        except Error as e:
+            print(f"Error finding contacts: {e}")
+            return []
+
+    def get_contact(self, username, contact_id):
+        """One contact by id, or None if it no longer exists"""
+        try:
+            scope = self.db.contact_scope(username)
+            with self.db.connection() as conn:
+                cursor = conn.cursor(dictionary=True)
+                where, params = scope.where("id = %s")
+                cursor.execute(f"SELECT {CONTACT_COLUMNS} FROM {scope.table} {where}", params + (contact_id,))
+                return cursor.fetchone()
+        except Error as e:
+            print(f"Error fetching contact: {e}")
+            return None
+
+    def get_data_version(self, username):
+        """Counter bumped by every write to the user's contacts, in any session or process.
+
+        Read once per rerun: the sidebar, table, search and export buttons all ask for
+        it, so the first value is kept on the rerun trace and writes made by the rerun
+        replace it. Writes from elsewhere show up on the next rerun.
+        """
+        trace = metrics.current_rerun()
+        if trace is not None and username in trace.data_versions:
+            return trace.data_versions[username]
+        try:
+            with self.db.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT version FROM contact_versions WHERE username = %s", (tenant_key(username),))
+                row = cursor.fetchone()
+                version = row[0] if row else 0
+        except Error as e:
+            print(f"Error reading data version: {e}")
+            return None
+        if trace is not None:
+            trace.data_versions[username] = version
+        return version
+
+    @staticmethod
+    def _wrote_version(username, version):
+        """Make the rest of the rerun see the version its own write committed"""
+        trace = metrics.current_rerun()
+        if trace is not None:
+            trace.data_versions[username] = version
+
+    def search_contacts(self, username, search_term, field=None, limit=search_index.SEARCH_RESULT_LIMIT):
+        """Ranked search through the user's in-memory index.
+
+        The index is built from the table on first use and rebuilt when the data version
+        shows a write it has not seen (e.g. from another process).
+
+        `field` is "name", "phone", "email" or None for all fields.
+        """
+        version = self.get_data_version(username)
+        key = (username, version, "search", search_term, field, limit)
+        if version is not None:
+            results = contact_cache.get(key)
+            if results is not MISSING:
+                return list(results)
+        try:
+            index = search_index.get_index(username, version, lambda: self._fetch_all_contacts(username))
+        except Error as e:
+            print(f"Error searching contacts: {e}")
+            return []
+        results = index.search(search_term, field=field, limit=limit)
+        if version is not None:
+            contact_cache.put(key, results, estimate_rows_size(results))
+        return list(results)
+
+    def suggest_search_terms(self, username, text, limit=search_index.SUGGESTION_LIMIT):
+        """Completions of the last word being typed, as (completed text, contact count), from the search index"""
+        version = self.get_data_version(username)
+        try:
+            index = search_index.get_index(username, version, lambda: self._fetch_all_contacts(username))
+        except Error as e:
+            print(f"Error suggesting search terms: {e}")
+            return []
+        return index.suggest(text, limit)
+
+    def _fetch_all_contacts(self, username):
+        scope = self.db.contact_scope(username)
+        with self.db.connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            where, params = scope.where()
+            cursor.execute(f"SELECT {CONTACT_COLUMNS} FROM {scope.table} {where}", params)
+            return cursor.fetchall()
+
+    def is_duplicate_contact(self, username, name, phone, email):
+        """Check if a contact with the same name, phone, or email already exists"""
+        try:
+            scope = self.db.contact_scope(username)
+            with self.db.connection() as conn:
+                cursor = conn.cursor(dictionary=True)
+
+                # Check for duplicates on the indexed canonical columns
+                where, params = scope.where("name = %s OR phone_e164 = %s OR email_norm = %s")
+                query = f"""
+                    SELECT {CONTACT_COLUMNS} FROM {scope.table}
+                    {where}
+                """
+                cursor.execute(query, params + (name, phone_e164(phone), normalize_email(email)))
+                duplicates = cursor.fetchall()
+
+                return len(duplicates) > 0
+        except Error as e:
+            print(f"Error checking for duplicates: {e}")
+            return False
+
+    def cache_stats(self):
+        """Hit, miss and eviction counters of the shared contact cache"""
+        return contact_cache.stats()
+
+    def search_index_stats(self):
+        """Size and eviction counters of the per-user search indexes"""
+        return search_index.stats()
+
+    def hasher_stats(self):
+        """Queue depth and completed / rejected hashes of the password hashing pool"""
+        return password_hasher.stats()
+
+    def login_stats(self):
+        """Allowed, rejected and failed login attempts and lockouts of the login throttle"""
+        return login_throttle.stats()
+
+    def pool_stats(self):
+        """Connection pool usage (in use, waiting, wait times) for sizing DB_POOL_SIZE"""
+        return self.db.pool_stats()
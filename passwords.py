@@ -0,0 +1,191 @@
+"""Salted scrypt password hashes, computed on a bounded worker pool.
+
+Hashes are stored as "scrypt$n$r$p$salt$hash" (base64 salt and hash), so every
+user keeps the parameters their password was hashed with, and raising them later
+only rehashes each password at its next login. Rows from before hashing hold the
+plain password; anything not in that exact format is treated as one and rehashed the same way.
+
+scrypt is deliberately slow and memory-hard, so it runs in worker processes
+rather than on the Streamlit script thread. At most PASSWORD_QUEUE_LIMIT hashes
+are queued or running; past that, new requests fail fast with PasswordHasherBusy.
+"""
+import base64
+import binascii
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+PREFIX = "scrypt"
+
+# Cost parameters for new hashes; scrypt needs about 128 * n * r bytes of memory
+SCRYPT_PARAMS = {
+    "n": int(os.environ.get("PASSWORD_SCRYPT_N", 2 ** 14)),
+    "r": int(os.environ.get("PASSWORD_SCRYPT_R", 8)),
+    "p": int(os.environ.get("PASSWORD_SCRYPT_P", 1)),
+}
+SALT_BYTES = 16
+HASH_BYTES = 32
+
+# "process" (default) or "thread" workers; the queue limit counts queued plus running hashes
+PASSWORD_POOL = os.environ.get("PASSWORD_POOL", "process")
+PASSWORD_WORKERS = int(os.environ.get("PASSWORD_WORKERS", os.cpu_count() or 1))
+PASSWORD_QUEUE_LIMIT = int(os.environ.get("PASSWORD_QUEUE_LIMIT", PASSWORD_WORKERS * 4))
+# Seconds to wait for one hash before giving up
+PASSWORD_TIMEOUT = float(os.environ.get("PASSWORD_TIMEOUT", 10))
+
+
+class PasswordHasherBusy(Exception):
+    """Too many hashes queued; the caller should ask the user to try again shortly"""
+
+
+def _b64(data):
+    return base64.b64encode(data).decode("ascii")
+
+
+def _scrypt(password, salt, n, r, p):
+    # maxmem must cover 128 * n * r bytes, which OpenSSL's default of 32 MiB caps
+    return hashlib.scrypt(password.encode("utf-8"), salt=salt, n=n, r=r, p=p,
+                          maxmem=256 * n * r + 1024 * 1024, dklen=HASH_BYTES)
+
+
+def hash_password(password, params=None):
+    """A new salted hash string of `password`"""
+    params = params or SCRYPT_PARAMS
+    salt = secrets.token_bytes(SALT_BYTES)
+    digest = _scrypt(password, salt, params["n"], params["r"], params["p"])
+    return f"{PREFIX}${params['n']}${params['r']}${params['p']}${_b64(salt)}${_b64(digest)}"
+
+
+def _parse(stored):
+    """(n, r, p, salt, digest) of a well-formed hash string, or None.
+
+    Anything else, including a plain-text password that happens to start with
+    "scrypt$", is treated as a legacy plain-text password.
+    """
+    parts = stored.split("$")
+    if len(parts) != 6 or parts[0] != PREFIX:
+        return None
+    try:
+        n, r, p = int(parts[1]), int(parts[2]), int(parts[3])
+        salt = base64.b64decode(parts[4], validate=True)
+        digest = base64.b64decode(parts[5], validate=True)
+    except (ValueError, binascii.Error):
+        return None
+    # Parameters hashlib.scrypt would reject: n a power of two above 1, r and p positive
+    if n < 2 or n & (n - 1) or r < 1 or p < 1 or not salt or not digest:
+        return None
+    return n, r, p, salt, digest
+
+
+def is_hashed(stored):
+    return _parse(stored) is not None
+
+
+def needs_rehash(stored, params=None):
+    """True for plain-text passwords and hashes made with other parameters than the current ones"""
+    params = params or SCRYPT_PARAMS
+    parsed = _parse(stored)
+    if parsed is None:
+        return True
+    n, r, p, _, _ = parsed
+    return (n, r, p) != (params["n"], params["r"], params["p"])
+
+
+def verify_password(password, stored):
+    """Whether `password` matches the stored hash (or legacy plain-text password), in constant time"""
+    parsed = _parse(stored)
+    if parsed is None:
+        return hmac.compare_digest(password.encode("utf-8"), stored.encode("utf-8"))
+    n, r, p, salt, digest = parsed
+    candidate = _scrypt(password, salt, n, r, p)
+    return hmac.compare_digest(candidate, digest)
+
+
+class PasswordHasher:
+    """Runs hash_password / verify_password on a worker pool with a bounded queue"""
+
+    def __init__(self, workers=PASSWORD_WORKERS, queue_limit=PASSWORD_QUEUE_LIMIT, pool=PASSWORD_POOL,
+                 timeout=PASSWORD_TIMEOUT):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.pool = pool
+        self.timeout = timeout
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._completed = 0
+        self._rejected = 0
+        self._timed_out = 0
+        self._dummy_hash = None
+
+    def _submit(self, func, *args):
+        with self._lock:
+            if self._pending >= self.queue_limit:
+                self._rejected += 1
+                raise PasswordHasherBusy(f"{self._pending} password hashes already queued")
+            if self._executor is None:
+                # Started on first use, so importing the app does not fork workers
+                executor = ProcessPoolExecutor if self.pool == "process" else ThreadPoolExecutor
+                self._executor = executor(max_workers=self.workers)
+            self._pending += 1
+            executor = self._executor
+        try:
+            future = executor.submit(func, *args)
+        except BaseException:
+            with self._lock:
+                self._pending -= 1
+            raise
+        # Counted as pending until the job actually finishes, even if the caller stops waiting for it
+        future.add_done_callback(self._job_done)
+        try:
+            result = future.result(timeout=self.timeout)
+        except FutureTimeout:
+            with self._lock:
+                self._timed_out += 1
+            raise PasswordHasherBusy(f"Password hash took over {self.timeout}s") from None
+        with self._lock:
+            self._completed += 1
+        return result
+
+    def _job_done(self, future):
+        with self._lock:
+            self._pending -= 1
+
+    def hash(self, password):
+        return self._submit(hash_password, password, SCRYPT_PARAMS)
+
+    def verify(self, password, stored):
+        """(matches, needs rehash); a missing user (stored None) still costs one hash, so it takes as long"""
+        if stored is None:
+            if self._dummy_hash is None:
+                self._dummy_hash = self._submit(hash_password, secrets.token_hex(16), SCRYPT_PARAMS)
+            self._submit(verify_password, password, self._dummy_hash)
+            return False, False
+        if not is_hashed(stored):
+            # Plain-text comparison is cheap; no need to queue it
+            return verify_password(password, stored), True
+        return self._submit(verify_password, password, stored), needs_rehash(stored)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queue_limit": self.queue_limit,
+                "pending": self._pending,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "timed_out": self._timed_out,
+            }
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
+
+
+# Shared by every session in the process
+password_hasher = PasswordHasher()
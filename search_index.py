@@ -0,0 +1,419 @@
+import bisect
+import heapq
+import itertools
+import os
+import re
+import sys
+import threading
+from collections import OrderedDict
+
+# Searchable contact fields and how much a match in each counts towards the rank
+FIELD_WEIGHTS = {
+    "name": 3,
+    "phone": 2,
+    "email": 1,
+}
+FIELDS = tuple(FIELD_WEIGHTS)
+
+# Match quality of a query term against an indexed token
+EXACT, PREFIX, INFIX = 3, 2, 1
+
+NGRAM_SIZE = 3
+SEARCH_RESULT_LIMIT = 100
+SUGGESTION_LIMIT = 8
+
+# Memory budget for the per-user indexes of one app process; least recently used go first
+SEARCH_INDEX_MAX_BYTES = int(os.environ.get("SEARCH_INDEX_BYTES", 128 * 1024 * 1024))
+# Rows measured when estimating the size of an index's documents
+SIZE_SAMPLE = 64
+
+_TOKEN_SPLIT = re.compile(r"[^a-z0-9]+")
+_NON_DIGITS = re.compile(r"\D")
+_PHONE_WORD = re.compile(r"^\+?[\d()-]+$")
+
+
+def tokenize(field, value):
+    """Split a field value into the lower-cased tokens stored in the index"""
+    if not value:
+        return []
+    if field == "phone":
+        # Phones are indexed as one digit string so '+91 98765-43210' matches '9876543210'
+        digits = _NON_DIGITS.sub("", value)
+        return [digits] if digits else []
+    return [token for token in _TOKEN_SPLIT.split(value.lower()) if token]
+
+
+def completion_tokens(row):
+    """Whole words offered as completions: name tokens, the email's local part and domain, phone digits"""
+    tokens = set(tokenize("name", row.get("name")))
+    email = (row.get("email") or "").lower()
+    if "@" in email:
+        local, _, domain = email.partition("@")
+        tokens.update(part for part in (local, domain) if part)
+    tokens.update(tokenize("phone", row.get("phone")))
+    return tokens
+
+
+def _prefix_run(vocabulary, prefix):
+    for i in range(bisect.bisect_left(vocabulary, prefix), len(vocabulary)):
+        token = vocabulary[i]
+        if not token.startswith(prefix):
+            break
+        yield token
+
+
+def _discard_sorted(vocabulary, token):
+    i = bisect.bisect_left(vocabulary, token)
+    if i < len(vocabulary) and vocabulary[i] == token:
+        del vocabulary[i]
+
+
+def _sets_bytes(mapping):
+    """Memory of a dict of sets: the dict, its keys and the sets (members are counted by their owners)"""
+    return sys.getsizeof(mapping) + sum(sys.getsizeof(key) + sys.getsizeof(values) for key, values in mapping.items())
+
+
+def _ngrams(token):
+    return {token[i:i + NGRAM_SIZE] for i in range(len(token) - NGRAM_SIZE + 1)}
+
+
+class _FieldIndex:
+    """Inverted index for one field.
+
+    Postings map each token to the contact ids containing it. Tokens are kept in a
+    sorted vocabulary for prefix lookups, and an n-gram index over the vocabulary
+    (not over every contact) answers substring lookups.
+    """
+
+    def __init__(self):
+        self.postings = {}
+        self.vocabulary = []
+        self.grams = {}
+
+    def add(self, contact_id, tokens):
+        for token in tokens:
+            ids = self.postings.get(token)
+            if ids is None:
+                ids = self.postings[token] = set()
+                bisect.insort(self.vocabulary, token)
+                for gram in _ngrams(token):
+                    self.grams.setdefault(gram, set()).add(token)
+            ids.add(contact_id)
+
+    def remove(self, contact_id, tokens):
+        for token in tokens:
+            ids = self.postings.get(token)
+            if ids is None:
+                continue
+            ids.discard(contact_id)
+            if not ids:
+                del self.postings[token]
+                del self.vocabulary[bisect.bisect_left(self.vocabulary, token)]
+                for gram in _ngrams(token):
+                    tokens_with_gram = self.grams[gram]
+                    tokens_with_gram.discard(token)
+                    if not tokens_with_gram:
+                        del self.grams[gram]
+
+    def nbytes(self):
+        # Vocabulary strings are the postings' keys, so only counted once
+        return _sets_bytes(self.postings) + sys.getsizeof(self.vocabulary) + _sets_bytes(self.grams)
+
+    def match(self, term):
+        """Map contact id -> best match quality for a single query term"""
+        matches = {}
+
+        def collect(token, quality):
+            for contact_id in self.postings[token]:
+                if matches.get(contact_id, 0) < quality:
+                    matches[contact_id] = quality
+
+        # Exact and prefix matches: a contiguous run of the sorted vocabulary
+        start = bisect.bisect_left(self.vocabulary, term)
+        for token in self.vocabulary[start:]:
+            if not token.startswith(term):
+                break
+            collect(token, EXACT if token == term else PREFIX)
+
+        # Substring matches need at least one full n-gram to look up
+        if len(term) >= NGRAM_SIZE:
+            candidates = None
+            for gram in _ngrams(term):
+                tokens_with_gram = self.grams.get(gram)
+                if not tokens_with_gram:
+                    return matches
+                candidates = set(tokens_with_gram) if candidates is None else candidates & tokens_with_gram
+            for token in candidates:
+                if term in token and not token.startswith(term):
+                    collect(token, INFIX)
+        return matches
+
+
+class _Completions:
+    """Sorted completion vocabulary with the number of contacts using each word.
+
+    Words shared by several contacts (first names, surnames, email domains) are few
+    and kept apart, so a prefix's run of them can be ranked in full by count. Words
+    used once (mostly phones and email local parts) only fill the remaining slots
+    alphabetically, so a short prefix never scans the bulk of the vocabulary.
+    """
+
+    def __init__(self, token_sets=()):
+        # Built in bulk with one sort; add() / remove() keep it current afterwards
+        counts = self.counts = {}
+        for tokens in token_sets:
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+        self.common = sorted(token for token, count in counts.items() if count > 1)
+        self.unique = sorted(token for token, count in counts.items() if count == 1)
+
+    def add(self, token):
+        count = self.counts[token] = self.counts.get(token, 0) + 1
+        if count == 1:
+            bisect.insort(self.unique, token)
+        elif count == 2:
+            _discard_sorted(self.unique, token)
+            bisect.insort(self.common, token)
+
+    def remove(self, token):
+        count = self.counts.get(token)
+        if not count:
+            return
+        if count == 1:
+            del self.counts[token]
+            _discard_sorted(self.unique, token)
+            return
+        self.counts[token] = count - 1
+        if count == 2:
+            _discard_sorted(self.common, token)
+            bisect.insort(self.unique, token)
+
+    def nbytes(self):
+        # Completions are mostly the fields' tokens; only the ones that are not are new strings
+        return sys.getsizeof(self.counts) + sys.getsizeof(self.common) + sys.getsizeof(self.unique)
+
+    def top(self, prefix, limit):
+        counts = self.counts
+        ranked = heapq.nsmallest(limit, _prefix_run(self.common, prefix), key=lambda token: (-counts[token], token))
+        if len(ranked) < limit:
+            ranked += itertools.islice(_prefix_run(self.unique, prefix), limit - len(ranked))
+        return [(token, counts[token]) for token in ranked]
+
+
+class ContactSearchIndex:
+    """In-memory search index over one user's contacts"""
+
+    def __init__(self, rows=()):
+        self.version = None  # data version the index reflects, set by the registry
+        self._lock = threading.RLock()
+        self._fields = {field: _FieldIndex() for field in FIELDS}
+        self._docs = {}
+        for row in rows:
+            self._index_fields(row)
+        self._completions = _Completions(completion_tokens(row) for row in self._docs.values())
+
+    def __len__(self):
+        return len(self._docs)
+
+    def nbytes(self):
+        """Approximate memory held by the rows, postings, n-grams and completions.
+
+        Posting and n-gram sets vary too much in size to extrapolate from a sample,
+        so they are all measured; that is one pass over the tokens, far less than a build.
+        """
+        with self._lock:
+            docs = self._docs
+            sample = list(itertools.islice(docs.values(), SIZE_SAMPLE))
+            row_bytes = sum(sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row.values())
+                            for row in sample)
+            rows = sys.getsizeof(docs) + (row_bytes * len(docs) // len(sample) if sample else 0)
+            return (rows + sum(index.nbytes() for index in self._fields.values())
+                    + self._completions.nbytes())
+
+    def _index_fields(self, row):
+        self._docs[row["id"]] = row
+        for field in FIELDS:
+            self._fields[field].add(row["id"], tokenize(field, row.get(field)))
+
+    def _add(self, row):
+        self._index_fields(row)
+        for token in completion_tokens(row):
+            self._completions.add(token)
+
+    def _remove(self, contact_id):
+        row = self._docs.pop(contact_id, None)
+        if row is not None:
+            for field in FIELDS:
+                self._fields[field].remove(contact_id, tokenize(field, row.get(field)))
+            for token in completion_tokens(row):
+                self._completions.remove(token)
+        return row
+
+    def add(self, row):
+        with self._lock:
+            self._remove(row["id"])
+            self._add(row)
+
+    def update(self, contact_id, **changes):
+        with self._lock:
+            row = self._remove(contact_id)
+            if row is not None:
+                self._add({**row, **changes})
+
+    def remove(self, contact_id):
+        with self._lock:
+            self._remove(contact_id)
+
+    def suggest(self, text, limit=SUGGESTION_LIMIT):
+        """Completions of the last word of `text`, most used first, as (completed text, contact count).
+
+        A word of digits (optionally with + - and brackets) completes phones by its digits.
+        """
+        head, _, word = text.lower().rpartition(" ")
+        prefix = _NON_DIGITS.sub("", word) if _PHONE_WORD.match(word) else word
+        if not prefix:
+            return []
+        with self._lock:
+            completions = self._completions.top(prefix, limit)
+        head = f"{head} " if head else ""
+        return [(head + token, count) for token, count in completions if token != prefix]
+
+    def search(self, query, field=None, limit=SEARCH_RESULT_LIMIT):
+        """Return up to `limit` contacts matching every term of `query`, best first.
+
+        `field` restricts matching to "name", "phone" or "email"; None searches all of them.
+        Ties are broken by most recently added.
+        """
+        fields = FIELDS if field is None else (field,)
+        terms = tokenize("name", query)
+        if not terms:
+            return []
+
+        with self._lock:
+            scores = None
+            for term in terms:
+                term_scores = {}
+                for name in fields:
+                    field_term = _NON_DIGITS.sub("", term) if name == "phone" else term
+                    if not field_term:
+                        continue
+                    weight = FIELD_WEIGHTS[name]
+                    for contact_id, quality in self._fields[name].match(field_term).items():
+                        score = quality * weight
+                        if term_scores.get(contact_id, 0) < score:
+                            term_scores[contact_id] = score
+                if scores is None:
+                    scores = term_scores
+                else:
+                    scores = {cid: scores[cid] + score for cid, score in term_scores.items() if cid in scores}
+                if not scores:
+                    return []
+
+            docs = self._docs
+
+            def rank(item):
+                contact_id, score = item
+                date_added = docs[contact_id].get("date_added")
+                return (-score, -date_added.timestamp() if date_added else 0, -contact_id)
+
+            best = heapq.nsmallest(limit, scores.items(), key=rank)
+            return [docs[contact_id] for contact_id, _ in best]
+
+
+# Process-wide registry: one index per user, shared by every session, least recently used first
+_indexes = OrderedDict()
+_sizes = {}  # username -> nbytes() of the registered index
+_registry_bytes = 0
+_evictions = 0
+_registry_lock = threading.Lock()
+
+
+def _register(username, index, size):
+    """Add or re-measure the user's index and evict others down to the budget; call under _registry_lock"""
+    global _registry_bytes, _evictions
+    if username in _indexes:
+        _unregister(username)
+    if size > SEARCH_INDEX_MAX_BYTES:
+        return
+    _indexes[username] = index
+    _sizes[username] = size
+    _registry_bytes += size
+    while _registry_bytes > SEARCH_INDEX_MAX_BYTES:
+        _unregister(next(iter(_indexes)))
+        _evictions += 1
+
+
+def _unregister(username):
+    global _registry_bytes
+    if _indexes.pop(username, None) is not None:
+        _registry_bytes -= _sizes.pop(username)
+
+
+def get_index(username, version, load_rows):
+    """Return the user's index for data `version`, (re)building it from `load_rows()` if it is behind.
+
+    `version` must be read before the rows are loaded; an index that already holds a
+    newer write is harmless because replaying a change is idempotent.
+    """
+    with _registry_lock:
+        index = _indexes.get(username)
+        if index is not None:
+            _indexes.move_to_end(username)
+    if index is not None and (version is None or index.version == version):
+        return index
+
+    index = ContactSearchIndex(load_rows())
+    index.version = version
+    if version is not None:
+        size = index.nbytes()
+        with _registry_lock:
+            current = _indexes.get(username)
+            if current is None or current.version is None or current.version <= version:
+                _register(username, index, size)
+    return index
+
+
+def _apply(username, version, change):
+    """Apply a committed write to the user's index if it is at the previous version"""
+    with _registry_lock:
+        index = _indexes.get(username)
+        if index is None:
+            return
+        if index.version is None or version is None or index.version != version - 1:
+            # Missed a write from somewhere else, rebuild on the next search
+            _unregister(username)
+            return
+        contacts = len(index)
+        change(index)
+        index.version = version
+        # Measured at build time only; a write scales the size by the contacts it added or removed
+        _register(username, index, _sizes[username] * len(index) // max(contacts, 1))
+
+
+def apply_changes(username, version, changes):
+    """Apply a committed batch of ("add" | "update" | "delete", row) changes that bumped the version once"""
+    def change(index):
+        for op, row in changes:
+            if op == "add":
+                index.add(row)
+            elif op == "update":
+                index.update(row["id"], **row)
+            else:
+                index.remove(row["id"])
+    _apply(username, version, change)
+
+
+def drop_index(username):
+    with _registry_lock:
+        _unregister(username)
+
+
+def stats():
+    """Size and eviction counters of the index registry"""
+    with _registry_lock:
+        return {
+            "indexes": len(_indexes),
+            "bytes": _registry_bytes,
+            "max_bytes": SEARCH_INDEX_MAX_BYTES,
+            "evictions": _evictions,
+        }
@@ -0,0 +1,432 @@
+"""Storage backends: everything database-specific behind Database.
+
+A backend opens connections, renders the DDL for the shared schema, bumps the
+per-user data version and maintains indexes. ContactOperations only ever sees
+connections and cursors with the mysql.connector API (%s placeholders,
+dictionary=True cursors, start_transaction()), which the SQLite backend wraps.
+"""
+import re
+import sqlite3
+from datetime import datetime
+
+from connection_pool import ConnectionPool
+
+try:
+    import mysql.connector
+    from mysql.connector import errors as mysql_errors
+except ImportError:  # Only the SQLite backend is available
+    mysql = None
+    mysql_errors = None
+
+
+class StorageError(Exception):
+    """Backend-independent failure (pool timeout, unknown user, ...)"""
+
+    def __init__(self, msg):
+        super().__init__(msg)
+        self.msg = msg
+
+
+# Exception classes to catch around storage calls, whichever backend is configured
+Error = (StorageError, sqlite3.Error) + ((mysql_errors.Error,) if mysql_errors else ())
+IntegrityError = (sqlite3.IntegrityError,) + ((mysql_errors.IntegrityError,) if mysql_errors else ())
+
+# Unique keys on the contacts tables and the column each one protects
+UNIQUE_KEYS = {
+    "unique_phone": "phone",
+    "unique_email": "email",
+}
+
+# Canonical forms of phone and email (see validation.py), filled on every write
+CANONICAL_COLUMNS = {
+    "phone_e164": "VARCHAR(16)",
+    "email_norm": "VARCHAR(255)",
+}
+# Unique keys on the canonical columns. Their names start with the UNIQUE_KEYS name
+# of the same field, so a violation maps to the same duplicate message.
+CANONICAL_KEYS = {
+    "unique_phone_e164": "phone_e164",
+    "unique_email_norm": "email_norm",
+}
+
+
+def error_message(error):
+    """The driver's message without the error-code prefix mysql.connector adds to str()"""
+    return getattr(error, "msg", None) or str(error)
+
+
+class MySQLBackend:
+    name = "mysql"
+    # DDL commits implicitly, so a migration cannot be tried out and rolled back
+    transactional_ddl = False
+
+    def __init__(self, config, pool_config):
+        if mysql is None:
+            raise StorageError("mysql-connector-python is not installed; set DB_BACKEND=sqlite")
+        self.config = config
+        self.pool = ConnectionPool(self._connect, check=self._ping, **pool_config)
+
+    def _connect(self):
+        return mysql.connector.connect(**self.config)
+
+    @staticmethod
+    def _ping(conn):
+        # Reconnects in place if the server closed the connection (e.g. wait_timeout)
+        conn.ping(reconnect=True, attempts=2, delay=0)
+
+    def users_table_sql(self):
+        return ["""
+            CREATE TABLE IF NOT EXISTS users (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                username VARCHAR(255) UNIQUE NOT NULL,
+                password VARCHAR(255) NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """]
+
+    def versions_table_sql(self):
+        return ["""
+            CREATE TABLE IF NOT EXISTS contact_versions (
+                username VARCHAR(255) PRIMARY KEY,
+                version BIGINT NOT NULL DEFAULT 0
+            )
+        """]
+
+    def username_key_sql(self, cursor):
+        # The unique key on users.username already ignores case under MySQL's default collation
+        return []
+
+    def login_throttle_table_sql(self):
+        # Times are epoch seconds, so every process compares them the same way
+        return ["""
+            CREATE TABLE IF NOT EXISTS login_throttle (
+                throttle_key VARCHAR(255) PRIMARY KEY,
+                failures INT NOT NULL DEFAULT 0,
+                window_start DOUBLE NOT NULL,
+                locked_until DOUBLE NOT NULL DEFAULT 0
+            )
+        """]
+
+    def contacts_table_sql(self, table, indexes, shared=False):
+        """CREATE TABLE for a contacts table; `indexes` maps index name -> column"""
+        owner = "user_id, " if shared else ""
+        keys = [f"UNIQUE KEY {key} ({owner}{column})" for key, column in {**UNIQUE_KEYS, **CANONICAL_KEYS}.items()]
+        keys += [f"KEY {index} ({owner}{column})" for index, column in indexes.items()]
+        user_column = "user_id INT NOT NULL," if shared else ""
+        return [f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                {user_column}
+                name VARCHAR(255) NOT NULL,
+                phone VARCHAR(50) NOT NULL,
+                email VARCHAR(255),
+                date_added TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                phone_e164 VARCHAR(16),
+                email_norm VARCHAR(255),
+                {", ".join(keys)}
+            )
+        """]
+
+    def table_names(self, cursor):
+        cursor.execute(
+            "SELECT table_name FROM information_schema.tables WHERE table_schema = DATABASE() ORDER BY table_name"
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+    def missing_index_sql(self, cursor, table, indexes, owner="", unique=False):
+        """ALTER TABLE statements adding any of `indexes` (name -> column) that the table lacks"""
+        cursor.execute(
+            "SELECT DISTINCT index_name FROM information_schema.statistics "
+            "WHERE table_schema = DATABASE() AND table_name = %s",
+            (table,)
+        )
+        existing = {row[0] for row in cursor.fetchall()}
+        kind = "UNIQUE INDEX" if unique else "INDEX"
+        return [f"ALTER TABLE {table} ADD {kind} {index_name} ({owner}{column})"
+                for index_name, column in indexes.items() if index_name not in existing]
+
+    def missing_column_sql(self, cursor, table, columns):
+        """ALTER TABLE statements adding any of `columns` (name -> type) that the table lacks, as nullable"""
+        cursor.execute(
+            "SELECT column_name FROM information_schema.columns WHERE table_schema = DATABASE() AND table_name = %s",
+            (table,)
+        )
+        existing = {row[0] for row in cursor.fetchall()}
+        return [f"ALTER TABLE {table} ADD COLUMN {column} {column_type}"
+                for column, column_type in columns.items() if column not in existing]
+
+    def explain(self, cursor, query, params=()):
+        """The query plan, one line per table access"""
+        cursor.execute(f"EXPLAIN {query}", params)
+        columns = [column[0] for column in cursor.description]
+        return [
+            ", ".join(f"{column}={value}" for column, value in zip(columns, row)
+                      if column in ("table", "type", "key", "rows", "Extra"))
+            for row in cursor.fetchall()
+        ]
+
+    def analyze_sql(self, table):
+        """Statement refreshing the optimizer's statistics for `table`"""
+        return f"ANALYZE TABLE {table}"
+
+    def bump_version(self, cursor, username):
+        # LAST_INSERT_ID(expr) hands the new value back in the statement's OK packet, saving a SELECT
+        cursor.execute(
+            "INSERT INTO contact_versions (username, version) VALUES (%s, LAST_INSERT_ID(1)) "
+            "ON DUPLICATE KEY UPDATE version = LAST_INSERT_ID(version + 1)",
+            (username,)
+        )
+        return cursor.lastrowid
+
+    def record_login_failure(self, cursor, key, now, window):
+        """Count a failed login for `key` in its current fixed window and return the count"""
+        cursor.execute(
+            "INSERT INTO login_throttle (throttle_key, failures, window_start) VALUES (%s, LAST_INSERT_ID(1), %s) "
+            "ON DUPLICATE KEY UPDATE failures = LAST_INSERT_ID(IF(window_start <= %s, 1, failures + 1)), "
+            "window_start = IF(window_start <= %s, VALUES(window_start), window_start)",
+            (key, now, now - window, now - window)
+        )
+        return cursor.lastrowid
+
+    def duplicate_key(self, error):
+        # "Duplicate entry '...' for key 'contacts_bob.unique_phone'"
+        message = error_message(error)
+        return next((key for key in UNIQUE_KEYS if key in message), None)
+
+
+class _SQLiteCursor:
+    """sqlite3 cursor with the parts of the mysql.connector cursor API the app uses"""
+
+    def __init__(self, cursor, dictionary=False):
+        self._cursor = cursor
+        self._dictionary = dictionary
+
+    @staticmethod
+    def _sql(query):
+        return query.replace("%s", "?")
+
+    def execute(self, query, params=()):
+        self._cursor.execute(self._sql(query), params)
+
+    def executemany(self, query, seq_params):
+        self._cursor.executemany(self._sql(query), seq_params)
+
+    def _row(self, row):
+        if row is None or not self._dictionary:
+            return row
+        return dict(zip((column[0] for column in self._cursor.description), row))
+
+    def fetchone(self):
+        return self._row(self._cursor.fetchone())
+
+    def fetchmany(self, size):
+        return [self._row(row) for row in self._cursor.fetchmany(size)]
+
+    def fetchall(self):
+        return [self._row(row) for row in self._cursor.fetchall()]
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    def close(self):
+        self._cursor.close()
+
+
+class _SQLiteConnection:
+    """sqlite3 connection with mysql.connector-style transactions (autocommit unless started)"""
+
+    unread_result = False
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def cursor(self, dictionary=False, **kwargs):
+        return _SQLiteCursor(self._conn.cursor(), dictionary)
+
+    def start_transaction(self):
+        # Take the write lock up front so two writers never deadlock upgrading a read lock
+        self._conn.execute("BEGIN IMMEDIATE")
+
+    @property
+    def in_transaction(self):
+        return self._conn.in_transaction
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def consume_results(self):
+        pass
+
+    def close(self):
+        self._conn.close()
+
+
+def _parse_timestamp(value):
+    return datetime.fromisoformat(value.decode())
+
+
+# Same "YYYY-MM-DD HH:MM:SS" text CURRENT_TIMESTAMP produces, read back as datetime like MySQL's
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(" "))
+sqlite3.register_converter("TIMESTAMP", _parse_timestamp)
+
+_SQLITE_UNIQUE_COLUMN = re.compile(r"UNIQUE constraint failed: .*\.(\w+)$")
+
+
+class SQLiteBackend:
+    """Embedded backend for single-node deployments and offline benchmarks.
+
+    WAL mode lets readers run alongside the single writer; text columns compared
+    case-insensitively in MySQL (username, name, email) use COLLATE NOCASE here.
+    """
+
+    name = "sqlite"
+    transactional_ddl = True
+
+    def __init__(self, path, pool_config, busy_timeout=5.0):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        # Nothing to ping for a local file, so no health check
+        self.pool = ConnectionPool(self._connect, **pool_config)
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.path,
+            timeout=self.busy_timeout,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            isolation_level=None,  # autocommit, like the MySQL connections
+            check_same_thread=False,  # the pool hands connections to whichever session thread asks
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return _SQLiteConnection(conn)
+
+    def users_table_sql(self):
+        return ["""
+            CREATE TABLE IF NOT EXISTS users (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                username VARCHAR(255) UNIQUE NOT NULL COLLATE NOCASE,
+                password VARCHAR(255) NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """]
+
+    def versions_table_sql(self):
+        return ["""
+            CREATE TABLE IF NOT EXISTS contact_versions (
+                username VARCHAR(255) PRIMARY KEY,
+                version BIGINT NOT NULL DEFAULT 0
+            )
+        """]
+
+    def username_key_sql(self, cursor):
+        # users tables created before username was COLLATE NOCASE let "Bob" and "bob"
+        # register separately, though both map to the same contacts table
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'users'")
+        if "users_username_nocase" in {row[0] for row in cursor.fetchall()}:
+            return []
+        return ["CREATE UNIQUE INDEX IF NOT EXISTS users_username_nocase ON users (username COLLATE NOCASE)"]
+
+    def login_throttle_table_sql(self):
+        # Times are epoch seconds, so every process compares them the same way
+        return ["""
+            CREATE TABLE IF NOT EXISTS login_throttle (
+                throttle_key VARCHAR(255) PRIMARY KEY,
+                failures INT NOT NULL DEFAULT 0,
+                window_start DOUBLE NOT NULL,
+                locked_until DOUBLE NOT NULL DEFAULT 0
+            )
+        """]
+
+    def contacts_table_sql(self, table, indexes, shared=False):
+        owner = "user_id, " if shared else ""
+        user_column = "user_id INTEGER NOT NULL," if shared else ""
+        keys = ", ".join(f"CONSTRAINT {key} UNIQUE ({owner}{column})" for key, column in UNIQUE_KEYS.items())
+        statements = [f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                {user_column}
+                name VARCHAR(255) NOT NULL COLLATE NOCASE,
+                phone VARCHAR(50) NOT NULL,
+                email VARCHAR(255) COLLATE NOCASE,
+                date_added TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                phone_e164 VARCHAR(16),
+                email_norm VARCHAR(255),
+                {keys}
+            )
+        """]
+        statements += self._index_sql(table, indexes, owner)
+        # Unique indexes rather than constraints, so tables from before the canonical
+        # columns get exactly the same ones from backfill_canonical.py
+        statements += self._index_sql(table, CANONICAL_KEYS, owner, unique=True)
+        return statements
+
+    @staticmethod
+    def _index_sql(table, indexes, owner="", unique=False):
+        # Index names are global in SQLite, so they are prefixed with the table name
+        kind = "UNIQUE INDEX" if unique else "INDEX"
+        return [f"CREATE {kind} IF NOT EXISTS {table}_{index} ON {table} ({owner}{column})"
+                for index, column in indexes.items()]
+
+    def table_names(self, cursor):
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' ORDER BY name")
+        return [row[0] for row in cursor.fetchall()]
+
+    def missing_index_sql(self, cursor, table, indexes, owner="", unique=False):
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = %s", (table,))
+        existing = {row[0] for row in cursor.fetchall()}
+        return [statement for statement, index in zip(self._index_sql(table, indexes, owner, unique), indexes)
+                if f"{table}_{index}" not in existing]
+
+    def missing_column_sql(self, cursor, table, columns):
+        cursor.execute(f"PRAGMA table_info({table})")
+        existing = {row[1] for row in cursor.fetchall()}
+        return [f"ALTER TABLE {table} ADD COLUMN {column} {column_type}"
+                for column, column_type in columns.items() if column not in existing]
+
+    def analyze_sql(self, table):
+        return f"ANALYZE {table}"
+
+    def explain(self, cursor, query, params=()):
+        cursor.execute(f"EXPLAIN QUERY PLAN {query}", params)
+        return [row[3] for row in cursor.fetchall()]
+
+    def bump_version(self, cursor, username):
+        cursor.execute(
+            "INSERT INTO contact_versions (username, version) VALUES (%s, 1) "
+            "ON CONFLICT (username) DO UPDATE SET version = version + 1 RETURNING version",
+            (username,)
+        )
+        # fetchall() runs the statement to completion so the row is written before COMMIT
+        return cursor.fetchall()[0][0]
+
+    def record_login_failure(self, cursor, key, now, window):
+        cursor.execute(
+            "INSERT INTO login_throttle (throttle_key, failures, window_start) VALUES (%s, 1, %s) "
+            "ON CONFLICT (throttle_key) DO UPDATE SET "
+            "failures = CASE WHEN window_start <= %s THEN 1 ELSE failures + 1 END, "
+            "window_start = CASE WHEN window_start <= %s THEN excluded.window_start ELSE window_start END "
+            "RETURNING failures",
+            (key, now, now - window, now - window)
+        )
+        return cursor.fetchall()[0][0]
+
+    def duplicate_key(self, error):
+        # "UNIQUE constraint failed: contacts.user_id, contacts.phone"
+        match = _SQLITE_UNIQUE_COLUMN.search(error_message(error))
+        if match:
+            column = match.group(1)
+            return next((key for key, key_column in UNIQUE_KEYS.items()
+                         if column == key_column or column.startswith(f"{key_column}_")), None)
+        return None
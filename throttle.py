@@ -0,0 +1,202 @@
+"""Login throttling shared by every session in the process.
+
+Failed logins are counted in sliding windows keyed by username and by client
+address, so opening a new browser session does not reset them. A key that
+reaches its limit is locked for a while, and attempts against a locked key are
+rejected from memory before any SQL runs.
+
+With LOGIN_THROTTLE_PERSIST=1 failures and locks are also kept in the
+login_throttle table, so several app processes share them: failures are counted
+there in fixed windows, and each process reads the current locks at most once
+every LOGIN_THROTTLE_SYNC seconds.
+"""
+import os
+import threading
+import time
+from collections import deque
+
+from storage import Error
+
+# Per kind of key: (failures allowed, window seconds, lock seconds)
+LIMITS = {
+    "user": (3, 60, 60),  # the login form's original rule, now per username instead of per session
+    "client": (20, 300, 300),  # one address trying many usernames
+}
+
+PERSIST = os.environ.get("LOGIN_THROTTLE_PERSIST") == "1"
+SYNC_INTERVAL = float(os.environ.get("LOGIN_THROTTLE_SYNC", 5))
+
+# Failure windows are swept for expired keys once this many are tracked
+SWEEP_KEYS = 10_000
+
+
+class LoginThrottle:
+    def __init__(self, limits=LIMITS, persist=PERSIST, sync_interval=SYNC_INTERVAL):
+        self.limits = limits
+        self.persist = persist
+        self.sync_interval = sync_interval
+        self._lock = threading.Lock()
+        self._failures = {}  # key -> deque of failure times inside the window
+        self._locked = {}  # key -> time the lock ends
+        self._db = None
+        self._synced_at = 0.0
+        self._allowed = 0
+        self._rejected = 0
+        self._failed = 0
+        self._lockouts = 0
+        self._persist_errors = 0
+
+    @staticmethod
+    def _keys(username, client):
+        keys = [f"user:{username.strip().lower()}"]
+        if client:
+            keys.append(f"client:{client}")
+        return keys
+
+    def _limit(self, key):
+        return self.limits[key.partition(":")[0]]
+
+    def check(self, username, client=None):
+        """Seconds until the attempt may be made; 0 lets it through. Counted as allowed or rejected."""
+        now = time.time()
+        self._sync(now)
+        with self._lock:
+            wait = self._wait(self._keys(username, client), now)
+            if wait:
+                self._rejected += 1
+            else:
+                self._allowed += 1
+            return wait
+
+    def _wait(self, keys, now):
+        return max(0.0, max(self._locked.get(key, 0.0) for key in keys) - now)
+
+    def retry_after(self, username, client=None):
+        """Seconds until the username / client is unlocked, without counting an attempt"""
+        with self._lock:
+            return self._wait(self._keys(username, client), time.time())
+
+    def record_failure(self, username, client=None):
+        """Count a failed login; returns (attempts left for the username, seconds locked)"""
+        now = time.time()
+        keys = self._keys(username, client)
+        counts = self._store_failure(keys, now) if self.persist else {}
+        with self._lock:
+            self._failed += 1
+            locked = []
+            for key in keys:
+                allowed, window, lock_for = self._limit(key)
+                times = self._failures.setdefault(key, deque())
+                while times and times[0] <= now - window:
+                    times.popleft()
+                times.append(now)
+                if max(len(times), counts.get(key, 0)) >= allowed:
+                    self._locked[key] = now + lock_for
+                    self._lockouts += 1
+                    times.clear()
+                    locked.append(key)
+            user_key = keys[0]
+            attempts_left = 0 if user_key in locked else self.limits["user"][0] - len(self._failures[user_key])
+            if len(self._failures) > SWEEP_KEYS:
+                self._sweep(now)
+            wait = self._wait(keys, now)
+        if locked and self.persist:
+            self._store_locks(locked)
+        return attempts_left, wait
+
+    def record_success(self, username, client=None):
+        """Forget the username's failures; the client's count stays, so one good account cannot reset it"""
+        key = self._keys(username, client)[0]
+        with self._lock:
+            self._failures.pop(key, None)
+        if self.persist:
+            self._execute("DELETE FROM login_throttle WHERE throttle_key = %s", (key,))
+
+    def _sweep(self, now):
+        for key, times in list(self._failures.items()):
+            if not times or times[-1] <= now - self._limit(key)[1]:
+                del self._failures[key]
+        for key, until in list(self._locked.items()):
+            if until <= now:
+                del self._locked[key]
+
+    def _database(self):
+        if self._db is None:
+            from database import Database
+            self._db = Database()
+        return self._db
+
+    def _execute(self, query, params=()):
+        try:
+            with self._database().connection() as conn:
+                conn.cursor().execute(query, params)
+        except Error as e:
+            # The in-process limits still apply
+            print(f"Error updating login throttle: {e}")
+            with self._lock:
+                self._persist_errors += 1
+
+    def _store_failure(self, keys, now):
+        """Shared failure counts of `keys` after counting this one"""
+        try:
+            db = self._database()
+            with db.connection() as conn:
+                cursor = conn.cursor()
+                return {key: db.backend.record_login_failure(cursor, key, now, self._limit(key)[1]) for key in keys}
+        except Error as e:
+            print(f"Error recording failed login: {e}")
+            with self._lock:
+                self._persist_errors += 1
+            return {}
+
+    def _store_locks(self, keys):
+        with self._lock:
+            locks = [(self._locked[key], key) for key in keys]
+        for until, key in locks:
+            self._execute("UPDATE login_throttle SET failures = 0, locked_until = %s WHERE throttle_key = %s",
+                          (until, key))
+
+    def _sync(self, now):
+        """Pick up locks set by other processes (and drop expired rows), at most once per sync interval"""
+        if not self.persist or now - self._synced_at < self.sync_interval:
+            return
+        with self._lock:
+            if now - self._synced_at < self.sync_interval:
+                return
+            self._synced_at = now
+        oldest_window = max(window for _, window, _ in self.limits.values())
+        try:
+            with self._database().connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT throttle_key, locked_until FROM login_throttle WHERE locked_until > %s", (now,))
+                locks = cursor.fetchall()
+                cursor.execute(
+                    "DELETE FROM login_throttle WHERE locked_until <= %s AND window_start <= %s",
+                    (now, now - oldest_window)
+                )
+        except Error as e:
+            print(f"Error reading login throttle: {e}")
+            with self._lock:
+                self._persist_errors += 1
+            return
+        with self._lock:
+            for key, until in locks:
+                if until > self._locked.get(key, 0.0):
+                    self._locked[key] = until
+
+    def stats(self):
+        with self._lock:
+            now = time.time()
+            return {
+                "allowed": self._allowed,
+                "rejected": self._rejected,
+                "failed": self._failed,
+                "lockouts": self._lockouts,
+                "locked_keys": sum(1 for until in self._locked.values() if until > now),
+                "tracked_keys": len(self._failures),
+                "persist_errors": self._persist_errors,
+            }
+
+
+# Shared by every session in the process
+login_throttle = LoginThrottle()
@@ -0,0 +1,134 @@
+import re
+from collections import namedtuple
+
+# Patterns are compiled once and shared by the single-value and column validators
+NAME_PATTERN = re.compile(r"^[A-Za-z\s\'-]{2,50}$")
+NAME_SEPARATOR_RUN = re.compile(r"[\s\'-]{2,}")
+NAME_LETTER = re.compile(r"[A-Za-z]")
+NAME_EDGE_CHARS = ("'", "-", " ")
+PHONE_SEPARATORS = re.compile(r'[\s\-\(\)]')
+PHONE_PATTERN = re.compile(r"^[6-9][0-9]{9}$")  # Indian mobile numbers start with 6-9
+EMAIL_PATTERN = re.compile(r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$")
+COUNTRY_CODE = "+91"
+
+# Error code -> message shown to the user
+MESSAGES = {
+    "name_invalid": "Name can only contain letters,spaces.",
+    "name_consecutive": "Name cannot have consecutive spaces, apostrophes or hyphens",
+    "name_edges": "Name cannot start or end with a space, apostrophe or hyphen",
+    "name_letters": "Name must contain at least 2 letters",
+    "phone_empty": "Phone number cannot be empty",
+    "phone_invalid": "Please enter a valid 10-digit phone number (should start with 6-9)",
+    "email_invalid": "Please enter a valid email address",
+}
+
+# Per-row results of a column validation: valid flags, error codes (None when
+# valid) and canonical values (None when invalid or, for emails, empty)
+ValidationResult = namedtuple("ValidationResult", ["valid", "codes", "values"])
+
+
+def _check_name(name):
+    if not NAME_PATTERN.match(name):
+        return "name_invalid"
+    # Check for consecutive special characters
+    if NAME_SEPARATOR_RUN.search(name):
+        return "name_consecutive"
+    # Check if name starts or ends with special character
+    if name.startswith(NAME_EDGE_CHARS) or name.endswith(NAME_EDGE_CHARS):
+        return "name_edges"
+    # Check minimum length after trimming (at least 2 letters)
+    if len(NAME_LETTER.findall(name)) < 2:
+        return "name_letters"
+    return None
+
+
+def clean_phone(phone):
+    """Strip separators and a +91 / 91 country code, leaving the digits to validate"""
+    cleaned_phone = PHONE_SEPARATORS.sub('', phone)
+    if cleaned_phone.startswith('+91') and len(cleaned_phone) > 3:
+        cleaned_phone = cleaned_phone[3:]
+    if cleaned_phone.startswith('91') and len(cleaned_phone) > 2:
+        cleaned_phone = cleaned_phone[2:]
+    return cleaned_phone
+
+
+def phone_e164(phone):
+    """E.164 form (+91 and the 10 digits) of a valid phone number, None if it does not validate"""
+    cleaned_phone = clean_phone(phone or "")
+    return COUNTRY_CODE + cleaned_phone if _check_phone(cleaned_phone) is None else None
+
+
+def normalize_email(email):
+    """Trimmed, lower-cased email; None when blank"""
+    email = (email or "").strip().lower()
+    return email or None
+
+
+def _check_phone(cleaned_phone):
+    if not cleaned_phone:
+        return "phone_empty"
+    if not PHONE_PATTERN.match(cleaned_phone):
+        return "phone_invalid"
+    return None
+
+
+def _as_strings(values):
+    """Column (list, tuple or pandas Series) -> list of str, with None/NaN as empty strings"""
+    if hasattr(values, "tolist"):
+        values = values.tolist()
+    return ["" if value is None or value != value else str(value) for value in values]  # value != value: NaN
+
+
+def validate_names(values):
+    """Validate a column of names"""
+    names = _as_strings(values)
+    codes = [_check_name(name) for name in names]
+    return ValidationResult(
+        [code is None for code in codes],
+        codes,
+        [name if code is None else None for name, code in zip(names, codes)],
+    )
+
+
+def validate_phones(values):
+    """Validate a column of phone numbers; canonical values are the bare 10 digits"""
+    phones = [clean_phone(phone) for phone in _as_strings(values)]
+    codes = [_check_phone(phone) for phone in phones]
+    return ValidationResult(
+        [code is None for code in codes],
+        codes,
+        [phone if code is None else None for phone, code in zip(phones, codes)],
+    )
+
+
+def validate_emails(values):
+    """Validate a column of optional emails; blank entries are valid and canonicalize to None"""
+    emails = [email.strip() for email in _as_strings(values)]
+    match = EMAIL_PATTERN.match
+    codes = [None if not email or match(email) else "email_invalid" for email in emails]
+    return ValidationResult(
+        [code is None for code in codes],
+        codes,
+        [email if code is None and email else None for email, code in zip(emails, codes)],
+    )
+
+
+def validate_name(name):
+    code = validate_names([name]).codes[0]
+    if code:
+        return False, MESSAGES[code]
+    return True, ""
+
+def validate_phone(phone):
+    code = validate_phones([phone]).codes[0]
+    if code:
+        return False, MESSAGES[code]
+    return True, ""
+
+def validate_email(email):
+    result = validate_emails([email])
+    if result.codes[0]:
+        return False, MESSAGES[result.codes[0]]
+    if result.values[0] is None:
+        return True, "NULL"  # Indicates empty email should be stored as NULL
+    return True, "VALID"  # Indicates valid email provided
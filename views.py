@@ -0,0 +1,67 @@
+"""The data behind app.py's pages, without Streamlit.
+
+app.py renders what these return, and benchmarks/load.py calls them to replay
+the pages' reruns, so the load test makes the same queries as the app.
+"""
+from contact_store import ContactStore
+from operations import PICKER_LIMIT
+from search_index import SEARCH_RESULT_LIMIT
+
+SORT_OPTIONS = {
+    "Name (A-Z)": ("name", "asc"),
+    "Name (Z-A)": ("name", "desc"),
+    "Date Added (Newest)": ("date_added", "desc"),
+    "Date Added (Oldest)": ("date_added", "asc"),
+}
+ITEMS_PER_PAGE = 10
+SEARCH_FIELDS = {"All fields": None, "Name only": "name", "Phone only": "phone", "Email only": "email"}
+DATE_FORMAT = "%Y-%m-%d %H:%M"
+
+
+def quick_stats(db_ops, username):
+    """(total contacts, most recently added contact or None) for the sidebar"""
+    total = db_ops.count_contacts(username)
+    latest = None
+    if total:
+        rows, _ = db_ops.get_contacts_page(username, sort_key="date_added", direction="desc", page_size=1)
+        latest = rows[0] if rows else None
+    return total, latest
+
+
+def contacts_page(db_ops, username, sort_option, page_cursors, page_index):
+    """One page of the contacts table; returns (rows, next_cursor).
+
+    Keyset pagination: page_cursors[i] is the cursor that starts page i + 1, and
+    the cursor after this page is recorded in it. An empty page past the first
+    (emptied by deletions) leaves page_cursors alone for the caller to reset.
+    """
+    sort_key, direction = SORT_OPTIONS[sort_option]
+    rows, next_cursor = db_ops.get_contacts_page(
+        username,
+        sort_key=sort_key,
+        direction=direction,
+        cursor=page_cursors[page_index],
+        page_size=ITEMS_PER_PAGE
+    )
+    if rows or page_index == 0:
+        del page_cursors[page_index + 1:]
+        if next_cursor is not None:
+            page_cursors.append(next_cursor)
+    return rows, next_cursor
+
+
+def pick_contacts(db_ops, username, prefix):
+    """Matches for the typeahead picker of the Edit and Delete pages"""
+    return db_ops.find_contacts_by_prefix(username, prefix, limit=PICKER_LIMIT)
+
+
+def search(db_ops, username, term, field=None):
+    """(suggestions, results) for the search box; `field` is a SEARCH_FIELDS value"""
+    suggestions = db_ops.suggest_search_terms(username, term)
+    results = db_ops.search_contacts(username, term, field=field, limit=SEARCH_RESULT_LIMIT)
+    return suggestions, results
+
+
+def display_columns(rows):
+    """Columns for st.dataframe, with dates rendered as text"""
+    return ContactStore.from_rows(rows).to_columns(date_format=DATE_FORMAT)